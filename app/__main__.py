@@ -0,0 +1,72 @@
+"""Command line entry point: ``python -m app serve``.
+
+Runs uvicorn with WEB_WORKERS worker processes, each of which opens its own
+storage client in the app lifespan. Every option comes from Settings; the
+flags below only override host, port and worker count for a single run.
+"""
+import argparse
+import importlib.util
+import inspect
+import logging
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("app.cli")
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _accepts(option: str) -> bool:
+    """Whether the installed uvicorn knows option (limit_max_requests_jitter is recent)."""
+    return option in inspect.signature(uvicorn.Config).parameters
+
+
+def server_options(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None) -> Dict:
+    """uvicorn.run keyword arguments from Settings, preferring uvloop and httptools when installed."""
+    # Every worker would hold its own copy of the in-memory store
+    single_process = settings.STORAGE_BACKEND == "memory"
+    if single_process and workers and workers != 1:
+        logger.warning("STORAGE_BACKEND=memory runs a single worker; ignoring --workers %d", workers)
+    options = {
+        "host": host or settings.HOST,
+        "port": port or settings.PORT,
+        "workers": 1 if single_process else workers or settings.WEB_WORKERS,
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+        "backlog": settings.BACKLOG,
+        "timeout_keep_alive": settings.KEEPALIVE_TIMEOUT,
+        # Recycling a worker would drop the in-memory store with it
+        "limit_max_requests": None if single_process else settings.MAX_REQUESTS or None,
+        "timeout_graceful_shutdown": settings.GRACEFUL_TIMEOUT,
+        "log_level": settings.LOG_LEVEL.lower(),
+        # The app writes its own structured access log (app.timing)
+        "access_log": False,
+    }
+    if _accepts("limit_max_requests_jitter"):
+        options["limit_max_requests_jitter"] = settings.MAX_REQUESTS_JITTER
+    return options
+
+
+def serve(args: argparse.Namespace):
+    uvicorn.run("app.main:app", **server_options(args.host, args.port, args.workers))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the API with one worker process per CPU")
+    serve_parser.add_argument("--host")
+    serve_parser.add_argument("--port", type=int)
+    serve_parser.add_argument("--workers", type=int)
+    serve_parser.set_defaults(func=serve)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,67 @@ class Settings:
     """Application configuration from environment variables."""
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017/fleet_api")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "fleet_api")
+    # "mongo" serves sync routes on pymongo; "motor" serves async routes on Motor;
+    # "memory" serves sync routes from in-process dicts (one worker, no persistence)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "mongo")
+    # Upper bound on items accepted by one POST /<collection>:batch request
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+    # Documents fetched per cursor batch and encoded per chunk by streamed lists
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+    # Client and connection pool options, passed to MongoClient/AsyncIOMotorClient
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    # Connections opened at startup (warm-up) and kept open while idle
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    # How long a request waits for a free connection before failing with 503; 0 (default) waits forever
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    # 0 leaves socket reads unbounded
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # Comma-separated, e.g. "zstd,snappy,zlib" (zstd/snappy need their extra packages)
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+    # Empty values keep the server/driver defaults
+    MONGO_READ_CONCERN: str = os.getenv("MONGO_READ_CONCERN", "")
+    MONGO_WRITE_CONCERN: str = os.getenv("MONGO_WRITE_CONCERN", "")
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "")
+    # Upper bound on the startup wait for MONGO_MIN_POOL_SIZE connections
+    MONGO_WARMUP_TIMEOUT_MS: int = int(os.getenv("MONGO_WARMUP_TIMEOUT_MS", "5000"))
+    # One JSON line per request (status, timings, db calls) on the app.access logger
+    ACCESS_LOG: bool = os.getenv("ACCESS_LOG", "true").lower() in ("1", "true", "yes")
+    # Mongo commands slower than this are recorded in the slow query log (app/storage/slowlog.py)
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "100"))
+    # Chance that a repeat slow run of an already explained shape is explained again
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.01"))
+    # Distinct query shapes kept; further new shapes are dropped
+    SLOW_QUERY_MAX_SHAPES: int = int(os.getenv("SLOW_QUERY_MAX_SHAPES", "500"))
+    # Read-through cache of vehicles, drivers and assignments by id (app/storage/cache.py), per
+    # worker process; the TTL bounds how stale a write made by another worker can be. Off (0) by
+    # default: with WORKERS > 1 a GET may miss another worker's write for up to the TTL
+    ENTITY_CACHE_TTL_SECONDS: float = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "0"))
+    ENTITY_CACHE_MAX_ENTRIES: int = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "10000"))
+    ENTITY_CACHE_MAX_BYTES: int = int(os.getenv("ENTITY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    # Concurrent reads of the same vehicle/driver/assignment share one query (app/storage/singleflight.py)
+    SINGLE_FLIGHT: bool = os.getenv("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+    # In-process replica of vehicles and drivers tailing a change stream (app/storage/read_model.py);
+    # needs a replica set. Lookups fall back to Mongo when it is more than MAX_STALENESS_MS behind
+    READ_MODEL: bool = os.getenv("READ_MODEL", "false").lower() in ("1", "true", "yes")
+    READ_MODEL_MAX_STALENESS_MS: float = float(os.getenv("READ_MODEL_MAX_STALENESS_MS", "2000"))
+    READ_MODEL_MAX_AWAIT_MS: int = int(os.getenv("READ_MODEL_MAX_AWAIT_MS", "500"))
+    # python -m app serve: bind address, worker processes (default: one per CPU)
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+    # Threads per worker that run sync (pymongo) routes; anyio's default is 40
+    THREADPOOL_SIZE: int = int(os.getenv("THREADPOOL_SIZE", "40"))
+    BACKLOG: int = int(os.getenv("BACKLOG", "2048"))
+    KEEPALIVE_TIMEOUT: int = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+    # Recycle a worker after this many requests (0 disables), with random jitter so workers do not restart together
+    MAX_REQUESTS: int = int(os.getenv("MAX_REQUESTS", "0"))
+    # Jitter needs a uvicorn release with limit_max_requests_jitter; older ones ignore it
+    MAX_REQUESTS_JITTER: int = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+    # Seconds in-flight requests get to finish on shutdown
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
     ENV: str = os.getenv("ENV", "development")
     LOG_LEVEL: str = "DEBUG" if ENV == "development" else "INFO"
 
@@ -3,6 +3,10 @@ from datetime import datetime, timezone
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from pymongo.errors import ConnectionFailure
+
+# Seconds a client is asked to wait before retrying a request refused with 503
+RETRY_AFTER_SECONDS = 1
 
 
 def make_meta(request: Request):
@@ -25,13 +29,18 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(status_code=exc.status_code, content=payload)
 
 
-async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    # Build per-field details
+def validation_details(errors) -> dict:
+    """Group pydantic error entries by field name."""
     details = {}
-    for err in exc.errors():
+    for err in errors:
         loc = err.get("loc", [])
         field = loc[-1] if loc else "_".join(str(x) for x in loc)
         details.setdefault(field, []).append({"code": "VALIDATION_ERROR", "message": err.get("msg")})
+    return details
+
+
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    details = validation_details(exc.errors())
     payload = {"success": False, "error": {"code": "VALIDATION_ERROR", "message": "Validation error", "details": details}, "meta": make_meta(request)}
     return JSONResponse(status_code=422, content=payload)
 
@@ -39,3 +48,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 async def generic_exception_handler(request: Request, exc: Exception):
     payload = {"success": False, "error": {"code": "SERVER_ERROR", "message": "Internal server error"}, "meta": make_meta(request)}
     return JSONResponse(status_code=500, content=payload)
+
+
+async def database_unavailable_handler(request: Request, exc: ConnectionFailure):
+    """503 with Retry-After when no database connection is available (pool wait timeout, network error)."""
+    payload = {"success": False, "error": {"code": "SERVICE_UNAVAILABLE", "message": "Database temporarily unavailable"}, "meta": make_meta(request)}
+    return JSONResponse(status_code=503, content=payload, headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
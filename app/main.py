@@ -1,72 +1,79 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from bson import ObjectId
-from app.routers import vehicles, drivers, assignments
+from fastapi.exceptions import RequestValidationError
+from fastapi import HTTPException
+from pymongo.errors import ConnectionFailure
+from app.config import settings
 from app import errors
-import uuid
-import json
-
-# Patch jsonable_encoder to handle ObjectId
-from fastapi.encoders import jsonable_encoder as original_jsonable_encoder, ENCODERS_BY_TYPE
-
-original_encoders_by_type = ENCODERS_BY_TYPE.copy()
+from app import storage
+from app.serialization import dumps
+from app import timing
+from app.middleware import RequestMiddleware
+from app.routers import admin
 
-def patched_jsonable_encoder(obj, **kwargs):
-    """Patched jsonable_encoder that handles ObjectId."""
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    return original_jsonable_encoder(obj, **kwargs)
 
-# Apply patch
-import fastapi.encoders
-fastapi.encoders.jsonable_encoder = patched_jsonable_encoder
+def _lifespan(backend: str):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Open the storage client in this worker process, after any fork.
 
-# Also patch the ENCODERS_BY_TYPE
-ENCODERS_BY_TYPE[ObjectId] = str
+        Motor connects inside the server's event loop; pymongo connects on a worker
+        thread so the initial ping does not block the loop.
+        """
+        # Threads available to sync routes in this worker
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+        if backend == "motor":
+            await storage.init_async_store()
+        else:
+            await run_in_threadpool(storage.init_store)
+        yield
+        if backend == "motor":
+            storage.close_async_store()
+        else:
+            storage.close_store()
 
-def custom_json_serializer(obj):
-    """Custom JSON serializer for non-standard types."""
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    raise TypeError(f"Type {type(obj)} not serializable")
+    return lifespan
 
-# Create FastAPI app
-app = FastAPI()
 
-# Custom JSON response class
+# Routes that return plain dicts (batches, errors) still go through jsonable_encoder;
+# entity routes return responses pre-rendered by app.serialization
 class MongoJSONResponse(JSONResponse):
+    @timing.timed_serialization
     def render(self, content) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-            allow_nan=False,
-            indent=None,
-            separators=(",", ":"),
-            default=custom_json_serializer,
-        ).encode("utf-8")
-
-# Override the app to use custom response class
-app.default_response_class = MongoJSONResponse
-
-# Simple middleware to attach request_id and correlation_id per request
-@app.middleware("http")
-async def add_request_id(request: Request, call_next):
-    rid = str(uuid.uuid4())
-    request.state.request_id = rid
-    request.state.correlation_id = rid
-    response = await call_next(request)
-    response.headers["X-Request-Id"] = rid
-    return response
-
-# Register custom exception handlers
-from fastapi.exceptions import RequestValidationError
-from fastapi import HTTPException
+        return dumps(content).encode("utf-8")
+
+
+timing.configure_access_log()
+
+
+def create_app(backend: str = settings.STORAGE_BACKEND) -> FastAPI:
+    """Build the API on backend: the async routers on Motor for "motor", the sync routers otherwise."""
+    if backend == "motor":
+        from app.routers.aio import vehicles, drivers, assignments
+    else:
+        from app.routers import vehicles, drivers, assignments
+
+    app = FastAPI(lifespan=_lifespan(backend))
+    # Override the app to use custom response class
+    app.default_response_class = MongoJSONResponse
+
+    # Request id, Server-Timing (db / ser / app / total), route metrics and the access log
+    app.add_middleware(RequestMiddleware)
+
+    # Register custom exception handlers
+    app.add_exception_handler(Exception, errors.generic_exception_handler)
+    app.add_exception_handler(RequestValidationError, errors.validation_exception_handler)
+    app.add_exception_handler(HTTPException, errors.http_exception_handler)
+    app.add_exception_handler(ConnectionFailure, errors.database_unavailable_handler)
 
-app.add_exception_handler(Exception, errors.generic_exception_handler)
-app.add_exception_handler(RequestValidationError, errors.validation_exception_handler)
-app.add_exception_handler(HTTPException, errors.http_exception_handler)
+    app.include_router(vehicles.router)
+    app.include_router(drivers.router)
+    app.include_router(assignments.router)
+    app.include_router(admin.router)
+    return app
 
-app.include_router(vehicles.router)
-app.include_router(drivers.router)
-app.include_router(assignments.router)
 
+app = create_app()
@@ -0,0 +1,143 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms keep one small list per label set and are updated
+under a per-metric lock, so recording a sample costs a bisect and a few
+additions; that is cheap enough to leave on for every request and every
+Mongo command. REGISTRY.render() produces the /metrics body.
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Request latencies, in seconds
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Mongo round trips are mostly sub-millisecond to tens of milliseconds
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauges:
+    """Gauges read from a callback at scrape time; callback returns {name: (help, value)}."""
+
+    type = "gauge"
+
+    def __init__(self, collect: Callable[[], Dict[str, Tuple[str, float]]]):
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = []
+        for name, (help, value) in self.collect().items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {self.type}", f"{name} {_number(value)}"]
+        return lines
+
+
+class Counters(Gauges):
+    """Counters kept elsewhere (e.g. in a stats snapshot) and read from a callback at scrape time.
+
+    Names should end in _total; values must only grow until the process restarts.
+    """
+
+    type = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram("http_request_duration_seconds", "Time to produce the response head, by route template and status.",
+                                           ("method", "route", "status"), HTTP_BUCKETS))
+MONGO_LATENCY = REGISTRY.register(Histogram("mongo_command_duration_seconds", "Mongo command round trip time by collection and command.",
+                                            ("collection", "command"), MONGO_BUCKETS))
+MONGO_FAILURES = REGISTRY.register(Counter("mongo_command_failures_total", "Failed Mongo commands by collection and command.", ("collection", "command")))
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    labels = (method, route, str(status))
+    HTTP_REQUESTS.inc(labels)
+    HTTP_LATENCY.observe(labels, seconds)
+
+
+def route_template(scope: Dict) -> str:
+    """Path template of the matched route (e.g. /vehicles/{vid}); bounded label cardinality."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
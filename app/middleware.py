@@ -0,0 +1,68 @@
+"""Per-request bookkeeping as a single ASGI middleware.
+
+Assigns the request id, opens the request's timings, and on the way out
+stamps X-Request-Id and Server-Timing, records the route metrics and writes
+the access log line. It wraps send() instead of using BaseHTTPMiddleware,
+so a rendered response still leaves as one final body message; splitting it
+lets clients close the connection before the server counts the response
+complete, which breaks MAX_REQUESTS worker recycling.
+"""
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import timing
+from app.metrics import observe_request, route_template
+
+
+class RequestMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rid = str(uuid.uuid4())
+        state = scope.setdefault("state", {})
+        state["request_id"] = rid
+        state["correlation_id"] = rid
+        timings = timing.begin_request()
+        status_code = 500
+        size = 0
+        started = False
+
+        def entry() -> dict:
+            return {"request_id": rid, "method": scope["method"], "path": scope["path"], "route": route_template(scope), "status": status_code,
+                    **timings.as_log(), "bytes": size}
+
+        async def send_with_timings(message: Message):
+            nonlocal status_code, size, started
+            if message["type"] == "http.response.start":
+                started = True
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-Id"] = rid
+                headers["Server-Timing"] = timings.server_timing()
+                # Latency is measured to the response head, as streamed bodies can run for minutes
+                observe_request(scope["method"], route_template(scope), status_code, timings.elapsed())
+                await send(message)
+                return
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                await send(message)
+                if not message.get("more_body", False):
+                    # After the final message, so streamed bodies include their cursor and encoding time
+                    timing.log_access(entry())
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        except Exception:
+            if not started:
+                observe_request(scope["method"], route_template(scope), 500, timings.elapsed())
+                timing.log_access(entry())
+            raise
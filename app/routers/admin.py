@@ -0,0 +1,49 @@
+"""Operational endpoints; served by both storage backends."""
+from fastapi import APIRouter, Depends, Request, Response
+
+from app import metrics
+from app.errors import make_meta
+from app.routers.vehicles import require_auth
+from app.storage.cache import ENTITY_CACHE
+from app.storage.pool import POOL_STATS
+from app.storage.read_model import READ_MODEL
+from app.storage.singleflight import COALESCING
+from app.storage.slowlog import SLOW_QUERIES
+
+router = APIRouter()
+
+
+@router.get("/admin/pool")
+def get_pool_stats(request: Request, auth=Depends(require_auth)):
+    # Live connection pool counters and checkout wait-time histogram, for pool sizing
+    return {"success": True, "data": POOL_STATS.snapshot(), "meta": make_meta(request)}
+
+
+@router.get("/admin/cache")
+def get_cache_stats(request: Request, auth=Depends(require_auth)):
+    # Entity cache size and hit/miss counters of the worker that answers
+    return {"success": True, "data": ENTITY_CACHE.snapshot(), "meta": make_meta(request)}
+
+
+@router.get("/admin/read-model")
+def get_read_model_stats(request: Request, auth=Depends(require_auth)):
+    # Change-stream replica state of the worker that answers: staleness, event lag, resyncs, fallbacks
+    return {"success": True, "data": READ_MODEL.snapshot(), "meta": make_meta(request)}
+
+
+@router.get("/admin/coalescing")
+def get_coalescing_stats(request: Request, auth=Depends(require_auth)):
+    # Entity reads that shared another request's in-flight query, per collection
+    return {"success": True, "data": COALESCING.snapshot(), "meta": make_meta(request)}
+
+
+@router.get("/admin/slow-queries")
+def get_slow_queries(request: Request, auth=Depends(require_auth)):
+    # One entry per query shape over SLOW_QUERY_MS, slowest total first, with its sampled explain
+    return {"success": True, "data": SLOW_QUERIES.summary(), "meta": make_meta(request)}
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    # Prometheus text format; unauthenticated so scrapers need no token
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
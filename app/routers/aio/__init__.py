@@ -0,0 +1 @@
+from . import vehicles, drivers, assignments
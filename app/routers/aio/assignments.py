@@ -0,0 +1,116 @@
+"""Async assignment routes served on the Motor backend."""
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response, status, Query
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Literal, Optional
+
+from app.config import settings
+from app.schemas import AssignmentCreate
+from app.storage import get_async_store, AsyncStorageAdapter
+from app.routers.assignments import new_assignment, require_auth
+from app.storage.errors import StorageConflict
+from app.routers.batch import batch_response, check_batch_size, finish_items, item_conflict, prepare_items
+from app.routers.conditional import list_not_modified, list_validators, not_modified
+from app.routers.streaming import stream_list, wants_stream
+from app.routers.fields import ASSIGNMENT_FIELDS, drop_fields, fields_param, projection_fields
+from app.serialization import ASSIGNMENT, render_list, render_one
+from app.routers.pagination import cursor_param, page_query, page_result
+from app.utils import truncate_to_milliseconds
+
+router = APIRouter()
+
+
+@router.get("/assignments")
+async def list_assignments(request: Request, limit: int = Query(50, ge=1, le=500), skip: int = Query(0, ge=0), cursor: Optional[str] = None, stream: bool = False, fields: Optional[str] = None, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None,
+                     state: Optional[Literal["active", "closed"]] = None, start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    active = None if state is None else state == "active"
+    requested = fields_param(fields, ASSIGNMENT_FIELDS)
+    after = cursor_param(cursor)
+    # active/closed depend on the clock, so only unfiltered-by-state lists get validators
+    validators = list_validators(await store.get_watermark("assignments")) if active is None else {}
+    if list_not_modified(request, validators):
+        return not_modified(validators)
+    # stream=true or Accept: application/x-ndjson exports every match instead of one page
+    if wants_stream(request, stream):
+        return stream_list(request, ASSIGNMENT, store.iter_assignments(driver_id=driver_id, vehicle_id=vehicle_id, active=active, start_from=start_from, start_to=start_to, after=after, batch_size=settings.STREAM_BATCH_SIZE, fields=requested), headers=validators)
+    # created_at and id feed next_cursor even when not requested
+    fetch, hidden = projection_fields(requested, "created_at")
+    items, total = await store.list_assignments(driver_id=driver_id, vehicle_id=vehicle_id, active=active, start_from=start_from, start_to=start_to, fields=fetch, **page_query(limit, skip, after))
+    items, pagination = page_result(items, limit, skip, total, after)
+    return render_list(request, ASSIGNMENT, (drop_fields(a, hidden) for a in items), pagination, headers=validators)
+
+
+@router.post("/assignments", status_code=201)
+async def create_assignment(payload: AssignmentCreate, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    assignment = new_assignment(payload)
+    # Foreign keys, statuses and exclusivity are validated by the storage layer
+    try:
+        await store.add_assignment_checked(assignment)
+    except StorageConflict as e:
+        raise HTTPException(status_code=e.status_code, detail={"code": e.code, "message": e.message})
+    return render_one(ASSIGNMENT, assignment, status_code=201)
+
+
+@router.post("/assignments:batch")
+async def create_assignments_batch(request: Request, items: List[Dict[str, Any]] = Body(..., embed=True), auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    check_batch_size(items)
+    results, assignments, positions = prepare_items(items, AssignmentCreate, new_assignment)
+    errors = await store.add_assignments_bulk(assignments)
+    return batch_response(request, finish_items(results, assignments, positions, errors, item_conflict))
+
+
+@router.patch("/assignments/{aid}")
+async def patch_assignment(aid: str, payload: dict, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    a = await store.get_assignment(aid, fresh=True)
+    if not a:
+        raise HTTPException(status_code=404, detail={"code": "ASSIGNMENT_NOT_FOUND", "message": "Assignment not found"})
+    # Only notes and end_datetime allowed
+    updates = {}
+    if "notes" in payload:
+        notes = payload.get("notes")
+        if notes is not None:
+            notes = notes.rstrip()
+            if len(notes) > 127:
+                raise HTTPException(status_code=422, detail={"code": "VALIDATION_ERROR", "message": "notes too long"})
+        updates["notes"] = notes
+    if "end_datetime" in payload:
+        end = payload.get("end_datetime")
+        if end is None:
+            updates["end_datetime"] = None
+        else:
+            # parse
+            if isinstance(end, str):
+                end_dt = datetime.fromisoformat(end)
+            else:
+                end_dt = end
+            # Truncate to milliseconds to match MongoDB precision
+            end_dt = truncate_to_milliseconds(end_dt)
+            updates["end_datetime"] = end_dt
+    updates["updated_at"] = datetime.now(timezone.utc)
+    try:
+        resp = await store.update_assignment(aid, updates)
+    except StorageConflict as e:
+        raise HTTPException(status_code=e.status_code, detail={"code": e.code, "message": e.message})
+    return render_one(ASSIGNMENT, resp) if resp else resp
+
+
+@router.get("/assignments/{aid}")
+async def get_assignment(aid: str, fields: Optional[str] = None, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    a = await store.get_assignment(aid, fields_param(fields, ASSIGNMENT_FIELDS))
+    if not a:
+        raise HTTPException(status_code=404, detail={"code": "ASSIGNMENT_NOT_FOUND", "message": "Assignment not found"})
+    return render_one(ASSIGNMENT, a)
+
+
+@router.delete("/assignments/{aid}", status_code=204)
+async def delete_assignment(aid: str, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    a = await store.get_assignment(aid, fresh=True)
+    if not a:
+        raise HTTPException(status_code=404, detail={"code": "ASSIGNMENT_NOT_FOUND", "message": "Assignment not found"})
+    # If active (end_datetime is None), auto-close it first
+    now = datetime.now(timezone.utc)
+    if a.get("end_datetime") is None:
+        # Auto-close
+        await store.update_assignment(aid, {"end_datetime": now, "updated_at": now})
+    # Then delete the assignment
+    await store.delete_assignment(aid)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
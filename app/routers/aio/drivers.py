@@ -0,0 +1,135 @@
+"""Async driver routes served on the Motor backend."""
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response, Query
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.schemas import DriverCreate
+from app.storage import get_async_store, AsyncStorageAdapter
+from app.routers.drivers import duplicate_license, new_driver, require_auth
+from app.routers.batch import batch_response, check_batch_size, finish_items, item_conflict, prepare_items
+from app.routers.conditional import etag_matches, if_match_matches, is_weak, list_not_modified, list_validators, not_modified, version_etag
+from app.routers.streaming import stream_list, wants_stream
+from app.routers.fields import DRIVER_FIELDS, drop_fields, fields_param, projection_fields
+from app.serialization import DRIVER, render_list, render_one
+from app.routers.pagination import cursor_param, page_query, page_result
+from app.utils import serialize_datetime, parse_etag, next_updated_at
+
+router = APIRouter()
+
+
+@router.get("/drivers")
+async def list_drivers(request: Request, limit: int = Query(50, ge=1, le=500), skip: int = Query(0, ge=0), cursor: Optional[str] = None, stream: bool = False, fields: Optional[str] = None, status: Optional[str] = None, include_deleted: bool = False, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    query = {}
+    if not include_deleted:
+        query["deleted"] = False
+    if status:
+        query["status"] = status
+    requested = fields_param(fields, DRIVER_FIELDS)
+    after = cursor_param(cursor)
+    # Weak validators from the collection watermark (count and newest updated_at)
+    validators = list_validators(await store.get_watermark("drivers"))
+    if list_not_modified(request, validators):
+        return not_modified(validators)
+    # stream=true or Accept: application/x-ndjson exports every match instead of one page
+    if wants_stream(request, stream):
+        return stream_list(request, DRIVER, store.iter_drivers(query, after=after, batch_size=settings.STREAM_BATCH_SIZE, fields=requested), headers=validators)
+    # created_at and id feed next_cursor even when not requested
+    fetch, hidden = projection_fields(requested, "created_at")
+    items, total = await store.list_drivers(query, fields=fetch, **page_query(limit, skip, after))
+    items, pagination = page_result(items, limit, skip, total, after)
+    return render_list(request, DRIVER, (drop_fields(d, hidden) for d in items), pagination, headers=validators)
+
+
+@router.post("/drivers", status_code=201)
+async def create_driver(payload: DriverCreate, auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    driver = new_driver(payload)
+    # Uniqueness is enforced by the partial unique index on license_number
+    try:
+        await store.add_driver(driver)
+    except ValueError:
+        raise duplicate_license()
+    return render_one(DRIVER, driver, status_code=201)
+
+
+@router.post("/drivers:batch")
+async def create_drivers_batch(request: Request, items: List[Dict[str, Any]] = Body(..., embed=True), auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    check_batch_size(items)
+    results, drivers, positions = prepare_items(items, DriverCreate, new_driver)
+    errors = await store.add_drivers_bulk(drivers)
+    return batch_response(request, finish_items(results, drivers, positions, errors, item_conflict))
+
+
+@router.get("/drivers/{did}")
+async def get_driver(did: str, fields: Optional[str] = None, if_none_match: Optional[str] = Header(None, alias="If-None-Match"), auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    # Revalidation reads updated_at alone from the covering version index and
+    # answers 304 without loading or rendering the document
+    if if_none_match:
+        updated_at = await store.get_driver_version(did)
+        if updated_at is not None and etag_matches(if_none_match, version_etag(updated_at)):
+            return not_modified({"ETag": version_etag(updated_at)})
+    # deleted and updated_at are always fetched for the 404 check and the ETag
+    fetch, hidden = projection_fields(fields_param(fields, DRIVER_FIELDS), "deleted", "updated_at")
+    d = await store.get_driver(did, fetch)
+    if not d or d.get("deleted"):
+        raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+    # ETag
+    etag = f'"{serialize_datetime(d["updated_at"])}"'
+    return render_one(DRIVER, drop_fields(d, hidden), headers={"ETag": etag})
+
+
+@router.patch("/drivers/{did}")
+async def patch_driver(did: str, payload: dict, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    if if_match is None:
+        raise HTTPException(status_code=412, detail={"code": "MISSING_IF_MATCH", "message": "If-Match header required"})
+    # If changing status to SUSPENDED, ensure no active assignments
+    new_status = payload.get("status")
+    if new_status == "SUSPENDED":
+        # If-Match is checked first: a stale ETag is a conflict whatever the assignments
+        current = await store.get_driver_version(did)
+        if current is None:
+            raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+        if not if_match_matches(if_match, version_etag(current)):
+            raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
+        active = await store.list_active_assignments_for_driver(did)
+        if active:
+            raise HTTPException(status_code=409, detail={"code": "DRIVER_HAS_ACTIVE_ASSIGNMENTS", "message": "Driver has active assignments"})
+    # Only the fields present in the payload are written
+    updates = {}
+    if "license_number" in payload:
+        updates["license_number"] = payload.get("license_number").strip().upper()
+    for field in ("name", "contact_number", "status"):
+        if field in payload:
+            if isinstance(payload[field], str):
+                updates[field] = payload[field].strip()
+            else:
+                updates[field] = payload[field]
+    # Compare-and-set on updated_at; the license index rejects duplicates
+    expected = parse_etag(if_match)
+    updates["updated_at"] = next_updated_at(expected)
+    try:
+        resp = await store.update_driver_if_match(did, expected, updates) if expected else None
+    except ValueError:
+        raise duplicate_license()
+    if resp is None:
+        d = await store.get_driver(did)
+        if not d or d.get("deleted"):
+            raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
+    return render_one(DRIVER, resp)
+
+
+@router.delete("/drivers/{did}", status_code=204)
+async def delete_driver(did: str, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth), store: AsyncStorageAdapter = Depends(get_async_store)):
+    if if_match is None:
+        raise HTTPException(status_code=412, detail={"code": "MISSING_IF_MATCH", "message": "If-Match header required"})
+    d = await store.get_driver(did)
+    if not d or d.get("deleted"):
+        raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+    # If-Match uses strong comparison, so a weak ETag never matches
+    if is_weak(if_match):
+        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
+    active = await store.list_active_assignments_for_driver(did)
+    if active:
+        raise HTTPException(status_code=409, detail={"code": "DRIVER_HAS_ACTIVE_ASSIGNMENTS", "message": "Driver has active assignments"})
+    await store.soft_delete_driver(did)
+    return Response(status_code=204)
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response, status, Query
 from uuid import uuid4
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
+from app.config import settings
 from app.schemas import AssignmentCreate
-from app.storage import store
-from app.utils import serialize_datetime, truncate_to_milliseconds
+from app.storage import get_store, StorageAdapter
+from app.storage.errors import StorageConflict
+from app.routers.batch import batch_response, check_batch_size, finish_items, item_conflict, prepare_items
+from app.routers.conditional import list_not_modified, list_validators, not_modified
+from app.routers.streaming import stream_list, wants_stream
+from app.routers.fields import ASSIGNMENT_FIELDS, drop_fields, fields_param, projection_fields
+from app.serialization import ASSIGNMENT, render_list, render_one
+from app.routers.pagination import cursor_param, page_query, page_result
+from app.utils import truncate_to_milliseconds
 
 router = APIRouter()
 
@@ -18,32 +26,11 @@ def require_auth(authorization: Optional[str] = Header(None)):
     return authorization
 
 
-@router.post("/assignments", status_code=201)
-def create_assignment(payload: AssignmentCreate, auth=Depends(require_auth)):
-    # Check foreign keys
-    driver = store.get_driver(payload.driver_id)
-    if not driver or driver.get("deleted"):
-        raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
-    vehicle = store.get_vehicle(payload.vehicle_id)
-    if not vehicle or vehicle.get("deleted"):
-        raise HTTPException(status_code=404, detail={"code": "VEHICLE_NOT_FOUND", "message": "Vehicle not found"})
-    # Check statuses
-    if driver.get("status") == "SUSPENDED":
-        raise HTTPException(status_code=409, detail={"code": "DRIVER_SUSPENDED", "message": "Driver suspended"})
-    if vehicle.get("status") in ("INACTIVE", "MAINTENANCE"):
-        raise HTTPException(status_code=409, detail={"code": "VEHICLE_INACTIVE", "message": "Vehicle inactive or under maintenance"})
-    # Check driver and vehicle active assignments
-    da = store.list_active_assignments_for_driver(payload.driver_id)
-    if da:
-        raise HTTPException(status_code=409, detail={"code": "DRIVER_ALREADY_ASSIGNED", "message": "Driver already has an active assignment"})
-    va = store.list_active_assignments_for_vehicle(payload.vehicle_id)
-    if va:
-        raise HTTPException(status_code=409, detail={"code": "VEHICLE_ALREADY_ASSIGNED", "message": "Vehicle already has an active assignment"})
-
-    aid = str(uuid4())
+def new_assignment(payload: AssignmentCreate) -> Dict:
+    """Build the stored document for a validated create payload."""
     now = datetime.now(timezone.utc)
-    assignment = {
-        "id": aid,
+    return {
+        "id": str(uuid4()),
         "driver_id": payload.driver_id,
         "vehicle_id": payload.vehicle_id,
         "start_datetime": payload.start_datetime,
@@ -52,18 +39,50 @@ def create_assignment(payload: AssignmentCreate, auth=Depends(require_auth)):
         "created_at": now,
         "updated_at": now,
     }
-    store.add_assignment(assignment)
-    resp = {**assignment}
-    resp["start_datetime"] = serialize_datetime(resp["start_datetime"])
-    resp["end_datetime"] = serialize_datetime(resp["end_datetime"])
-    resp["created_at"] = serialize_datetime(resp["created_at"])
-    resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+
+
+@router.get("/assignments")
+def list_assignments(request: Request, limit: int = Query(50, ge=1, le=500), skip: int = Query(0, ge=0), cursor: Optional[str] = None, stream: bool = False, fields: Optional[str] = None, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None,
+                     state: Optional[Literal["active", "closed"]] = None, start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    active = None if state is None else state == "active"
+    requested = fields_param(fields, ASSIGNMENT_FIELDS)
+    after = cursor_param(cursor)
+    # active/closed depend on the clock, so only unfiltered-by-state lists get validators
+    validators = list_validators(store.get_watermark("assignments")) if active is None else {}
+    if list_not_modified(request, validators):
+        return not_modified(validators)
+    # stream=true or Accept: application/x-ndjson exports every match instead of one page
+    if wants_stream(request, stream):
+        return stream_list(request, ASSIGNMENT, store.iter_assignments(driver_id=driver_id, vehicle_id=vehicle_id, active=active, start_from=start_from, start_to=start_to, after=after, batch_size=settings.STREAM_BATCH_SIZE, fields=requested), headers=validators)
+    # created_at and id feed next_cursor even when not requested
+    fetch, hidden = projection_fields(requested, "created_at")
+    items, total = store.list_assignments(driver_id=driver_id, vehicle_id=vehicle_id, active=active, start_from=start_from, start_to=start_to, fields=fetch, **page_query(limit, skip, after))
+    items, pagination = page_result(items, limit, skip, total, after)
+    return render_list(request, ASSIGNMENT, (drop_fields(a, hidden) for a in items), pagination, headers=validators)
+
+
+@router.post("/assignments", status_code=201)
+def create_assignment(payload: AssignmentCreate, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    assignment = new_assignment(payload)
+    # Foreign keys, statuses and exclusivity are validated by the storage layer
+    try:
+        store.add_assignment_checked(assignment)
+    except StorageConflict as e:
+        raise HTTPException(status_code=e.status_code, detail={"code": e.code, "message": e.message})
+    return render_one(ASSIGNMENT, assignment, status_code=201)
+
+
+@router.post("/assignments:batch")
+def create_assignments_batch(request: Request, items: List[Dict[str, Any]] = Body(..., embed=True), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    check_batch_size(items)
+    results, assignments, positions = prepare_items(items, AssignmentCreate, new_assignment)
+    errors = store.add_assignments_bulk(assignments)
+    return batch_response(request, finish_items(results, assignments, positions, errors, item_conflict))
 
 
 @router.patch("/assignments/{aid}")
-def patch_assignment(aid: str, payload: dict, auth=Depends(require_auth)):
-    a = store.get_assignment(aid)
+def patch_assignment(aid: str, payload: dict, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    a = store.get_assignment(aid, fresh=True)
     if not a:
         raise HTTPException(status_code=404, detail={"code": "ASSIGNMENT_NOT_FOUND", "message": "Assignment not found"})
     # Only notes and end_datetime allowed
@@ -89,31 +108,24 @@ def patch_assignment(aid: str, payload: dict, auth=Depends(require_auth)):
             end_dt = truncate_to_milliseconds(end_dt)
             updates["end_datetime"] = end_dt
     updates["updated_at"] = datetime.now(timezone.utc)
-    resp = store.update_assignment(aid, updates)
-    if resp:
-        resp["start_datetime"] = serialize_datetime(resp["start_datetime"])
-        resp["end_datetime"] = serialize_datetime(resp["end_datetime"])
-        resp["created_at"] = serialize_datetime(resp["created_at"])
-        resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+    try:
+        resp = store.update_assignment(aid, updates)
+    except StorageConflict as e:
+        raise HTTPException(status_code=e.status_code, detail={"code": e.code, "message": e.message})
+    return render_one(ASSIGNMENT, resp) if resp else resp
 
 
 @router.get("/assignments/{aid}")
-def get_assignment(aid: str, auth=Depends(require_auth)):
-    a = store.get_assignment(aid)
+def get_assignment(aid: str, fields: Optional[str] = None, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    a = store.get_assignment(aid, fields_param(fields, ASSIGNMENT_FIELDS))
     if not a:
         raise HTTPException(status_code=404, detail={"code": "ASSIGNMENT_NOT_FOUND", "message": "Assignment not found"})
-    resp = {**a}
-    resp["start_datetime"] = serialize_datetime(resp["start_datetime"])
-    resp["end_datetime"] = serialize_datetime(resp["end_datetime"])
-    resp["created_at"] = serialize_datetime(resp["created_at"])
-    resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+    return render_one(ASSIGNMENT, a)
 
 
 @router.delete("/assignments/{aid}", status_code=204)
-def delete_assignment(aid: str, auth=Depends(require_auth)):
-    a = store.get_assignment(aid)
+def delete_assignment(aid: str, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    a = store.get_assignment(aid, fresh=True)
     if not a:
         raise HTTPException(status_code=404, detail={"code": "ASSIGNMENT_NOT_FOUND", "message": "Assignment not found"})
     # If active (end_datetime is None), auto-close it first
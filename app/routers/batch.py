@@ -0,0 +1,64 @@
+"""Per-item validation and results shared by the :batch create endpoints."""
+from typing import Callable, Dict, List, Optional, Type
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from app.config import settings
+from app.errors import make_meta, validation_details
+from app.storage.errors import StorageConflict
+
+
+def check_batch_size(items: List[Dict]):
+    """Reject empty batches and batches above BATCH_MAX_ITEMS with 422."""
+    if not items or len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail={"code": "VALIDATION_ERROR", "message": "Invalid batch size", "details": {"items": [{"code": "INVALID_BATCH_SIZE", "message": f"items must contain between 1 and {settings.BATCH_MAX_ITEMS} entries"}]}})
+
+
+def item_error(index: int, status_code: int, detail) -> Dict:
+    if not isinstance(detail, dict):
+        detail = {"code": "ERROR", "message": str(detail)}
+    return {"index": index, "success": False, "status": status_code, "error": {"code": detail.get("code", "ERROR"), "message": detail.get("message", ""), "details": detail.get("details", {})}}
+
+
+def prepare_items(items: List[Dict], schema: Type[BaseModel], build: Callable[[BaseModel], Dict]) -> tuple:
+    """Validate raw items with schema and build their documents.
+
+    Returns the result list with rejected items already filled in, the built
+    documents, and the input index of each document.
+    """
+    results: List[Optional[Dict]] = [None] * len(items)
+    docs, positions = [], []
+    for index, raw in enumerate(items):
+        try:
+            docs.append(build(schema.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = item_error(index, 422, {"code": "VALIDATION_ERROR", "message": "Validation error", "details": validation_details(e.errors())})
+            continue
+        except HTTPException as e:
+            results[index] = item_error(index, e.status_code, e.detail)
+            continue
+        positions.append(index)
+    return results, docs, positions
+
+
+def item_conflict(e: ValueError) -> HTTPException:
+    """HTTP error for a per-item storage error: a StorageConflict keeps its code, anything else is a generic CONFLICT."""
+    if isinstance(e, StorageConflict):
+        return HTTPException(status_code=e.status_code, detail={"code": e.code, "message": e.message})
+    return HTTPException(status_code=409, detail={"code": "CONFLICT", "message": str(e)})
+
+
+def finish_items(results: List[Optional[Dict]], docs: List[Dict], positions: List[int], errors: List[Optional[ValueError]], conflict: Callable[[ValueError], HTTPException]) -> List[Dict]:
+    """Fill in the results of the written documents from the storage errors."""
+    for index, doc, error in zip(positions, docs, errors):
+        if error is None:
+            results[index] = {"index": index, "success": True, "status": 201, "id": doc["id"]}
+        else:
+            exc = conflict(error)
+            results[index] = item_error(index, exc.status_code, exc.detail)
+    return results
+
+
+def batch_response(request: Request, results: List[Dict]) -> Dict:
+    created = sum(1 for r in results if r["success"])
+    return {"success": True, "data": results, "summary": {"total": len(results), "created": created, "failed": len(results) - created}, "meta": make_meta(request)}
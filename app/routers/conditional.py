@@ -0,0 +1,81 @@
+"""Conditional GET support: If-None-Match / If-Modified-Since and 304 responses.
+
+If-None-Match uses weak comparison; the If-Match preconditions of PATCH and
+DELETE use strong comparison, so a weak ETag never satisfies them.
+
+Entity GETs compare the client's ETag against updated_at read from a covered
+index lookup, so an unchanged entity is answered without loading its document.
+List GETs carry a weak ETag and Last-Modified taken from the collection's change
+watermark: its document count and newest updated_at, both read from metadata
+and indexes, so writes do no extra work to keep it current.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.utils import make_etag, serialize_datetime
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(tag) == _opaque(etag) for tag in if_none_match.split(","))
+
+
+def if_match_matches(if_match: str, etag: str) -> bool:
+    """Strong comparison of an If-Match header against etag (RFC 9110 13.1.1); weak tags never match."""
+    return any(tag.strip() == etag for tag in if_match.split(",") if not is_weak(tag))
+
+
+def is_weak(tag: str) -> bool:
+    return tag.strip().startswith("W/")
+
+
+def version_etag(updated_at: datetime) -> str:
+    """Entity ETag; identical to the one GET and PATCH already use."""
+    return make_etag(serialize_datetime(updated_at))
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def list_validators(watermark: Dict) -> Dict[str, str]:
+    """Weak ETag and Last-Modified headers for a list built from a collection watermark."""
+    headers = {"ETag": f'W/"{watermark["version"]}"'}
+    updated_at = watermark.get("updated_at")
+    if updated_at is not None:
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(updated_at.replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def list_not_modified(request: Request, validators: Dict[str, str]) -> bool:
+    """True when the request's validators show the client's copy is still current.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    Empty validators (a list that depends on the clock) never match.
+    """
+    if not validators:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, validators["ETag"])
+    since, last_modified = request.headers.get("if-modified-since"), validators.get("Last-Modified")
+    if not since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
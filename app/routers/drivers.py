@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response, Query
 from uuid import uuid4
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import re
 
+from app.config import settings
 from app.schemas import DriverCreate
-from app.storage import store
-from app.utils import serialize_datetime
+from app.storage import get_store, StorageAdapter
+from app.routers.batch import batch_response, check_batch_size, finish_items, item_conflict, prepare_items
+from app.routers.conditional import etag_matches, if_match_matches, is_weak, list_not_modified, list_validators, not_modified, version_etag
+from app.routers.streaming import stream_list, wants_stream
+from app.routers.fields import DRIVER_FIELDS, drop_fields, fields_param, projection_fields
+from app.serialization import DRIVER, render_list, render_one
+from app.routers.pagination import cursor_param, page_query, page_result
+from app.utils import serialize_datetime, parse_etag, next_updated_at
 
 router = APIRouter()
 
@@ -17,102 +24,142 @@ def require_auth(authorization: Optional[str] = Header(None)):
     return authorization
 
 
-@router.post("/drivers", status_code=201)
-def create_driver(payload: DriverCreate, auth=Depends(require_auth)):
+def new_driver(payload: DriverCreate) -> Dict:
+    """Build the stored document for a create payload; raises 422 on a malformed phone."""
     # validate contact number (simple E.164-ish check)
     phone = payload.contact_number.strip()
     if not re.match(r"^\+\d{7,15}$", phone):
         raise HTTPException(status_code=422, detail={"code": "VALIDATION_ERROR", "message": "Invalid contact number", "details": {"contact_number": [{"code": "INVALID_PHONE", "message": "contact_number must be in international format with leading + and digits"}]}})
-    license_norm = payload.license_number.strip().upper()
-    existing = None
-    for d in store.drivers.values():
-        if d.get("license_number") == license_norm and not d.get("deleted"):
-            existing = d
-            break
-    if existing:
-        raise HTTPException(status_code=409, detail={"code": "DUPLICATE_LICENSE", "message": "License number already exists"})
-
-    did = str(uuid4())
     now = datetime.now(timezone.utc)
-    driver = {
-        "id": did,
+    return {
+        "id": str(uuid4()),
         "name": payload.name.strip(),
-        "license_number": license_norm,
+        "license_number": payload.license_number.strip().upper(),
         "contact_number": phone,
         "status": payload.status or "ACTIVE",
         "created_at": now,
         "updated_at": now,
         "deleted": False,
     }
-    store.add_driver(driver)
-    resp = {**driver}
-    resp["created_at"] = serialize_datetime(resp["created_at"])
-    resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+
+
+def duplicate_license() -> HTTPException:
+    return HTTPException(status_code=409, detail={"code": "DUPLICATE_LICENSE", "message": "License number already exists"})
+
+
+@router.get("/drivers")
+def list_drivers(request: Request, limit: int = Query(50, ge=1, le=500), skip: int = Query(0, ge=0), cursor: Optional[str] = None, stream: bool = False, fields: Optional[str] = None, status: Optional[str] = None, include_deleted: bool = False, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    query = {}
+    if not include_deleted:
+        query["deleted"] = False
+    if status:
+        query["status"] = status
+    requested = fields_param(fields, DRIVER_FIELDS)
+    after = cursor_param(cursor)
+    # Weak validators from the collection watermark (count and newest updated_at)
+    validators = list_validators(store.get_watermark("drivers"))
+    if list_not_modified(request, validators):
+        return not_modified(validators)
+    # stream=true or Accept: application/x-ndjson exports every match instead of one page
+    if wants_stream(request, stream):
+        return stream_list(request, DRIVER, store.iter_drivers(query, after=after, batch_size=settings.STREAM_BATCH_SIZE, fields=requested), headers=validators)
+    # created_at and id feed next_cursor even when not requested
+    fetch, hidden = projection_fields(requested, "created_at")
+    items, total = store.list_drivers(query, fields=fetch, **page_query(limit, skip, after))
+    items, pagination = page_result(items, limit, skip, total, after)
+    return render_list(request, DRIVER, (drop_fields(d, hidden) for d in items), pagination, headers=validators)
+
+
+@router.post("/drivers", status_code=201)
+def create_driver(payload: DriverCreate, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    driver = new_driver(payload)
+    # Uniqueness is enforced by the partial unique index on license_number
+    try:
+        store.add_driver(driver)
+    except ValueError:
+        raise duplicate_license()
+    return render_one(DRIVER, driver, status_code=201)
+
+
+@router.post("/drivers:batch")
+def create_drivers_batch(request: Request, items: List[Dict[str, Any]] = Body(..., embed=True), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    check_batch_size(items)
+    results, drivers, positions = prepare_items(items, DriverCreate, new_driver)
+    errors = store.add_drivers_bulk(drivers)
+    return batch_response(request, finish_items(results, drivers, positions, errors, item_conflict))
 
 
 @router.get("/drivers/{did}")
-def get_driver(did: str, response: Response, auth=Depends(require_auth)):
-    d = store.get_driver(did)
+def get_driver(did: str, fields: Optional[str] = None, if_none_match: Optional[str] = Header(None, alias="If-None-Match"), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    # Revalidation reads updated_at alone from the covering version index and
+    # answers 304 without loading or rendering the document
+    if if_none_match:
+        updated_at = store.get_driver_version(did)
+        if updated_at is not None and etag_matches(if_none_match, version_etag(updated_at)):
+            return not_modified({"ETag": version_etag(updated_at)})
+    # deleted and updated_at are always fetched for the 404 check and the ETag
+    fetch, hidden = projection_fields(fields_param(fields, DRIVER_FIELDS), "deleted", "updated_at")
+    d = store.get_driver(did, fetch)
     if not d or d.get("deleted"):
         raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
-    resp = {**d}
-    resp["created_at"] = serialize_datetime(resp["created_at"])
-    resp["updated_at"] = serialize_datetime(resp["updated_at"])
     # ETag
-    response.headers["ETag"] = f'"{resp["updated_at"]}"'
-    return resp
+    etag = f'"{serialize_datetime(d["updated_at"])}"'
+    return render_one(DRIVER, drop_fields(d, hidden), headers={"ETag": etag})
 
 
 @router.patch("/drivers/{did}")
-def patch_driver(did: str, payload: dict, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth)):
+def patch_driver(did: str, payload: dict, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
     if if_match is None:
         raise HTTPException(status_code=412, detail={"code": "MISSING_IF_MATCH", "message": "If-Match header required"})
-    d = store.get_driver(did)
-    if not d or d.get("deleted"):
-        raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
-    current_etag = f'"{serialize_datetime(d["updated_at"])}"'
-    if if_match != current_etag:
-        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
     # If changing status to SUSPENDED, ensure no active assignments
     new_status = payload.get("status")
     if new_status == "SUSPENDED":
+        # If-Match is checked first: a stale ETag is a conflict whatever the assignments
+        current = store.get_driver_version(did)
+        if current is None:
+            raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+        if not if_match_matches(if_match, version_etag(current)):
+            raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
         active = store.list_active_assignments_for_driver(did)
         if active:
             raise HTTPException(status_code=409, detail={"code": "DRIVER_HAS_ACTIVE_ASSIGNMENTS", "message": "Driver has active assignments"})
-    # license change -> check duplicates
+    # Only the fields present in the payload are written
+    updates = {}
     if "license_number" in payload:
-        lic = payload.get("license_number").strip().upper()
-        for other in store.drivers.values():
-            if other.get("license_number") == lic and other.get("id") != did and not other.get("deleted"):
-                raise HTTPException(status_code=409, detail={"code": "DUPLICATE_LICENSE", "message": "License number already exists"})
-        d["license_number"] = lic
-    # apply other fields
+        updates["license_number"] = payload.get("license_number").strip().upper()
     for field in ("name", "contact_number", "status"):
         if field in payload:
             if isinstance(payload[field], str):
-                d[field] = payload[field].strip()
+                updates[field] = payload[field].strip()
             else:
-                d[field] = payload[field]
-    d["updated_at"] = datetime.now(timezone.utc)
-    # Persist updates to MongoDB
-    updates = {k: v for k, v in d.items() if k not in ("created_at", "deleted")}
-    resp = store.update_driver(did, updates)
-    if resp:
-        resp["created_at"] = serialize_datetime(resp["created_at"])
-        resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+                updates[field] = payload[field]
+    # Compare-and-set on updated_at; the license index rejects duplicates
+    expected = parse_etag(if_match)
+    updates["updated_at"] = next_updated_at(expected)
+    try:
+        resp = store.update_driver_if_match(did, expected, updates) if expected else None
+    except ValueError:
+        raise duplicate_license()
+    if resp is None:
+        d = store.get_driver(did)
+        if not d or d.get("deleted"):
+            raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
+    return render_one(DRIVER, resp)
 
 
 @router.delete("/drivers/{did}", status_code=204)
-def delete_driver(did: str, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth)):
+def delete_driver(did: str, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
     if if_match is None:
         raise HTTPException(status_code=412, detail={"code": "MISSING_IF_MATCH", "message": "If-Match header required"})
     d = store.get_driver(did)
     if not d or d.get("deleted"):
         raise HTTPException(status_code=404, detail={"code": "DRIVER_NOT_FOUND", "message": "Driver not found"})
+    # If-Match uses strong comparison, so a weak ETag never matches
+    if is_weak(if_match):
+        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
     active = store.list_active_assignments_for_driver(did)
     if active:
         raise HTTPException(status_code=409, detail={"code": "DRIVER_HAS_ACTIVE_ASSIGNMENTS", "message": "Driver has active assignments"})
-    d["deleted"] = True
+    store.soft_delete_driver(did)
     return Response(status_code=204)
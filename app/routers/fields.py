@@ -0,0 +1,37 @@
+"""Sparse fieldsets: the fields= query parameter and the projection it becomes."""
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+
+VEHICLE_FIELDS = ("id", "plate_number", "model", "year", "type", "fuel_type", "status", "created_at", "updated_at", "deleted")
+DRIVER_FIELDS = ("id", "name", "license_number", "contact_number", "status", "created_at", "updated_at", "deleted")
+ASSIGNMENT_FIELDS = ("id", "driver_id", "vehicle_id", "start_datetime", "end_datetime", "notes", "created_at", "updated_at")
+
+
+def fields_param(fields: Optional[str], allowed: Tuple[str, ...]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= value; id is always included. Raises 422 on unknown names.
+
+    Fields come back in the order of allowed whatever order the client sent,
+    so every permutation maps to the same projection and encoder shape.
+    """
+    if fields is None:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in allowed]
+    if unknown or not names:
+        raise HTTPException(status_code=422, detail={"code": "VALIDATION_ERROR", "message": "Invalid fields", "details": {"fields": [{"code": "INVALID_FIELD", "message": f"fields must be a comma-separated subset of: {', '.join(allowed)}"}]}})
+    requested = set(names)
+    return [field for field in allowed if field == "id" or field in requested]
+
+
+def projection_fields(requested: Optional[List[str]], *needed: str) -> Tuple[Optional[List[str]], Tuple[str, ...]]:
+    """Fields to fetch for a request, plus those the route reads itself but must not return."""
+    if requested is None:
+        return None, ()
+    hidden = tuple(f for f in needed if f not in requested)
+    return requested + list(hidden), hidden
+
+
+def drop_fields(doc: Dict, hidden: Tuple[str, ...]) -> Dict:
+    for field in hidden:
+        doc.pop(field, None)
+    return doc
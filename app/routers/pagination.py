@@ -0,0 +1,37 @@
+"""Offset and keyset pagination shared by the list endpoints."""
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+
+from app.utils import decode_cursor, encode_cursor
+
+
+def cursor_param(cursor: Optional[str]) -> Optional[tuple]:
+    """Decode the cursor query parameter; raises 422 when it is not a valid token."""
+    if cursor is None:
+        return None
+    after = decode_cursor(cursor)
+    if after is None:
+        raise HTTPException(status_code=422, detail={"code": "VALIDATION_ERROR", "message": "Invalid cursor", "details": {"cursor": [{"code": "INVALID_CURSOR", "message": "cursor must be a next_cursor value returned by this endpoint"}]}})
+    return after
+
+
+def page_query(limit: int, skip: int, after: Optional[tuple]) -> Dict:
+    """Storage list_* keyword arguments for one page.
+
+    Keyset pages fetch one extra row to detect has_more and skip the count.
+    """
+    if after:
+        return {"limit": limit + 1, "after": after, "with_total": False}
+    return {"limit": limit, "skip": skip}
+
+
+def page_result(items: List[Dict], limit: int, skip: int, total: Optional[int], after: Optional[tuple]) -> tuple:
+    """Trim a fetched page and build its pagination envelope with next_cursor."""
+    if after:
+        has_more = len(items) > limit
+        items = items[:limit]
+        skip = 0
+    else:
+        has_more = skip + len(items) < total
+    next_cursor = encode_cursor(items[-1]) if has_more and items else None
+    return items, {"total": total, "limit": limit, "skip": skip, "has_more": has_more, "next_cursor": next_cursor}
@@ -0,0 +1,98 @@
+"""Chunked JSON and NDJSON bodies for streamed list endpoints.
+
+A streamed list walks the whole result set instead of one page: the cursor
+is read in STREAM_BATCH_SIZE batches and each batch is encoded and written
+before the next one is fetched, so memory stays bounded by one batch.
+"""
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.errors import make_meta
+from app.serialization import EntityEncoder, dumps
+from app.timing import timed_serialization
+
+NDJSON = "application/x-ndjson"
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    """True when the client asked for ?stream=true or an NDJSON body."""
+    return stream or NDJSON in request.headers.get("accept", "")
+
+
+@timed_serialization
+def _json_chunk(encoder: EntityEncoder, batch: List[Dict], first: bool) -> bytes:
+    body = ",".join(encoder.encode(doc) for doc in batch)
+    return (body if first else "," + body).encode("utf-8")
+
+
+@timed_serialization
+def _ndjson_chunk(encoder: EntityEncoder, batch: List[Dict]) -> bytes:
+    return "".join(encoder.encode(doc) + "\n" for doc in batch).encode("utf-8")
+
+
+def _batches(docs: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _abatches(docs: AsyncIterator[Dict], size: int) -> AsyncIterator[List[Dict]]:
+    batch = []
+    async for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _json_body(request: Request, encoder: EntityEncoder, docs: Iterable[Dict]) -> Iterator[bytes]:
+    yield b'{"success":true,"data":['
+    first = True
+    for batch in _batches(docs, settings.STREAM_BATCH_SIZE):
+        yield _json_chunk(encoder, batch, first)
+        first = False
+    yield ('],"meta":' + dumps(make_meta(request)) + "}").encode("utf-8")
+
+
+def _ndjson_body(encoder: EntityEncoder, docs: Iterable[Dict]) -> Iterator[bytes]:
+    for batch in _batches(docs, settings.STREAM_BATCH_SIZE):
+        yield _ndjson_chunk(encoder, batch)
+
+
+async def _ajson_body(request: Request, encoder: EntityEncoder, docs: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    yield b'{"success":true,"data":['
+    first = True
+    async for batch in _abatches(docs, settings.STREAM_BATCH_SIZE):
+        yield _json_chunk(encoder, batch, first)
+        first = False
+    yield ('],"meta":' + dumps(make_meta(request)) + "}").encode("utf-8")
+
+
+async def _andjson_body(encoder: EntityEncoder, docs: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    async for batch in _abatches(docs, settings.STREAM_BATCH_SIZE):
+        yield _ndjson_chunk(encoder, batch)
+
+
+def stream_list(request: Request, encoder: EntityEncoder, docs: Union[Iterable[Dict], AsyncIterator[Dict]],
+                headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Stream docs as NDJSON when the client accepts it, else as the usual list envelope.
+
+    docs may be a storage iterator or async iterator; the JSON envelope carries
+    no pagination block because the whole result set is returned.
+    """
+    ndjson = NDJSON in request.headers.get("accept", "")
+    if hasattr(docs, "__aiter__"):
+        body = _andjson_body(encoder, docs) if ndjson else _ajson_body(request, encoder, docs)
+    else:
+        body = _ndjson_body(encoder, docs) if ndjson else _json_body(request, encoder, docs)
+    return StreamingResponse(body, headers=headers, media_type=NDJSON if ndjson else "application/json")
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException, Header, Request, Response, status, Depends
-from typing import Optional
+from fastapi import APIRouter, Body, HTTPException, Header, Request, Response, status, Depends, Query
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 from datetime import datetime, timezone
 
-from app.schemas import VehicleCreate, Vehicle
-from app.storage import store
-from app.utils import now_utc_iso, make_etag, normalize_plate, serialize_datetime
+from app.config import settings
+from app.schemas import VehicleCreate
+from app.storage import get_store, StorageAdapter
+from app.routers.batch import batch_response, check_batch_size, finish_items, item_conflict, prepare_items
+from app.routers.conditional import etag_matches, if_match_matches, is_weak, list_not_modified, list_validators, not_modified, version_etag
+from app.routers.streaming import stream_list, wants_stream
+from app.routers.fields import VEHICLE_FIELDS, drop_fields, fields_param, projection_fields
+from app.serialization import VEHICLE, render_list, render_one
+from app.routers.pagination import cursor_param, page_query, page_result
+from app.utils import make_etag, parse_etag, next_updated_at, normalize_plate, serialize_datetime
 
 router = APIRouter()
 
@@ -16,34 +23,13 @@ def require_auth(authorization: Optional[str] = Header(None)):
     return authorization
 
 
-@router.get("/vehicles")
-def list_vehicles(request: Request, limit: int = 50, skip: int = 0, status: Optional[str] = None, include_deleted: bool = False, auth=Depends(require_auth)):
-    all_vehicles = [v for v in store.vehicles.values() if include_deleted or not v.get("deleted")]
-    if status:
-        all_vehicles = [v for v in all_vehicles if v.get("status") == status]
-    total = len(all_vehicles)
-    sliced = all_vehicles[skip: skip + limit]
-    data = []
-    for v in sliced:
-        item = {**v}
-        item["created_at"] = serialize_datetime(item["created_at"])
-        item["updated_at"] = serialize_datetime(item["updated_at"])
-        data.append(item)
-    has_more = skip + len(sliced) < total
-    return {"success": True, "data": data, "pagination": {"total": total, "limit": limit, "skip": skip, "has_more": has_more}, "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "request_id": getattr(request.state, 'request_id', None), "correlation_id": getattr(request.state, 'correlation_id', None)}}
-
-
-@router.post("/vehicles", status_code=201)
-def create_vehicle(payload: VehicleCreate, auth=Depends(require_auth)):
-    plate_norm = normalize_plate(payload.plate_number)
-    # validate alnum/no whitespace already in schema validator
-    if store.find_vehicle_by_plate(plate_norm):
-        raise HTTPException(status_code=409, detail={"code": "DUPLICATE_PLATE", "message": "Plate already exists"})
-    vid = str(uuid4())
+def new_vehicle(payload: VehicleCreate) -> Dict:
+    """Build the stored document for a validated create payload."""
     now = datetime.now(timezone.utc)
-    vehicle = {
-        "id": vid,
-        "plate_number": plate_norm,
+    # validate alnum/no whitespace already in schema validator
+    return {
+        "id": str(uuid4()),
+        "plate_number": normalize_plate(payload.plate_number),
         "model": payload.model.strip(),
         "year": payload.year,
         "type": payload.type,
@@ -53,71 +39,121 @@ def create_vehicle(payload: VehicleCreate, auth=Depends(require_auth)):
         "updated_at": now,
         "deleted": False,
     }
-    store.add_vehicle(vehicle)
-    # prepare response
-    resp = {**vehicle}
-    # ISO format for datetimes
-    resp["created_at"] = serialize_datetime(resp["created_at"])
-    resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+
+
+def duplicate_plate() -> HTTPException:
+    return HTTPException(status_code=409, detail={"code": "DUPLICATE_PLATE", "message": "Plate already exists"})
+
+
+@router.get("/vehicles")
+def list_vehicles(request: Request, limit: int = Query(50, ge=1, le=500), skip: int = Query(0, ge=0), cursor: Optional[str] = None, stream: bool = False, fields: Optional[str] = None, status: Optional[str] = None, include_deleted: bool = False, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    query = {}
+    if not include_deleted:
+        query["deleted"] = False
+    if status:
+        query["status"] = status
+    # cursor switches to keyset pagination; skip/limit offsets stay supported
+    requested = fields_param(fields, VEHICLE_FIELDS)
+    after = cursor_param(cursor)
+    # Weak validators from the collection watermark (count and newest updated_at)
+    validators = list_validators(store.get_watermark("vehicles"))
+    if list_not_modified(request, validators):
+        return not_modified(validators)
+    # stream=true or Accept: application/x-ndjson exports every match instead of one page
+    if wants_stream(request, stream):
+        return stream_list(request, VEHICLE, store.iter_vehicles(query, after=after, batch_size=settings.STREAM_BATCH_SIZE, fields=requested), headers=validators)
+    # created_at and id feed next_cursor even when not requested
+    fetch, hidden = projection_fields(requested, "created_at")
+    sliced, total = store.list_vehicles(query, fields=fetch, **page_query(limit, skip, after))
+    sliced, pagination = page_result(sliced, limit, skip, total, after)
+    return render_list(request, VEHICLE, (drop_fields(v, hidden) for v in sliced), pagination, headers=validators)
+
+
+@router.post("/vehicles", status_code=201)
+def create_vehicle(payload: VehicleCreate, auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    vehicle = new_vehicle(payload)
+    # Uniqueness is enforced by the partial unique index on plate_number
+    try:
+        store.add_vehicle(vehicle)
+    except ValueError:
+        raise duplicate_plate()
+    return render_one(VEHICLE, vehicle, status_code=201)
+
+
+@router.post("/vehicles:batch")
+def create_vehicles_batch(request: Request, items: List[Dict[str, Any]] = Body(..., embed=True), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    check_batch_size(items)
+    results, vehicles, positions = prepare_items(items, VehicleCreate, new_vehicle)
+    errors = store.add_vehicles_bulk(vehicles)
+    return batch_response(request, finish_items(results, vehicles, positions, errors, item_conflict))
+
 
 @router.get("/vehicles/{vid}")
-def get_vehicle(vid: str, response: Response, auth=Depends(require_auth)):
-    v = store.get_vehicle(vid)
+def get_vehicle(vid: str, fields: Optional[str] = None, if_none_match: Optional[str] = Header(None, alias="If-None-Match"), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
+    # Revalidation reads updated_at alone from the covering version index and
+    # answers 304 without loading or rendering the document
+    if if_none_match:
+        updated_at = store.get_vehicle_version(vid)
+        if updated_at is not None and etag_matches(if_none_match, version_etag(updated_at)):
+            return not_modified({"ETag": version_etag(updated_at)})
+    # deleted and updated_at are always fetched for the 404 check and the ETag
+    fetch, hidden = projection_fields(fields_param(fields, VEHICLE_FIELDS), "deleted", "updated_at")
+    v = store.get_vehicle(vid, fetch)
     if not v or v.get("deleted"):
         raise HTTPException(status_code=404, detail={"code": "VEHICLE_NOT_FOUND", "message": "Vehicle not found"})
-    resp = {**v}
-    resp["created_at"] = serialize_datetime(resp["created_at"])
-    resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    etag = make_etag(resp["updated_at"])
-    response.headers["ETag"] = etag
-    return resp
+    etag = make_etag(serialize_datetime(v["updated_at"]))
+    return render_one(VEHICLE, drop_fields(v, hidden), headers={"ETag": etag})
 
 
 @router.patch("/vehicles/{vid}")
-def patch_vehicle(vid: str, payload: dict, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth)):
+def patch_vehicle(vid: str, payload: dict, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
     # Require If-Match header
     if if_match is None:
         raise HTTPException(status_code=412, detail={"code": "MISSING_IF_MATCH", "message": "If-Match header required"})
-    v = store.get_vehicle(vid)
-    if not v or v.get("deleted"):
-        raise HTTPException(status_code=404, detail={"code": "VEHICLE_NOT_FOUND", "message": "Vehicle not found"})
-    current_etag = make_etag(serialize_datetime(v["updated_at"]))
-    if if_match != current_etag:
-        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
     # Business rule: cannot set to INACTIVE or MAINTENANCE if assigned
     new_status = payload.get("status")
     if new_status in ("INACTIVE", "MAINTENANCE"):
+        # If-Match is checked first: a stale ETag is a conflict whatever the assignments
+        current = store.get_vehicle_version(vid)
+        if current is None:
+            raise HTTPException(status_code=404, detail={"code": "VEHICLE_NOT_FOUND", "message": "Vehicle not found"})
+        if not if_match_matches(if_match, version_etag(current)):
+            raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
         active_assigns = store.list_active_assignments_for_vehicle(vid)
         if active_assigns:
             raise HTTPException(status_code=409, detail={"code": "VEHICLE_HAS_ACTIVE_ASSIGNMENTS", "message": "Vehicle has active assignments"})
-    # handle plate change
+    # Only the fields present in the payload are written
+    updates = {}
     if "plate_number" in payload:
-        plate_norm = normalize_plate(payload.get("plate_number"))
-        existing = store.find_vehicle_by_plate(plate_norm)
-        if existing and existing["id"] != vid:
-            raise HTTPException(status_code=409, detail={"code": "DUPLICATE_PLATE", "message": "Plate already exists"})
-        v["plate_number"] = plate_norm
+        updates["plate_number"] = normalize_plate(payload.get("plate_number"))
     for field in ("model", "year", "type", "fuel_type", "status"):
         if field in payload:
-            v[field] = payload[field]
-    v["updated_at"] = datetime.now(timezone.utc)
-    # Persist updates to MongoDB
-    updates = {k: v_val for k, v_val in v.items() if k not in ("created_at", "deleted")}
-    resp = store.update_vehicle(vid, updates)
-    if resp:
-        resp["created_at"] = serialize_datetime(resp["created_at"])
-        resp["updated_at"] = serialize_datetime(resp["updated_at"])
-    return resp
+            updates[field] = payload[field]
+    # Compare-and-set on updated_at; the plate index rejects duplicates
+    expected = parse_etag(if_match)
+    updates["updated_at"] = next_updated_at(expected)
+    try:
+        resp = store.update_vehicle_if_match(vid, expected, updates) if expected else None
+    except ValueError:
+        raise duplicate_plate()
+    if resp is None:
+        v = store.get_vehicle(vid)
+        if not v or v.get("deleted"):
+            raise HTTPException(status_code=404, detail={"code": "VEHICLE_NOT_FOUND", "message": "Vehicle not found"})
+        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
+    return render_one(VEHICLE, resp)
 
 
 @router.delete("/vehicles/{vid}", status_code=204)
-def delete_vehicle(vid: str, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth)):
+def delete_vehicle(vid: str, if_match: Optional[str] = Header(None, alias="If-Match"), auth=Depends(require_auth), store: StorageAdapter = Depends(get_store)):
     if if_match is None:
         raise HTTPException(status_code=412, detail={"code": "MISSING_IF_MATCH", "message": "If-Match header required"})
     v = store.get_vehicle(vid)
     if not v or v.get("deleted"):
         raise HTTPException(status_code=404, detail={"code": "VEHICLE_NOT_FOUND", "message": "Vehicle not found"})
+    # If-Match uses strong comparison, so a weak ETag never matches
+    if is_weak(if_match):
+        raise HTTPException(status_code=409, detail={"code": "CONCURRENCY_CONFLICT", "message": "ETag mismatch"})
     # check active assignments
     active = store.list_active_assignments_for_vehicle(vid)
     if active:
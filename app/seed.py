@@ -0,0 +1,277 @@
+"""Synthetic fleet data generator: ``python -m app.seed``.
+
+Writes valid vehicles, drivers and assignments straight to MongoDB, far
+faster than driving the HTTP API. Every document is a pure function of
+--seed, --as-of and its index: ids come from a hash of (seed, kind,
+index) and the other fields from a random.Random per fixed-size chunk. The
+same arguments therefore produce the same data whatever --workers is.
+
+Chunks are generated in parallel worker processes, each writing through
+unordered insert_many. When the target collections are empty (or --drop is
+given) their indexes are dropped before loading and built once afterwards
+by ensure_indexes, instead of being maintained on every insert. List
+ETags follow the new document counts, so cached lists are revalidated.
+
+Assignment histories never overlap: assignments are laid out in
+consecutive time windows, and within a window every driver and every
+vehicle appears at most once. Only the last window holds ongoing
+assignments, and only for active, non-deleted drivers and vehicles.
+
+    python -m app.seed --vehicles 1000000 --drivers 800000 --assignments 3000000 --drop
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.storage.mongo import _with_ongoing_flag, ensure_indexes
+from app.utils import truncate_to_milliseconds
+
+logger = logging.getLogger("app.seed")
+
+COLLECTIONS = ("vehicles", "drivers", "assignments")
+# Documents generated per task; fixed so the output does not depend on --workers
+CHUNK_SIZE = 10_000
+
+VEHICLE_TYPES = (("SEDAN", 45), ("SUV", 25), ("VAN", 18), ("TRUCK", 12))
+MODELS = {
+    "SEDAN": ("Corolla", "Civic", "Model 3", "Elantra", "Sentra"),
+    "SUV": ("RAV4", "CR-V", "Tucson", "Model Y", "Explorer"),
+    "VAN": ("Transit", "Sprinter", "ProMaster", "Express"),
+    "TRUCK": ("F-150", "Silverado", "Hilux", "Ram 1500"),
+}
+FUEL_TYPES = (("GASOLINE", 55), ("DIESEL", 20), ("HYBRID", 15), ("ELECTRIC", 10))
+VEHICLE_STATUSES = (("ACTIVE", 85), ("MAINTENANCE", 10), ("INACTIVE", 5))
+DRIVER_STATUSES = (("ACTIVE", 94), ("SUSPENDED", 6))
+FIRST_NAMES = ("Ana", "Luis", "Maria", "John", "Wei", "Fatima", "Carlos", "Priya", "Olga", "Kwame", "Sofia", "Ahmed", "Lucia", "Kenji", "Emma", "Diego")
+LAST_NAMES = ("Garcia", "Smith", "Chen", "Khan", "Lopez", "Ivanova", "Mensah", "Rossi", "Tanaka", "Silva", "Novak", "Haddad", "Brown", "Patel")
+NOTES = ("Airport run", "Night shift", "Delivery route", "Client visit", "Training", "Long haul")
+
+# Plate space: three letters and four digits, walked by a stride coprime with its size
+_PLATE_SPACE = 26 ** 3 * 10 ** 4
+_LICENSE_SPACE = 10 ** 8
+_STRIDE = 7919
+
+
+def _hash(seed: int, kind: str, index: int) -> bytes:
+    return hashlib.blake2b(f"{seed}:{kind}:{index}".encode(), digest_size=16).digest()
+
+
+def _pick(weighted: Tuple[Tuple[str, int], ...], roll: int) -> str:
+    """Choose from (value, weight) pairs with roll in 0..99."""
+    for value, weight in weighted:
+        if roll < weight:
+            return value
+        roll -= weight
+    return weighted[-1][0]
+
+
+def vehicle_traits(seed: int, index: int, deleted_ratio: float) -> Tuple[str, str, bool]:
+    """(id, status, deleted) of a vehicle, computable without generating it."""
+    digest = _hash(seed, "vehicle", index)
+    deleted = int.from_bytes(digest[12:16], "big") / 2 ** 32 < deleted_ratio
+    return str(uuid.UUID(bytes=digest, version=4)), _pick(VEHICLE_STATUSES, digest[10] % 100), deleted
+
+
+def driver_traits(seed: int, index: int, deleted_ratio: float) -> Tuple[str, str, bool]:
+    digest = _hash(seed, "driver", index)
+    deleted = int.from_bytes(digest[12:16], "big") / 2 ** 32 < deleted_ratio
+    return str(uuid.UUID(bytes=digest, version=4)), _pick(DRIVER_STATUSES, digest[10] % 100), deleted
+
+
+def plate_number(seed: int, index: int) -> str:
+    """Unique plate (AAA0000 form) for indexes below 175,760,000."""
+    value = (index * _STRIDE + seed) % _PLATE_SPACE
+    letters, digits = divmod(value, 10 ** 4)
+    return "".join(chr(65 + letters // 26 ** power % 26) for power in (2, 1, 0)) + f"{digits:04d}"
+
+
+def license_number(seed: int, index: int) -> str:
+    """Unique license (DL + 8 digits) for indexes below 100,000,000."""
+    return f"DL{(index * _STRIDE + seed) % _LICENSE_SPACE:08d}"
+
+
+class Plan:
+    """Sizes, time span and ratios shared by the generator and every worker."""
+
+    def __init__(self, seed: int, vehicles: int, drivers: int, assignments: int, as_of: datetime, history_days: int = 365,
+                 deleted_ratio: float = 0.01, active_ratio: float = 0.6):
+        self.seed = seed
+        self.vehicles = vehicles
+        self.drivers = drivers
+        self.assignments = assignments if vehicles and drivers else 0
+        self.as_of = as_of
+        self.span = timedelta(days=history_days)
+        self.deleted_ratio = deleted_ratio
+        self.active_ratio = active_ratio
+        # Assignments per time window: each driver and vehicle at most once
+        self.per_window = min(vehicles, drivers) or 1
+        self.windows = max(math.ceil(self.assignments / self.per_window), 1)
+        self.window = self.span / self.windows
+
+    def _created_at(self, index: int, count: int, rng: random.Random) -> datetime:
+        # Spread creation over the history span in index order
+        start = self.as_of - self.span * 1.2
+        return truncate_to_milliseconds(start + self.span * 0.2 * index / max(count, 1) + timedelta(seconds=rng.random()))
+
+    def vehicle(self, index: int, rng: random.Random) -> Dict:
+        vid, status, deleted = vehicle_traits(self.seed, index, self.deleted_ratio)
+        vehicle_type = _pick(VEHICLE_TYPES, rng.randrange(100))
+        year = self.as_of.year - min(int(rng.expovariate(1 / 5)), 20)
+        fuel = "ELECTRIC" if year >= self.as_of.year - 5 and rng.random() < 0.15 else _pick(FUEL_TYPES, rng.randrange(100))
+        created_at = self._created_at(index, self.vehicles, rng)
+        updated_at = truncate_to_milliseconds(min(created_at + timedelta(days=rng.uniform(0, 120)), self.as_of))
+        return {"id": vid, "plate_number": plate_number(self.seed, index), "model": rng.choice(MODELS[vehicle_type]), "year": year,
+                "type": vehicle_type, "fuel_type": fuel, "status": status, "created_at": created_at, "updated_at": updated_at, "deleted": deleted}
+
+    def driver(self, index: int, rng: random.Random) -> Dict:
+        did, status, deleted = driver_traits(self.seed, index, self.deleted_ratio)
+        created_at = self._created_at(index, self.drivers, rng)
+        updated_at = truncate_to_milliseconds(min(created_at + timedelta(days=rng.uniform(0, 120)), self.as_of))
+        return {"id": did, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "license_number": license_number(self.seed, index),
+                "contact_number": f"+1{rng.randrange(2_000_000_000, 9_999_999_999)}", "status": status, "created_at": created_at, "updated_at": updated_at, "deleted": deleted}
+
+    def assignment(self, index: int, rng: random.Random) -> Dict:
+        window, slot = divmod(index, self.per_window)
+        # Within a window, slot -> vehicle and slot -> driver are both injective
+        vid, vehicle_status, vehicle_deleted = vehicle_traits(self.seed, (slot + window * _STRIDE) % self.vehicles, self.deleted_ratio)
+        did, driver_status, driver_deleted = driver_traits(self.seed, (slot + window * 104_729) % self.drivers, self.deleted_ratio)
+        window_start = self.as_of - self.span + self.window * window
+        start = truncate_to_milliseconds(window_start + self.window * rng.uniform(0, 0.2))
+        end = truncate_to_milliseconds(start + self.window * rng.uniform(0.3, 0.75))
+        can_hold = vehicle_status == "ACTIVE" and driver_status == "ACTIVE" and not vehicle_deleted and not driver_deleted
+        if window == self.windows - 1 and can_hold and rng.random() < self.active_ratio:
+            end = None
+        return _with_ongoing_flag({
+            "id": str(uuid.UUID(bytes=_hash(self.seed, "assignment", index), version=4)), "driver_id": did, "vehicle_id": vid,
+            "start_datetime": start, "end_datetime": end, "notes": rng.choice(NOTES) if rng.random() < 0.2 else None,
+            "created_at": start, "updated_at": end or start,
+        })
+
+    def chunks(self) -> Iterator[Tuple[str, int, int]]:
+        """(collection, first index, count) tasks covering every document."""
+        for collection, total in (("vehicles", self.vehicles), ("drivers", self.drivers), ("assignments", self.assignments)):
+            for first in range(0, total, CHUNK_SIZE):
+                yield collection, first, min(CHUNK_SIZE, total - first)
+
+    def generate(self, collection: str, first: int, count: int) -> List[Dict]:
+        rng = random.Random(f"{self.seed}:{collection}:{first}")
+        build = {"vehicles": self.vehicle, "drivers": self.driver, "assignments": self.assignment}[collection]
+        return [build(index, rng) for index in range(first, first + count)]
+
+
+# Per worker process: the plan, batch size and database handle set by _init_worker
+_plan: Optional[Plan] = None
+_batch_size = 0
+_db = None
+
+
+def _open_db():
+    from pymongo import MongoClient
+    from app.storage.pool import client_options
+    client = MongoClient(settings.MONGODB_URI, **{**client_options(), "minPoolSize": 0})
+    return client[settings.DATABASE_NAME]
+
+
+def _init_worker(plan: Plan, batch_size: int):
+    global _plan, _batch_size, _db
+    _plan, _batch_size = plan, batch_size
+    _db = _open_db()
+
+
+def _insert(db, plan: Plan, batch_size: int, task: Tuple[str, int, int]) -> Tuple[str, int, int]:
+    """Generate one chunk and write it with unordered insert_many; returns (collection, inserted, rejected)."""
+    from pymongo.errors import BulkWriteError
+    collection, first, count = task
+    docs = plan.generate(collection, first, count)
+    inserted = rejected = 0
+    for offset in range(0, len(docs), batch_size):
+        batch = docs[offset:offset + batch_size]
+        try:
+            inserted += len(db[collection].insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            failed = len(e.details.get("writeErrors", []))
+            inserted += len(batch) - failed
+            rejected += failed
+    return collection, inserted, rejected
+
+
+def _run_task(task: Tuple[str, int, int]) -> Tuple[str, int, int]:
+    return _insert(_db, _plan, _batch_size, task)
+
+
+def seed(db, plan: Plan, workers: int, batch_size: int, drop: bool = False) -> Dict:
+    """Load plan into db; workers=0 writes from this process. Returns per-collection counts."""
+    if drop:
+        for collection in COLLECTIONS:
+            db.drop_collection(collection)
+    # Defer index builds only when nothing already relies on them
+    deferred = all(db[collection].estimated_document_count() == 0 for collection in COLLECTIONS)
+    if deferred:
+        for collection in COLLECTIONS:
+            db[collection].drop_indexes()
+    counts = {collection: {"inserted": 0, "rejected": 0} for collection in COLLECTIONS}
+    started = time.perf_counter()
+    tasks = list(plan.chunks())
+    # An interrupted or failed load still gets its unique indexes back
+    try:
+        if workers:
+            with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(plan, batch_size)) as pool:
+                results = pool.imap_unordered(_run_task, tasks)
+                for done, (collection, inserted, rejected) in enumerate(results, 1):
+                    counts[collection]["inserted"] += inserted
+                    counts[collection]["rejected"] += rejected
+                    logger.info("%d/%d chunks, %s +%d", done, len(tasks), collection, inserted)
+        else:
+            for task in tasks:
+                collection, inserted, rejected = _insert(db, plan, batch_size, task)
+                counts[collection]["inserted"] += inserted
+                counts[collection]["rejected"] += rejected
+    finally:
+        loaded = time.perf_counter()
+        if deferred:
+            ensure_indexes(db)
+    total = sum(count["inserted"] for count in counts.values())
+    return {**counts, "deferred_indexes": deferred, "load_seconds": round(loaded - started, 3), "index_seconds": round(time.perf_counter() - loaded, 3),
+            "docs_per_second": round(total / max(loaded - started, 1e-9))}
+
+
+def _as_of(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.seed", description=__doc__.splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=10_000)
+    parser.add_argument("--drivers", type=int, default=8_000)
+    parser.add_argument("--assignments", type=int, default=30_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--as-of", type=_as_of, help="ISO timestamp the history ends at (default: now); fix it for byte-identical reruns")
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--deleted-ratio", type=float, default=0.01, help="share of soft-deleted vehicles and drivers")
+    parser.add_argument("--active-ratio", type=float, default=0.6, help="share of eligible pairs in the last window left ongoing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="generator processes; 0 writes from this process")
+    parser.add_argument("--batch-size", type=int, default=5_000, help="documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="drop vehicles, drivers and assignments first")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if settings.STORAGE_BACKEND == "memory":
+        parser.error("STORAGE_BACKEND=memory keeps data inside the server process; seed a MongoDB database instead")
+    as_of = truncate_to_milliseconds(args.as_of or datetime.now(timezone.utc))
+    plan = Plan(args.seed, args.vehicles, args.drivers, args.assignments, as_of, args.history_days, args.deleted_ratio, args.active_ratio)
+    report = seed(_open_db(), plan, args.workers, args.batch_size, args.drop)
+    print(json.dumps({"database": settings.DATABASE_NAME, "seed": args.seed, "as_of": as_of.isoformat(), **report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
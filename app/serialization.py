@@ -0,0 +1,112 @@
+"""Response rendering with JSON encoders compiled once per entity shape.
+
+Routes hand Mongo documents straight to an EntityEncoder, which renders each
+one to JSON text in a single pass and returns a ready Response, bypassing
+FastAPI's jsonable_encoder walk. Encoders generate a specialised function the
+first time they see a field layout (full documents, or a sparse fieldset) and
+reuse it for every later document with the same keys. At most MAX_SHAPES
+layouts are compiled per entity; documents of any other layout go through
+dumps, so unexpected key orders cannot grow the compiled set without bound.
+"""
+import json
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import Request, Response
+
+from app.errors import make_meta
+from app.timing import timed_serialization
+from app.utils import serialize_datetime
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return serialize_datetime(obj)
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+dumps: Callable[[object], str] = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), check_circular=False, default=_default).encode
+
+
+def _iso(dt: datetime) -> str:
+    # Mongo returns naive UTC datetimes; same output as serialize_datetime
+    return dt.isoformat() + "+00:00" if dt.tzinfo is None else dt.isoformat()
+
+
+# Inline expression per field kind; anything unexpected falls back to dumps
+_KIND_EXPR = {
+    "str": "(_s({v}) if {v}.__class__ is str else 'null' if {v} is None else _dumps({v}))",
+    "int": "(str({v}) if {v}.__class__ is int else 'null' if {v} is None else _dumps({v}))",
+    "bool": "('true' if {v} is True else 'false' if {v} is False else _dumps({v}))",
+    "datetime": "('\"' + _iso({v}) + '\"' if {v}.__class__ is datetime else 'null' if {v} is None else _dumps({v}))",
+}
+# Compiled layouts kept per entity: full documents and the usual sparse fieldsets
+MAX_SHAPES = 64
+_NAMESPACE = {"_s": encode_basestring, "_dumps": dumps, "_iso": _iso, "datetime": datetime}
+
+
+class EntityEncoder:
+    """Renders documents of one entity type, compiling a function per field layout."""
+
+    def __init__(self, name: str, kinds: Dict[str, str]):
+        self.name = name
+        self.kinds = kinds
+        self._compiled: Dict[Tuple[str, ...], Callable[[Dict], str]] = {}
+
+    def _compile(self, shape: Tuple[str, ...]) -> Callable[[Dict], str]:
+        if not shape:
+            return lambda doc: "{}"
+        names = [f"v{i}" for i in range(len(shape))]
+        parts = []
+        for i, (field, var) in enumerate(zip(shape, names)):
+            prefix = ("{" if i == 0 else ",") + encode_basestring(field) + ":"
+            expr = _KIND_EXPR.get(self.kinds.get(field), "_dumps({v})").format(v=var)
+            parts.append(f"{prefix!r}, {expr}")
+        source = f"def encode_{self.name}(d):\n    {', '.join(names)}, = d.values()\n    return ''.join(({', '.join(parts)}, '}}'))\n"
+        namespace = dict(_NAMESPACE)
+        exec(source, namespace)
+        fn = self._compiled[shape] = namespace[f"encode_{self.name}"]
+        return fn
+
+    def encode(self, doc: Dict) -> str:
+        shape = tuple(doc)
+        fn = self._compiled.get(shape)
+        if fn is None:
+            if len(self._compiled) >= MAX_SHAPES:
+                return dumps(doc)
+            fn = self._compile(shape)
+        return fn(doc)
+
+    def encode_many(self, docs: Iterable[Dict]) -> str:
+        return "[" + ",".join(self.encode(doc) for doc in docs) + "]"
+
+
+VEHICLE = EntityEncoder("vehicle", {
+    "id": "str", "plate_number": "str", "model": "str", "year": "int", "type": "str", "fuel_type": "str", "status": "str",
+    "created_at": "datetime", "updated_at": "datetime", "deleted": "bool",
+})
+DRIVER = EntityEncoder("driver", {
+    "id": "str", "name": "str", "license_number": "str", "contact_number": "str", "status": "str",
+    "created_at": "datetime", "updated_at": "datetime", "deleted": "bool",
+})
+ASSIGNMENT = EntityEncoder("assignment", {
+    "id": "str", "driver_id": "str", "vehicle_id": "str", "start_datetime": "datetime", "end_datetime": "datetime", "notes": "str",
+    "created_at": "datetime", "updated_at": "datetime",
+})
+
+
+@timed_serialization
+def render_one(encoder: EntityEncoder, doc: Dict, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Pre-rendered response for a single document."""
+    return Response(encoder.encode(doc).encode("utf-8"), status_code=status_code, headers=headers, media_type="application/json")
+
+
+@timed_serialization
+def render_list(request: Request, encoder: EntityEncoder, docs: Iterable[Dict], pagination: Dict, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Pre-rendered {success, data, pagination, meta} list envelope."""
+    body = '{"success":true,"data":' + encoder.encode_many(docs) + ',"pagination":' + dumps(pagination) + ',"meta":' + dumps(make_meta(request)) + "}"
+    return Response(body.encode("utf-8"), headers=headers, media_type="application/json")
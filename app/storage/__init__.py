@@ -1,29 +1,106 @@
 # Storage layer - provide store instance with backward-compatible interface
+#
+# Nothing connects at import time. The application lifespan opens the client
+# in each worker process (init_store / init_async_store) and routers receive
+# the adapter through Depends(get_store) / Depends(get_async_store).
+import asyncio
+import os
+import threading
+
+from app.config import settings
+from app.storage.cache import ENTITY_CACHE
+from app.storage.memory import InMemoryStorage
+from app.storage.read_model import READ_MODEL
+from app.storage.singleflight import AsyncSingleFlight, SingleFlight
 from app.storage.mongo import MongoStorage, connect_mongo, disconnect_mongo, get_db as get_mongo_db
-from app.storage.adapter import StorageAdapter
+from app.storage.adapter import StorageAdapter, AsyncStorageAdapter
 
 _store_instance = None
+# Process that opened _store_instance; a forked child must not reuse its sockets
+_store_pid = None
+_store_lock = threading.Lock()
+_async_store_instance = None
+
+
+def _entity_cache():
+    """This process's entity cache, emptied for a new connection; None when disabled."""
+    if not ENTITY_CACHE.enabled:
+        return None
+    ENTITY_CACHE.clear()
+    return ENTITY_CACHE
+
+
+def _read_model(db):
+    """Load this process's change-stream replica from db (a pymongo Database); None when off or unsupported."""
+    if not settings.READ_MODEL:
+        return None
+    return READ_MODEL if READ_MODEL.start(db) else None
+
+
+def init_store() -> StorageAdapter:
+    """Connect pymongo (or create the in-memory store) in this process and build the storage adapter."""
+    global _store_instance, _store_pid
+    with _store_lock:
+        if _store_instance is None or _store_pid != os.getpid():
+            if settings.STORAGE_BACKEND == "memory":
+                _store_instance = StorageAdapter(InMemoryStorage())
+            else:
+                db = connect_mongo()
+                storage = MongoStorage(db, cache=_entity_cache(), read_model=_read_model(db))
+                _store_instance = StorageAdapter(storage, flights=SingleFlight() if settings.SINGLE_FLIGHT else None)
+            _store_pid = os.getpid()
+        return _store_instance
+
+
+def close_store():
+    """Drop the adapter and close its client; the in-memory store's data goes with it."""
+    global _store_instance, _store_pid
+    with _store_lock:
+        if _store_instance is not None and _store_pid == os.getpid() and isinstance(_store_instance.mongo, MongoStorage):
+            READ_MODEL.stop()
+            disconnect_mongo()
+        _store_instance = None
+        _store_pid = None
+
+
+def get_store() -> StorageAdapter:
+    """Dependency returning this process's storage adapter, connecting on first use.
+
+    The lifespan normally connects at startup; first-use initialization covers
+    scripts and processes forked after the parent connected.
+    """
+    store = _store_instance
+    if store is None or _store_pid != os.getpid():
+        store = init_store()
+    return store
+
+
+async def init_async_store():
+    """Connect Motor inside the running event loop and build the async adapter."""
+    global _async_store_instance
+    from app.storage.mongo_async import AsyncMongoStorage, connect_motor, get_delegate_db
+    db = await connect_motor()
+    # The replica tails its stream on a thread, through the synchronous client Motor wraps
+    read_model = await asyncio.to_thread(_read_model, get_delegate_db())
+    storage = AsyncMongoStorage(db, cache=_entity_cache(), read_model=read_model)
+    _async_store_instance = AsyncStorageAdapter(storage, flights=AsyncSingleFlight() if settings.SINGLE_FLIGHT else None)
+    return _async_store_instance
+
+
+def close_async_store():
+    """Drop the async adapter and close its Motor client."""
+    global _async_store_instance
+    from app.storage.mongo_async import disconnect_motor
+    READ_MODEL.stop()
+    disconnect_motor()
+    _async_store_instance = None
+
+
+def get_async_store() -> AsyncStorageAdapter:
+    """Dependency returning the async storage adapter set up at startup."""
+    if _async_store_instance is None:
+        raise RuntimeError("Async storage not initialized. Call init_async_store() first.")
+    return _async_store_instance
 
-def get_store():
-    """Get the global storage adapter instance, initializing if needed."""
-    global _store_instance
-    if _store_instance is None:
-        try:
-            connect_mongo()
-            mongo_storage = MongoStorage()
-            _store_instance = StorageAdapter(mongo_storage)
-        except Exception as e:
-            # If MongoDB init fails, _store_instance remains None
-            # The app will fail when trying to use it
-            raise
-    return _store_instance
-
-# Initialize store instance
-try:
-    store = get_store()
-except:
-    # For testing environments where MongoDB might not be available initially
-    store = None
-
-__all__ = ["store", "get_store", "StorageAdapter", "MongoStorage", "connect_mongo", "disconnect_mongo", "get_mongo_db"]
 
+__all__ = ["get_store", "init_store", "close_store", "get_async_store", "init_async_store", "close_async_store", "StorageAdapter", "AsyncStorageAdapter", "MongoStorage", "InMemoryStorage", "connect_mongo", "disconnect_mongo", "get_mongo_db"]
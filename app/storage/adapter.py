@@ -1,108 +1,355 @@
 """Adapter to bridge MongoStorage to in-memory dict interface for routers."""
-from typing import Dict, Optional, List
+from typing import AsyncIterator, Dict, Iterator, Optional, List
 from datetime import datetime, timezone
 
+from app.storage.singleflight import AsyncSingleFlight, SingleFlight
+from app.timing import instrument_storage
+
+# Storage-only fields never returned to routers
+_INTERNAL_FIELDS = ("_id", "ongoing")
+
 
 def _clean_doc(doc: Dict) -> Dict:
-    """Remove MongoDB internal fields (_id) from document."""
+    """Remove MongoDB internal fields (_id, ongoing) from a written document, in place.
+
+    Reads never need this: storage projects those fields out server-side.
+    """
     if doc is None:
         return None
-    doc_copy = doc.copy()
-    if "_id" in doc_copy:
-        del doc_copy["_id"]
-    return doc_copy
+    for field in _INTERNAL_FIELDS:
+        doc.pop(field, None)
+    return doc
+
 
+def _read_key(collection: str, id_: str, kind: str, fields: Optional[List[str]] = None) -> tuple:
+    return (collection, id_, kind, tuple(fields) if fields is not None else None)
 
+
+@instrument_storage
 class StorageAdapter:
     """Provides a dict-like interface on top of MongoStorage for backward compatibility."""
     
-    def __init__(self, mongo_storage):
+    def __init__(self, mongo_storage, flights: Optional[SingleFlight] = None):
         self.mongo = mongo_storage
-        # Note: Not caching because MongoDB updates bypass the cache and cause stale data
+        # Entity reads are cached below this layer, where every write invalidates them (app/storage/cache.py)
+        # Concurrent identical entity reads share one query; None runs each read on its own
+        self.flights = flights
+
+    def _read(self, key: tuple, fn):
+        return fn() if self.flights is None else self.flights.do(key, fn)
+
+    def _written(self, collection: str, ids):
+        if self.flights is not None:
+            self.flights.forget(collection, ids)
     
     @property
     def vehicles(self) -> Dict:
-        """Return vehicles dict (all, including deleted). Fetches fresh from MongoDB.
+        """Return vehicles dict (all, including deleted). Fetches fresh from storage.
         
-        Note: Routers handle filtering based on include_deleted parameter.
+        Note: Loads the whole collection; request paths use list_vehicles instead.
         """
         result = {}
-        docs = self.mongo.db.vehicles.find({})
+        docs = self.mongo.iter_vehicles()
         for doc in docs:
-            result[doc["id"]] = _clean_doc(doc)
+            result[doc["id"]] = doc
         return result
     
     @property
     def drivers(self) -> Dict:
-        """Return drivers dict (all, including deleted). Fetches fresh from MongoDB.
+        """Return drivers dict (all, including deleted). Fetches fresh from storage.
         
         Note: Routers handle filtering based on include_deleted parameter.
         """
         result = {}
-        docs = self.mongo.db.drivers.find({})
+        docs = self.mongo.iter_drivers()
         for doc in docs:
-            result[doc["id"]] = _clean_doc(doc)
+            result[doc["id"]] = doc
         return result
     
     @property
     def assignments(self) -> Dict:
-        """Return assignments dict. Fetches fresh from MongoDB."""
+        """Return assignments dict. Fetches fresh from storage."""
         result = {}
-        docs = self.mongo.db.assignments.find({})
+        docs = self.mongo.iter_assignments()
         for doc in docs:
-            result[doc["id"]] = _clean_doc(doc)
+            result[doc["id"]] = doc
         return result
     
     # Delegate to MongoStorage methods
-    def get_vehicle(self, vid: str):
-        return _clean_doc(self.mongo.get_vehicle(vid))
+    def get_vehicle(self, vid: str, fields: Optional[List[str]] = None):
+        return self._read(_read_key("vehicles", vid, "doc", fields), lambda: self.mongo.get_vehicle(vid, fields))
+    
+    def add_vehicles_bulk(self, vehicles: List[Dict]) -> List[Optional[ValueError]]:
+        errors = self.mongo.create_vehicles_bulk(vehicles)
+        self._written("vehicles", [item["id"] for item in vehicles])
+        return errors
     
     def add_vehicle(self, vehicle: Dict):
-        return _clean_doc(self.mongo.create_vehicle(vehicle))
+        doc = _clean_doc(self.mongo.create_vehicle(vehicle))
+        self._written("vehicles", [vehicle["id"]])
+        return doc
+    
+    def list_vehicles(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True, fields: Optional[List[str]] = None) -> tuple:
+        return self.mongo.list_vehicles(filter, limit=limit, skip=skip, sort=sort, after=after, with_total=with_total, fields=fields)
+    
+    def iter_vehicles(self, filter: Optional[Dict] = None, **options) -> Iterator[Dict]:
+        return self.mongo.iter_vehicles(filter, **options)
+    
+    def get_vehicle_version(self, vid: str) -> Optional[datetime]:
+        return self._read(_read_key("vehicles", vid, "version"), lambda: self.mongo.get_vehicle_version(vid))
     
     def find_vehicle_by_plate(self, plate: str):
-        return _clean_doc(self.mongo.find_vehicle_by_plate(plate))
+        return self.mongo.find_vehicle_by_plate(plate)
     
     def soft_delete_vehicle(self, vid: str):
         self.mongo.soft_delete_vehicle(vid)
+        self._written("vehicles", [vid])
     
     def update_vehicle(self, vid: str, updates: Dict):
-        return _clean_doc(self.mongo.update_vehicle(vid, updates))
+        try:
+            return self.mongo.update_vehicle(vid, updates)
+        finally:
+            self._written("vehicles", [vid])
+    
+    def update_vehicle_if_match(self, vid: str, expected_updated_at: datetime, updates: Dict):
+        try:
+            return self.mongo.update_vehicle_if_match(vid, expected_updated_at, updates)
+        finally:
+            self._written("vehicles", [vid])
     
     def list_active_assignments_for_vehicle(self, vid: str) -> List[Dict]:
-        result = self.mongo.list_active_assignments_for_vehicle(vid)
-        return [_clean_doc(a) for a in result]
+        return self.mongo.list_active_assignments_for_vehicle(vid)
     
     # Driver methods
-    def get_driver(self, did: str):
-        return _clean_doc(self.mongo.get_driver(did))
+    def get_driver(self, did: str, fields: Optional[List[str]] = None):
+        return self._read(_read_key("drivers", did, "doc", fields), lambda: self.mongo.get_driver(did, fields))
+    
+    def add_drivers_bulk(self, drivers: List[Dict]) -> List[Optional[ValueError]]:
+        errors = self.mongo.create_drivers_bulk(drivers)
+        self._written("drivers", [item["id"] for item in drivers])
+        return errors
     
     def add_driver(self, driver: Dict):
-        return _clean_doc(self.mongo.create_driver(driver))
+        doc = _clean_doc(self.mongo.create_driver(driver))
+        self._written("drivers", [driver["id"]])
+        return doc
+    
+    def get_driver_version(self, did: str) -> Optional[datetime]:
+        return self._read(_read_key("drivers", did, "version"), lambda: self.mongo.get_driver_version(did))
     
     def find_driver_by_license(self, license_num: str):
-        return _clean_doc(self.mongo.find_driver_by_license(license_num))
+        return self.mongo.find_driver_by_license(license_num)
     
     def soft_delete_driver(self, did: str):
         self.mongo.soft_delete_driver(did)
+        self._written("drivers", [did])
     
     def update_driver(self, did: str, updates: Dict):
-        return _clean_doc(self.mongo.update_driver(did, updates))
+        try:
+            return self.mongo.update_driver(did, updates)
+        finally:
+            self._written("drivers", [did])
+    
+    def update_driver_if_match(self, did: str, expected_updated_at: datetime, updates: Dict):
+        try:
+            return self.mongo.update_driver_if_match(did, expected_updated_at, updates)
+        finally:
+            self._written("drivers", [did])
+    
+    def list_drivers(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True, fields: Optional[List[str]] = None) -> tuple:
+        return self.mongo.list_drivers(filter, limit=limit, skip=skip, sort=sort, after=after, with_total=with_total, fields=fields)
+    
+    def iter_drivers(self, filter: Optional[Dict] = None, **options) -> Iterator[Dict]:
+        return self.mongo.iter_drivers(filter, **options)
     
     def list_active_assignments_for_driver(self, did: str) -> List[Dict]:
-        result = self.mongo.list_active_assignments_for_driver(did)
-        return [_clean_doc(a) for a in result]
+        return self.mongo.list_active_assignments_for_driver(did)
     
     # Assignment methods
-    def get_assignment(self, aid: str):
-        return _clean_doc(self.mongo.get_assignment(aid))
+    def get_assignment(self, aid: str, fields: Optional[List[str]] = None, fresh: bool = False):
+        if fresh:
+            return self.mongo.get_assignment(aid, fields, fresh=True)
+        return self._read(_read_key("assignments", aid, "doc", fields), lambda: self.mongo.get_assignment(aid, fields))
+    
+    def add_assignments_bulk(self, assignments: List[Dict]) -> List[Optional[ValueError]]:
+        errors = self.mongo.create_assignments_bulk(assignments)
+        self._written("assignments", [item["id"] for item in assignments])
+        return errors
     
     def add_assignment(self, assignment: Dict):
-        return _clean_doc(self.mongo.create_assignment(assignment))
+        doc = _clean_doc(self.mongo.create_assignment(assignment))
+        self._written("assignments", [assignment["id"]])
+        return doc
+    
+    def add_assignment_checked(self, assignment: Dict):
+        doc = _clean_doc(self.mongo.create_assignment_checked(assignment))
+        self._written("assignments", [assignment["id"]])
+        return doc
     
     def update_assignment(self, aid: str, updates: Dict):
-        result = _clean_doc(self.mongo.update_assignment(aid, updates))
-        return result
+        try:
+            return self.mongo.update_assignment(aid, updates)
+        finally:
+            self._written("assignments", [aid])
     
     def delete_assignment(self, aid: str):
         self.mongo.delete_assignment(aid)
+        self._written("assignments", [aid])
+    
+    def list_assignments(self, limit: int = 50, skip: int = 0, **filters) -> tuple:
+        return self.mongo.list_assignments(limit=limit, skip=skip, **filters)
+
+    def get_watermark(self, collection: str) -> Dict:
+        return self.mongo.get_watermark(collection)
+
+    def iter_assignments(self, **filters) -> Iterator[Dict]:
+        return self.mongo.iter_assignments(**filters)
+
+    def clear(self):
+        self.mongo.clear()
+
+
+@instrument_storage
+class AsyncStorageAdapter:
+    """Coroutine counterpart of StorageAdapter for the Motor backend."""
+    
+    def __init__(self, mongo_storage, flights: Optional[AsyncSingleFlight] = None):
+        self.mongo = mongo_storage
+        self.flights = flights
+
+    async def _read(self, key: tuple, fn):
+        return await fn() if self.flights is None else await self.flights.do(key, fn)
+
+    def _written(self, collection: str, ids):
+        if self.flights is not None:
+            self.flights.forget(collection, ids)
+    
+    # Vehicle methods
+    async def get_vehicle(self, vid: str, fields: Optional[List[str]] = None):
+        return await self._read(_read_key("vehicles", vid, "doc", fields), lambda: self.mongo.get_vehicle(vid, fields))
+    
+    async def add_vehicles_bulk(self, vehicles: List[Dict]) -> List[Optional[ValueError]]:
+        errors = await self.mongo.create_vehicles_bulk(vehicles)
+        self._written("vehicles", [item["id"] for item in vehicles])
+        return errors
+    
+    async def add_vehicle(self, vehicle: Dict):
+        doc = _clean_doc(await self.mongo.create_vehicle(vehicle))
+        self._written("vehicles", [vehicle["id"]])
+        return doc
+    
+    async def list_vehicles(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True, fields: Optional[List[str]] = None) -> tuple:
+        return await self.mongo.list_vehicles(filter, limit=limit, skip=skip, sort=sort, after=after, with_total=with_total, fields=fields)
+    
+    def iter_vehicles(self, filter: Optional[Dict] = None, **options) -> AsyncIterator[Dict]:
+        return self.mongo.iter_vehicles(filter, **options)
+    
+    async def get_vehicle_version(self, vid: str) -> Optional[datetime]:
+        return await self._read(_read_key("vehicles", vid, "version"), lambda: self.mongo.get_vehicle_version(vid))
+    
+    async def find_vehicle_by_plate(self, plate: str):
+        return await self.mongo.find_vehicle_by_plate(plate)
+    
+    async def soft_delete_vehicle(self, vid: str):
+        await self.mongo.soft_delete_vehicle(vid)
+        self._written("vehicles", [vid])
+    
+    async def update_vehicle(self, vid: str, updates: Dict):
+        try:
+            return await self.mongo.update_vehicle(vid, updates)
+        finally:
+            self._written("vehicles", [vid])
+    
+    async def update_vehicle_if_match(self, vid: str, expected_updated_at: datetime, updates: Dict):
+        try:
+            return await self.mongo.update_vehicle_if_match(vid, expected_updated_at, updates)
+        finally:
+            self._written("vehicles", [vid])
+    
+    async def list_active_assignments_for_vehicle(self, vid: str) -> List[Dict]:
+        return await self.mongo.list_active_assignments_for_vehicle(vid)
+    
+    # Driver methods
+    async def get_driver(self, did: str, fields: Optional[List[str]] = None):
+        return await self._read(_read_key("drivers", did, "doc", fields), lambda: self.mongo.get_driver(did, fields))
+    
+    async def add_drivers_bulk(self, drivers: List[Dict]) -> List[Optional[ValueError]]:
+        errors = await self.mongo.create_drivers_bulk(drivers)
+        self._written("drivers", [item["id"] for item in drivers])
+        return errors
+    
+    async def add_driver(self, driver: Dict):
+        doc = _clean_doc(await self.mongo.create_driver(driver))
+        self._written("drivers", [driver["id"]])
+        return doc
+    
+    async def get_driver_version(self, did: str) -> Optional[datetime]:
+        return await self._read(_read_key("drivers", did, "version"), lambda: self.mongo.get_driver_version(did))
+    
+    async def find_driver_by_license(self, license_num: str):
+        return await self.mongo.find_driver_by_license(license_num)
+    
+    async def soft_delete_driver(self, did: str):
+        await self.mongo.soft_delete_driver(did)
+        self._written("drivers", [did])
+    
+    async def update_driver(self, did: str, updates: Dict):
+        try:
+            return await self.mongo.update_driver(did, updates)
+        finally:
+            self._written("drivers", [did])
+    
+    async def update_driver_if_match(self, did: str, expected_updated_at: datetime, updates: Dict):
+        try:
+            return await self.mongo.update_driver_if_match(did, expected_updated_at, updates)
+        finally:
+            self._written("drivers", [did])
+    
+    async def list_drivers(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True, fields: Optional[List[str]] = None) -> tuple:
+        return await self.mongo.list_drivers(filter, limit=limit, skip=skip, sort=sort, after=after, with_total=with_total, fields=fields)
+    
+    def iter_drivers(self, filter: Optional[Dict] = None, **options) -> AsyncIterator[Dict]:
+        return self.mongo.iter_drivers(filter, **options)
+    
+    async def list_active_assignments_for_driver(self, did: str) -> List[Dict]:
+        return await self.mongo.list_active_assignments_for_driver(did)
+    
+    # Assignment methods
+    async def get_assignment(self, aid: str, fields: Optional[List[str]] = None, fresh: bool = False):
+        if fresh:
+            return await self.mongo.get_assignment(aid, fields, fresh=True)
+        return await self._read(_read_key("assignments", aid, "doc", fields), lambda: self.mongo.get_assignment(aid, fields))
+    
+    async def add_assignments_bulk(self, assignments: List[Dict]) -> List[Optional[ValueError]]:
+        errors = await self.mongo.create_assignments_bulk(assignments)
+        self._written("assignments", [item["id"] for item in assignments])
+        return errors
+    
+    async def add_assignment(self, assignment: Dict):
+        doc = _clean_doc(await self.mongo.create_assignment(assignment))
+        self._written("assignments", [assignment["id"]])
+        return doc
+    
+    async def add_assignment_checked(self, assignment: Dict):
+        doc = _clean_doc(await self.mongo.create_assignment_checked(assignment))
+        self._written("assignments", [assignment["id"]])
+        return doc
+    
+    async def update_assignment(self, aid: str, updates: Dict):
+        try:
+            return await self.mongo.update_assignment(aid, updates)
+        finally:
+            self._written("assignments", [aid])
+    
+    async def delete_assignment(self, aid: str):
+        await self.mongo.delete_assignment(aid)
+        self._written("assignments", [aid])
+    
+    async def list_assignments(self, limit: int = 50, skip: int = 0, **filters) -> tuple:
+        return await self.mongo.list_assignments(limit=limit, skip=skip, **filters)
+
+    async def get_watermark(self, collection: str) -> Dict:
+        return await self.mongo.get_watermark(collection)
+
+    def iter_assignments(self, **filters) -> AsyncIterator[Dict]:
+        return self.mongo.iter_assignments(**filters)
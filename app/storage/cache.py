@@ -0,0 +1,176 @@
+"""Read-through cache of vehicle, driver and assignment documents by id.
+
+MongoStorage and AsyncMongoStorage look entities up here before going to
+the database and drop an id from the cache in the same call that writes it,
+so a worker never serves its own stale writes. Entries are bounded by count
+and by an estimate of their size in bytes, evicted least recently used
+first, and expire after ENTITY_CACHE_TTL_SECONDS, which bounds how long a
+write made by another worker process can go unseen. The cache is off unless
+that TTL is set, and conditional-GET version lookups and reads that decide a
+write (fresh=True) never use it.
+
+A read that misses takes generation() before querying and hands it back to
+put(); if the collection was written in between, the possibly stale
+document is not cached.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import REGISTRY, Counters, Gauges
+
+COLLECTIONS = ("vehicles", "drivers", "assignments")
+
+
+def doc_size(doc: Dict) -> int:
+    """Approximate memory held by a flat document, in bytes."""
+    return sys.getsizeof(doc) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in doc.items())
+
+
+def select_fields(doc: Optional[Dict], fields: Optional[List[str]]) -> Optional[Dict]:
+    """Copy of doc restricted to fields, as an inclusion projection would return it."""
+    if doc is None:
+        return None
+    if fields is None:
+        return dict(doc)
+    return {field: doc[field] for field in fields if field in doc}
+
+
+class EntityCache:
+    """Thread-safe LRU of documents keyed by (collection, id) with a TTL."""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024, ttl: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        # (collection, id) -> (document, expires at, size), least recently used first
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Dict, float, int]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self.reset_stats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0 and self.max_bytes > 0
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = {name: 0 for name in COLLECTIONS}
+            self.misses = {name: 0 for name in COLLECTIONS}
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+            self.stale_fills = 0
+
+    def get(self, collection: str, id_: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """Cached document (a copy, projected to fields), or None on a miss."""
+        key = (collection, id_)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses[collection] = self.misses.get(collection, 0) + 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[collection] = self.hits.get(collection, 0) + 1
+            doc = entry[0]
+        return select_fields(doc, fields)
+
+    def generation(self, collection: str) -> int:
+        """Write counter of collection; take it before the read that fills the cache."""
+        with self._lock:
+            return self._generations.get(collection, 0)
+
+    def put(self, collection: str, id_: str, doc: Dict, generation: int):
+        """Cache a copy of doc unless collection was written since generation was taken."""
+        if not self.enabled:
+            return
+        doc = dict(doc)
+        size = doc_size(doc)
+        if size > self.max_bytes:
+            return
+        key = (collection, id_)
+        with self._lock:
+            if self._generations.get(collection, 0) != generation:
+                self.stale_fills += 1
+                return
+            self._remove(key)
+            self._entries[key] = (doc, self.clock() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, collection: str, ids: Iterable[str]):
+        """Drop ids from the cache; call after writing them."""
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            for id_ in ids:
+                if self._remove((collection, id_)):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for collection in COLLECTIONS:
+                self._generations[collection] = self._generations.get(collection, 0) + 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Tuple[str, str]) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def snapshot(self) -> Dict:
+        """Point-in-time statistics, suitable for a JSON response."""
+        with self._lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+                "collections": {name: {"hits": self.hits.get(name, 0), "misses": self.misses.get(name, 0)} for name in COLLECTIONS},
+            }
+
+
+ENTITY_CACHE = EntityCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_MAX_BYTES, settings.ENTITY_CACHE_TTL_SECONDS)
+
+
+def _cache_gauges() -> Dict:
+    snap = ENTITY_CACHE.snapshot()
+    return {
+        "entity_cache_entries": ("Documents currently cached.", snap["entries"]),
+        "entity_cache_bytes": ("Estimated size of the cached documents.", snap["bytes"]),
+    }
+
+
+def _cache_counters() -> Dict:
+    snap = ENTITY_CACHE.snapshot()
+    return {
+        "entity_cache_hits_total": ("Lookups answered from the cache.", snap["hits"]),
+        "entity_cache_misses_total": ("Lookups that went to the database.", snap["misses"]),
+    }
+
+
+REGISTRY.register(Gauges(_cache_gauges))
+REGISTRY.register(Counters(_cache_counters))
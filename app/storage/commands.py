@@ -0,0 +1,66 @@
+"""Mongo command monitoring feeding the latency metrics and the slow query log.
+
+CommandStats is registered on the client through client_options(). The
+collection is only present on the started event, so it is remembered by
+request_id until the matching succeeded/failed event arrives. Commands
+slower than SLOW_QUERY_MS are handed to SLOW_QUERIES.
+"""
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+from app.config import settings
+from app.metrics import MONGO_FAILURES, MONGO_LATENCY
+from app.storage.slowlog import SLOW_QUERIES
+
+# Handshake and monitoring chatter that would only add noise to the histograms
+_IGNORED = frozenset({"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions", "buildInfo"})
+
+
+def command_target(command_name: str, command: Dict) -> str:
+    """Collection a command addresses, or "db" for database-level commands."""
+    # getMore carries the cursor id under its name and the collection separately
+    target = command.get("collection") if command_name == "getMore" else command.get(command_name)
+    return target if isinstance(target, str) else "db"
+
+
+def is_await_data(command_name: str, command: Dict) -> bool:
+    """A getMore on a tailable awaitData cursor (e.g. a change stream), which blocks by design.
+
+    The driver only sends maxTimeMS on a getMore for max_await_time_ms.
+    """
+    return command_name == "getMore" and "maxTimeMS" in command
+
+
+class CommandStats(monitoring.CommandListener):
+    def __init__(self):
+        # request_id -> (collection, command name, command); request ids are unique per client
+        self._pending: Dict[int, Tuple[str, str, Dict]] = {}
+
+    def started(self, event):
+        if event.command_name in _IGNORED:
+            return
+        self._pending[event.request_id] = (command_target(event.command_name, event.command), event.command_name, event.command)
+
+    def succeeded(self, event):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        collection, command_name, command = pending
+        # Its duration is the server waiting for changes, not query cost
+        if is_await_data(command_name, command):
+            return
+        MONGO_LATENCY.observe((collection, command_name), event.duration_micros / 1e6)
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= settings.SLOW_QUERY_MS and command_name != "explain":
+            SLOW_QUERIES.record(collection, command_name, command, event.reply, duration_ms)
+
+    def failed(self, event):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is not None:
+            labels = pending[:2]
+            MONGO_LATENCY.observe(labels, event.duration_micros / 1e6)
+            MONGO_FAILURES.inc(labels)
+
+
+COMMAND_STATS = CommandStats()
@@ -0,0 +1,24 @@
+"""Exceptions raised by the storage layer."""
+
+
+class StorageConflict(ValueError):
+    """A write rejected by a business rule; carries the API error code and status."""
+
+    def __init__(self, code: str, message: str, status_code: int = 409):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+
+# Unique fields and the conflict reported when a write duplicates one
+DUPLICATE_KEYS = {
+    "plate_number": ("DUPLICATE_PLATE", "Plate already exists"),
+    "license_number": ("DUPLICATE_LICENSE", "License number already exists"),
+}
+
+
+def duplicate_key(field: str) -> StorageConflict:
+    """Conflict for a write that repeats the unique value of field."""
+    code, message = DUPLICATE_KEYS[field]
+    return StorageConflict(code, message)
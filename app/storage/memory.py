@@ -0,0 +1,462 @@
+"""In-process storage with the MongoStorage method surface (STORAGE_BACKEND=memory).
+
+Documents live in dicts keyed by id. Hash indexes mirror the Mongo ones:
+plate_number and license_number over non-deleted records, assignments per
+driver and per vehicle, and the ongoing assignment of each driver and
+vehicle. Every collection also keeps its (created_at, id) keys sorted, so
+pages and keyset cursors under DEFAULT_SORT are a bisect plus a slice.
+
+Data is per process and lost on restart: suited to tests, benchmarking the
+HTTP layer without a database, and single-worker edge deployments.
+"""
+import bisect
+import itertools
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.storage.errors import StorageConflict, duplicate_key
+from app.storage.mongo import DEFAULT_SORT, _as_utc, _with_ongoing_flag, check_assignment_preflight, plan_assignment_batch
+
+_INTERNAL_FIELDS = ("_id", "ongoing")
+
+
+def _sort_key(doc: Dict) -> tuple:
+    created_at = doc.get("created_at")
+    return (_as_utc(created_at) if isinstance(created_at, datetime) else created_at, doc["id"])
+
+
+def _project(doc: Dict, fields: Optional[List[str]] = None) -> Dict:
+    """Copy of doc shaped like a Mongo read through projection(fields)."""
+    if fields is None:
+        return {key: value for key, value in doc.items() if key not in _INTERNAL_FIELDS}
+    return {field: doc[field] for field in fields if field in doc}
+
+
+def _matches(doc: Dict, filter: Dict) -> bool:
+    # Routers only build equality filters (deleted, status)
+    return all(doc.get(field) == value for field, value in filter.items())
+
+
+def _is_active(assignment: Dict, now: datetime) -> bool:
+    end = assignment.get("end_datetime")
+    return end is None or _as_utc(end) >= now
+
+
+class _Collection:
+    """Documents by id plus their keys in DEFAULT_SORT order."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: Dict[str, Dict] = {}
+        self.order: List[tuple] = []
+
+    def insert(self, doc: Dict):
+        self.docs[doc["id"]] = doc
+        bisect.insort(self.order, _sort_key(doc))
+
+    def remove(self, doc: Dict):
+        del self.docs[doc["id"]]
+        key = _sort_key(doc)
+        index = bisect.bisect_left(self.order, key)
+        if index < len(self.order) and self.order[index] == key:
+            del self.order[index]
+
+    def replace(self, old: Dict, new: Dict):
+        if _sort_key(old) != _sort_key(new):
+            self.remove(old)
+            self.insert(new)
+        else:
+            self.docs[new["id"]] = new
+
+    def ordered(self, ids: Optional[Iterable[str]] = None, after: Optional[tuple] = None) -> Iterator[Dict]:
+        """Documents (all, or only ids) under DEFAULT_SORT, starting after a (created_at, id) key."""
+        if ids is not None:
+            keys = sorted(_sort_key(self.docs[id_]) for id_ in ids)
+        else:
+            keys = self.order
+        start = 0
+        if after:
+            start = bisect.bisect_right(keys, (_as_utc(after[0]) if isinstance(after[0], datetime) else after[0], after[1]))
+        for index in range(start, len(keys)):
+            yield self.docs[keys[index][1]]
+
+    def clear(self):
+        self.docs.clear()
+        self.order.clear()
+
+
+class InMemoryStorage:
+    """Dict-backed storage for fleet management entities.
+
+    One lock serializes every operation, so the uniqueness rules the Mongo
+    indexes enforce (plate, license, one ongoing assignment per driver and
+    vehicle) hold for concurrent requests on the threadpool.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.vehicles = _Collection("vehicles")
+        self.drivers = _Collection("drivers")
+        self.assignments = _Collection("assignments")
+        # Hash indexes: normalized plate/license of non-deleted records -> id
+        self._plates: Dict[str, str] = {}
+        self._licenses: Dict[str, str] = {}
+        # driver_id / vehicle_id -> assignment ids
+        self._driver_assignments: Dict[str, set] = {}
+        self._vehicle_assignments: Dict[str, set] = {}
+        # driver_id / vehicle_id -> id of its ongoing (end_datetime=None) assignment
+        self._ongoing_drivers: Dict[str, str] = {}
+        self._ongoing_vehicles: Dict[str, str] = {}
+        self._watermarks: Dict[str, Dict] = {}
+
+    def clear(self):
+        """Drop every vehicle, driver and assignment; watermarks keep advancing."""
+        with self._lock:
+            for collection in (self.vehicles, self.drivers, self.assignments):
+                collection.clear()
+                self._touch(collection.name)
+            for index in (self._plates, self._licenses, self._driver_assignments, self._vehicle_assignments, self._ongoing_drivers, self._ongoing_vehicles):
+                index.clear()
+
+    # Shared helpers
+    def _touch(self, collection: str):
+        watermark = self._watermarks.get(collection, {"version": 0})
+        self._watermarks[collection] = {"version": watermark["version"] + 1, "updated_at": datetime.now(timezone.utc)}
+
+    def get_watermark(self, collection: str) -> Dict:
+        """Return the change watermark {"version", "updated_at"} of a collection."""
+        with self._lock:
+            return dict(self._watermarks.get(collection) or {"version": 0, "updated_at": None})
+
+    def _get(self, collection: _Collection, id_: str, fields: Optional[List[str]]) -> Optional[Dict]:
+        with self._lock:
+            doc = collection.docs.get(id_)
+            return _project(doc, fields) if doc is not None else None
+
+    def _version(self, collection: _Collection, id_: str) -> Optional[datetime]:
+        with self._lock:
+            doc = collection.docs.get(id_)
+            return doc.get("updated_at") if doc is not None and not doc.get("deleted") else None
+
+    def _by_key(self, collection: _Collection, unique: Dict[str, str], value: str) -> Optional[Dict]:
+        with self._lock:
+            id_ = unique.get(value)
+            return _project(collection.docs[id_]) if id_ is not None else None
+
+    def _find(self, collection: _Collection, match: Callable[[Dict], bool], ids: Optional[Iterable[str]], sort: Optional[List], after: Optional[tuple]) -> Iterable[Dict]:
+        """Matching documents in sort order; call with the lock held.
+
+        Under DEFAULT_SORT this is lazy, so a page stops reading at skip + limit.
+        """
+        docs = (doc for doc in collection.ordered(ids, after) if match(doc))
+        if sort and list(sort) != DEFAULT_SORT:
+            docs = list(docs)
+            for field, direction in reversed(sort):
+                docs.sort(key=lambda doc: doc.get(field), reverse=direction < 0)
+        return docs
+
+    def _find_page(self, collection: _Collection, match: Callable[[Dict], bool], limit: int, skip: int, sort: Optional[List], after: Optional[tuple], with_total: bool,
+                   fields: Optional[List[str]] = None, ids: Optional[Iterable[str]] = None) -> tuple:
+        with self._lock:
+            total = sum(1 for doc in collection.ordered(ids) if match(doc)) if with_total else None
+            page = itertools.islice(self._find(collection, match, ids, sort, after), skip, skip + limit)
+            return [_project(doc, fields) for doc in page], total
+
+    def _iter(self, collection: _Collection, match: Callable[[Dict], bool], sort: Optional[List], after: Optional[tuple], batch_size: int,
+              fields: Optional[List[str]] = None, ids: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        # Snapshot under the lock; batch_size has no meaning without round trips
+        with self._lock:
+            docs = [_project(doc, fields) for doc in self._find(collection, match, ids, sort, after)]
+        yield from docs
+
+    def _create_unique(self, collection: _Collection, unique: Dict[str, str], field: str, doc: Dict):
+        if doc.get(field) in unique:
+            raise duplicate_key(field)
+        if doc["id"] in collection.docs:
+            raise ValueError("Duplicate id")
+        collection.insert(doc)
+        unique[doc[field]] = doc["id"]
+
+    def _update_unique(self, collection: _Collection, unique: Dict[str, str], field: str, id_: str, updates: Dict, message: str) -> Optional[Dict]:
+        with self._lock:
+            old = collection.docs.get(id_)
+            if old is None:
+                return None
+            new = {**old, **updates}
+            if not new.get("deleted") and unique.get(new.get(field), id_) != id_:
+                raise ValueError(message)
+            if not old.get("deleted") and unique.get(old.get(field)) == id_:
+                del unique[old[field]]
+            if not new.get("deleted"):
+                unique[new[field]] = id_
+            collection.replace(old, new)
+            self._touch(collection.name)
+            return _project(new)
+
+    def _if_match(self, collection: _Collection, unique: Dict[str, str], field: str, id_: str, expected_updated_at: datetime, updates: Dict, message: str) -> Optional[Dict]:
+        with self._lock:
+            doc = collection.docs.get(id_)
+            if doc is None or doc.get("deleted") or not isinstance(doc.get("updated_at"), datetime) or _as_utc(doc["updated_at"]) != _as_utc(expected_updated_at):
+                return None
+            return self._update_unique(collection, unique, field, id_, updates, message)
+
+    def _create_many(self, docs: List[Dict], create: Callable[[Dict], Dict]) -> List[Optional[ValueError]]:
+        errors: List[Optional[ValueError]] = [None] * len(docs)
+        for index, doc in enumerate(docs):
+            try:
+                create(doc)
+            except ValueError as e:
+                errors[index] = e
+        return errors
+
+    # Vehicle operations
+    def create_vehicle(self, vehicle: Dict):
+        """Insert a vehicle; returns the vehicle."""
+        vehicle_copy = {**vehicle, "deleted": False}
+        with self._lock:
+            self._create_unique(self.vehicles, self._plates, "plate_number", vehicle_copy)
+            self._touch("vehicles")
+        return dict(vehicle_copy)
+
+    def create_vehicles_bulk(self, vehicles: List[Dict]) -> List[Optional[ValueError]]:
+        """Insert vehicles in order; returns per-item errors (None on success)."""
+        return self._create_many(vehicles, self.create_vehicle)
+
+    def get_vehicle(self, vid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        return self._get(self.vehicles, vid, fields)
+
+    def get_vehicle_version(self, vid: str) -> Optional[datetime]:
+        return self._version(self.vehicles, vid)
+
+    def find_vehicle_by_plate(self, plate_norm: str) -> Optional[Dict]:
+        return self._by_key(self.vehicles, self._plates, plate_norm)
+
+    def update_vehicle(self, vid: str, updates: Dict) -> Optional[Dict]:
+        return self._update_unique(self.vehicles, self._plates, "plate_number", vid, updates, "Duplicate plate number")
+
+    def update_vehicle_if_match(self, vid: str, expected_updated_at: datetime, updates: Dict) -> Optional[Dict]:
+        """Apply updates only if the vehicle is not deleted and still has expected_updated_at."""
+        return self._if_match(self.vehicles, self._plates, "plate_number", vid, expected_updated_at, updates, "Duplicate plate number")
+
+    def soft_delete_vehicle(self, vid: str):
+        with self._lock:
+            if self.vehicles.docs.get(vid) is not None:
+                self._update_unique(self.vehicles, self._plates, "plate_number", vid, {"deleted": True, "updated_at": datetime.now(timezone.utc)}, "Duplicate plate number")
+            else:
+                self._touch("vehicles")
+
+    def list_vehicles(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True,
+                      fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of vehicles matching filter and the total match count."""
+        filter = filter or {}
+        return self._find_page(self.vehicles, lambda doc: _matches(doc, filter), limit, skip, sort, after, with_total, fields)
+
+    def iter_vehicles(self, filter: Optional[Dict] = None, sort: Optional[List] = None, after: Optional[tuple] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every vehicle matching filter."""
+        filter = filter or {}
+        return self._iter(self.vehicles, lambda doc: _matches(doc, filter), sort, after, batch_size, fields)
+
+    def list_active_assignments_for_vehicle(self, vehicle_id: str) -> List[Dict]:
+        return self._active(self._vehicle_assignments, vehicle_id)
+
+    # Driver operations
+    def create_driver(self, driver: Dict):
+        driver_copy = {**driver, "deleted": False}
+        with self._lock:
+            self._create_unique(self.drivers, self._licenses, "license_number", driver_copy)
+            self._touch("drivers")
+        return dict(driver_copy)
+
+    def create_drivers_bulk(self, drivers: List[Dict]) -> List[Optional[ValueError]]:
+        """Insert drivers in order; returns per-item errors (None on success)."""
+        return self._create_many(drivers, self.create_driver)
+
+    def get_driver(self, did: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        return self._get(self.drivers, did, fields)
+
+    def get_driver_version(self, did: str) -> Optional[datetime]:
+        return self._version(self.drivers, did)
+
+    def find_driver_by_license(self, license_norm: str) -> Optional[Dict]:
+        return self._by_key(self.drivers, self._licenses, license_norm)
+
+    def update_driver(self, did: str, updates: Dict) -> Optional[Dict]:
+        return self._update_unique(self.drivers, self._licenses, "license_number", did, updates, "Duplicate license number")
+
+    def update_driver_if_match(self, did: str, expected_updated_at: datetime, updates: Dict) -> Optional[Dict]:
+        """Apply updates only if the driver is not deleted and still has expected_updated_at."""
+        return self._if_match(self.drivers, self._licenses, "license_number", did, expected_updated_at, updates, "Duplicate license number")
+
+    def soft_delete_driver(self, did: str):
+        with self._lock:
+            if self.drivers.docs.get(did) is not None:
+                self._update_unique(self.drivers, self._licenses, "license_number", did, {"deleted": True, "updated_at": datetime.now(timezone.utc)}, "Duplicate license number")
+            else:
+                self._touch("drivers")
+
+    def list_drivers(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True,
+                     fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of drivers matching filter and the total match count."""
+        filter = filter or {}
+        return self._find_page(self.drivers, lambda doc: _matches(doc, filter), limit, skip, sort, after, with_total, fields)
+
+    def iter_drivers(self, filter: Optional[Dict] = None, sort: Optional[List] = None, after: Optional[tuple] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every driver matching filter."""
+        filter = filter or {}
+        return self._iter(self.drivers, lambda doc: _matches(doc, filter), sort, after, batch_size, fields)
+
+    def list_active_assignments_for_driver(self, driver_id: str) -> List[Dict]:
+        return self._active(self._driver_assignments, driver_id)
+
+    # Assignment operations
+    def _active(self, by_owner: Dict[str, set], owner_id: str) -> List[Dict]:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            docs = (self.assignments.docs[aid] for aid in by_owner.get(owner_id, ()))
+            return [_project(doc) for doc in docs if _is_active(doc, now)]
+
+    def _check_ongoing(self, doc: Dict, aid: Optional[str] = None):
+        # Same rule as the driver_id/vehicle_id_ongoing_unique partial indexes
+        if not doc.get("ongoing"):
+            return
+        if self._ongoing_drivers.get(doc["driver_id"], aid) != aid:
+            raise StorageConflict("DRIVER_ALREADY_ASSIGNED", "Driver already has an active assignment")
+        if self._ongoing_vehicles.get(doc["vehicle_id"], aid) != aid:
+            raise StorageConflict("VEHICLE_ALREADY_ASSIGNED", "Vehicle already has an active assignment")
+
+    def _index_assignment(self, doc: Dict):
+        self._driver_assignments.setdefault(doc["driver_id"], set()).add(doc["id"])
+        self._vehicle_assignments.setdefault(doc["vehicle_id"], set()).add(doc["id"])
+        if doc.get("ongoing"):
+            self._ongoing_drivers[doc["driver_id"]] = doc["id"]
+            self._ongoing_vehicles[doc["vehicle_id"]] = doc["id"]
+
+    def _unindex_assignment(self, doc: Dict):
+        self._driver_assignments.get(doc["driver_id"], set()).discard(doc["id"])
+        self._vehicle_assignments.get(doc["vehicle_id"], set()).discard(doc["id"])
+        if self._ongoing_drivers.get(doc["driver_id"]) == doc["id"]:
+            del self._ongoing_drivers[doc["driver_id"]]
+        if self._ongoing_vehicles.get(doc["vehicle_id"]) == doc["id"]:
+            del self._ongoing_vehicles[doc["vehicle_id"]]
+
+    def _insert_assignment(self, doc: Dict):
+        if doc["id"] in self.assignments.docs:
+            raise ValueError("Duplicate assignment")
+        self._check_ongoing(doc)
+        self.assignments.insert(doc)
+        self._index_assignment(doc)
+
+    def create_assignment(self, assignment: Dict):
+        assignment_copy = _with_ongoing_flag({"end_datetime": None, **assignment})
+        with self._lock:
+            self._insert_assignment(assignment_copy)
+            self._touch("assignments")
+        return dict(assignment_copy)
+
+    def _preflight(self, driver_id: str, vehicle_id: str) -> List[Dict]:
+        """The documents assignment_preflight_pipeline would return, from the hash indexes."""
+        docs = []
+        for kind, collection, id_ in (("driver", self.drivers, driver_id), ("vehicle", self.vehicles, vehicle_id)):
+            doc = collection.docs.get(id_)
+            if doc is not None:
+                docs.append({"kind": kind, "status": doc.get("status"), "deleted": doc.get("deleted")})
+        now = datetime.now(timezone.utc)
+        for kind, by_owner, owner_id in (("driver_assignment", self._driver_assignments, driver_id), ("vehicle_assignment", self._vehicle_assignments, vehicle_id)):
+            if any(_is_active(self.assignments.docs[aid], now) for aid in by_owner.get(owner_id, ())):
+                docs.append({"kind": kind})
+        return docs
+
+    def create_assignment_checked(self, assignment: Dict):
+        """Validate the driver, vehicle and exclusivity, then insert, under one lock.
+
+        Raises StorageConflict with the business error code.
+        """
+        with self._lock:
+            check_assignment_preflight(self._preflight(assignment["driver_id"], assignment["vehicle_id"]))
+            return self.create_assignment(assignment)
+
+    def create_assignments_bulk(self, assignments: List[Dict]) -> List[Optional[ValueError]]:
+        """Validate and insert a batch of assignments; returns per-item errors (None on success)."""
+        with self._lock:
+            fields = ("id", "status", "deleted")
+            drivers = {a["driver_id"]: _project(self.drivers.docs[a["driver_id"]], fields) for a in assignments if a["driver_id"] in self.drivers.docs}
+            vehicles = {a["vehicle_id"]: _project(self.vehicles.docs[a["vehicle_id"]], fields) for a in assignments if a["vehicle_id"] in self.vehicles.docs}
+            now = datetime.now(timezone.utc)
+            owners = [(self._driver_assignments, a["driver_id"]) for a in assignments] + [(self._vehicle_assignments, a["vehicle_id"]) for a in assignments]
+            active_ids = {aid for by_owner, owner_id in owners for aid in by_owner.get(owner_id, ())}
+            active = [self.assignments.docs[aid] for aid in active_ids if _is_active(self.assignments.docs[aid], now)]
+            errors, accepted = plan_assignment_batch(assignments, drivers, vehicles, active)
+            for index, doc in accepted:
+                try:
+                    self._insert_assignment(doc)
+                except ValueError as e:
+                    errors[index] = e
+            if any(errors[index] is None for index, _ in accepted):
+                self._touch("assignments")
+            return errors
+
+    def get_assignment(self, aid: str, fields: Optional[List[str]] = None, fresh: bool = False) -> Optional[Dict]:
+        # Always current in process; fresh is accepted for parity with MongoStorage
+        return self._get(self.assignments, aid, fields)
+
+    def update_assignment(self, aid: str, updates: Dict) -> Optional[Dict]:
+        with self._lock:
+            old = self.assignments.docs.get(aid)
+            if old is None:
+                return None
+            new = {**old, **_with_ongoing_flag(updates)}
+            self._check_ongoing(new, aid)
+            self._unindex_assignment(old)
+            self.assignments.replace(old, new)
+            self._index_assignment(new)
+            self._touch("assignments")
+            return _project(new)
+
+    def delete_assignment(self, aid: str):
+        with self._lock:
+            doc = self.assignments.docs.get(aid)
+            if doc is not None:
+                self._unindex_assignment(doc)
+                self.assignments.remove(doc)
+            self._touch("assignments")
+
+    def _assignment_match(self, driver_id: Optional[str], vehicle_id: Optional[str], active: Optional[bool], start_from: Optional[datetime], start_to: Optional[datetime]) -> tuple:
+        """Predicate and candidate ids (from the per-driver/vehicle index) for the list_assignments filters."""
+        now = datetime.now(timezone.utc)
+
+        def match(doc: Dict) -> bool:
+            if driver_id and doc["driver_id"] != driver_id:
+                return False
+            if vehicle_id and doc["vehicle_id"] != vehicle_id:
+                return False
+            if active is not None and _is_active(doc, now) != active:
+                return False
+            start = doc.get("start_datetime")
+            if start_from and (start is None or _as_utc(start) < _as_utc(start_from)):
+                return False
+            if start_to and (start is None or _as_utc(start) >= _as_utc(start_to)):
+                return False
+            return True
+
+        ids = None
+        if driver_id:
+            ids = self._driver_assignments.get(driver_id, set())
+        elif vehicle_id:
+            ids = self._vehicle_assignments.get(vehicle_id, set())
+        return match, ids
+
+    def list_assignments(self, limit: int = 50, skip: int = 0, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, after: Optional[tuple] = None, with_total: bool = True,
+                         active: Optional[bool] = None, start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of assignments and the total match count."""
+        with self._lock:
+            match, ids = self._assignment_match(driver_id, vehicle_id, active, start_from, start_to)
+            return self._find_page(self.assignments, match, limit, skip, None, after, with_total, fields, ids)
+
+    def iter_assignments(self, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, after: Optional[tuple] = None, active: Optional[bool] = None,
+                         start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every assignment matching the list_assignments filters."""
+        with self._lock:
+            match, ids = self._assignment_match(driver_id, vehicle_id, active, start_from, start_to)
+            ids = None if ids is None else list(ids)
+        return self._iter(self.assignments, match, None, after, batch_size, fields, ids)
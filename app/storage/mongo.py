@@ -1,36 +1,350 @@
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+import logging
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ServerSelectionTimeoutError
 from datetime import datetime, timezone
-from typing import Optional, List, Dict
+from typing import Callable, Iterator, Optional, List, Dict, Tuple
 from app.config import settings
+from app.storage.cache import EntityCache, select_fields
+from app.storage.errors import StorageConflict, duplicate_key
+from app.storage.pool import client_options, warm_up
+from app.storage.read_model import UNKNOWN, ReadModel
+from app.storage.slowlog import SLOW_QUERIES
+
+logger = logging.getLogger("app.storage")
 
 # Global MongoDB client
 _client: Optional[MongoClient] = None
 _db = None
 
+# Default stable ordering for list queries
+DEFAULT_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
 
 def connect_mongo():
-    """Connect to MongoDB and create indexes."""
+    """Connect to MongoDB, create indexes, warm the pool up and bind the slow query explainer."""
     global _client, _db
     try:
-        _client = MongoClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
+        _client = MongoClient(settings.MONGODB_URI, **client_options())
         _client.admin.command('ping')
         _db = _client[settings.DATABASE_NAME]
-        
-        # Create indexes
-        _db["vehicles"].create_index("plate_number", unique=True, sparse=True)
-        _db["drivers"].create_index("license_number", unique=True, sparse=True)
-        
+        ensure_indexes(_db)
+        warm_up()
+        SLOW_QUERIES.bind(_db)
         return _db
     except ServerSelectionTimeoutError as e:
         raise ConnectionError(f"Failed to connect to MongoDB: {e}")
 
 
+# (collection, keys, options) for every index the storage queries rely on
+VERSION_INDEX = "id_deleted_updated_at"
+
+INDEXES = [
+    ("vehicles", "id", {"unique": True}),
+    ("drivers", "id", {"unique": True}),
+    ("assignments", "id", {"unique": True}),
+    # Plates and licenses are unique among non-deleted records only, so a
+    # soft-deleted record does not block reuse and inserts need no pre-read.
+    ("vehicles", "plate_number", {"unique": True, "partialFilterExpression": {"deleted": False}}),
+    ("drivers", "license_number", {"unique": True, "partialFilterExpression": {"deleted": False}}),
+    # Conditional GETs read updated_at from this index alone (covered query)
+    ("vehicles", [("id", ASCENDING), ("deleted", ASCENDING), ("updated_at", ASCENDING)], {"name": VERSION_INDEX}),
+    ("drivers", [("id", ASCENDING), ("deleted", ASCENDING), ("updated_at", ASCENDING)], {"name": VERSION_INDEX}),
+    # List validators read the newest updated_at from these alone (covered query)
+    ("vehicles", "updated_at", {}),
+    ("drivers", "updated_at", {}),
+    ("assignments", "updated_at", {}),
+    # list_vehicles: equality on deleted/status, then the default sort keys
+    ("vehicles", [("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("vehicles", [("deleted", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("vehicles", [("deleted", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    # list_drivers: same shape as list_vehicles
+    ("drivers", [("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("drivers", [("deleted", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("drivers", [("deleted", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    # list_assignments: optional driver/vehicle equality, then the default sort keys
+    ("assignments", [("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("assignments", [("driver_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("assignments", [("vehicle_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ("assignments", [("start_datetime", ASCENDING)], {}),
+    # Active-assignment lookups per driver/vehicle
+    ("assignments", [("driver_id", ASCENDING), ("end_datetime", ASCENDING)], {}),
+    ("assignments", [("vehicle_id", ASCENDING), ("end_datetime", ASCENDING)], {}),
+    # At most one ongoing (end_datetime=None) assignment per driver and per vehicle
+    ("assignments", "driver_id", {"unique": True, "partialFilterExpression": {"ongoing": True}, "name": "driver_id_ongoing_unique"}),
+    ("assignments", "vehicle_id", {"unique": True, "partialFilterExpression": {"ongoing": True}, "name": "vehicle_id_ongoing_unique"}),
+]
+
+# Partial unique index guarding the ongoing assignments of each field
+ONGOING_INDEXES = {"driver_id": "driver_id_ongoing_unique", "vehicle_id": "vehicle_id_ongoing_unique"}
+
+# Flags assignments written before the ongoing flag existed, so the partial
+# unique indexes see them; without it they would not block a second ongoing one.
+# Runs only while one of ONGOING_INDEXES is missing, i.e. once per deployment.
+ONGOING_BACKFILL = ({"end_datetime": None, "ongoing": {"$exists": False}}, {"$set": {"ongoing": True}})
+
+
+def duplicate_ongoing_pipeline(field: str) -> List[Dict]:
+    """Aggregation grouping the ongoing assignments per field value held by more than one, newest start first."""
+    return [
+        {"$match": {"ongoing": True}},
+        {"$sort": {"start_datetime": DESCENDING, "id": DESCENDING}},
+        {"$group": {"_id": f"${field}", "ids": {"$push": "$id"}, "starts": {"$push": "$start_datetime"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+
+
+def close_duplicates(field: str, group: Dict) -> Tuple[Dict, Dict]:
+    """(filter, update) ending all but the newest ongoing assignment of a duplicate group when the newest starts."""
+    stale = group["ids"][1:]
+    logger.warning("%s %s has %d ongoing assignments; closing %s before building %s",
+                   field, group["_id"], group["count"], ", ".join(map(str, stale)), ONGOING_INDEXES[field])
+    update = {"end_datetime": group["starts"][0], "ongoing": False, "updated_at": datetime.now(timezone.utc)}
+    return {"id": {"$in": stale}, "ongoing": True}, {"$set": update}
+
+
+# Sparse unique indexes from earlier releases that also covered deleted records
+LEGACY_INDEXES = [("vehicles", "plate_number_1"), ("drivers", "license_number_1")]
+
+
+def _is_legacy_index(info: Optional[Dict]) -> bool:
+    return bool(info) and "partialFilterExpression" not in info
+
+
+def ensure_indexes(db):
+    """Create the indexes required by the storage queries.
+
+    Before the first build of the ongoing unique indexes, backfills the ongoing
+    flag and closes duplicate ongoing assignments that would make the build fail.
+    """
+    for coll, name in LEGACY_INDEXES:
+        if _is_legacy_index(db[coll].index_information().get(name)):
+            db[coll].drop_index(name)
+    existing = db.assignments.index_information()
+    missing = [field for field, name in ONGOING_INDEXES.items() if name not in existing]
+    if missing:
+        db.assignments.update_many(*ONGOING_BACKFILL)
+    for field in missing:
+        for group in db.assignments.aggregate(duplicate_ongoing_pipeline(field)):
+            db.assignments.update_many(*close_duplicates(field, group))
+    for coll, keys, options in INDEXES:
+        db[coll].create_index(keys, **options)
+
+
+# Newest updated_at of a collection, answered from its updated_at index alone
+LATEST_PROJECTION = {"_id": 0, "updated_at": 1}
+LATEST_SORT = [("updated_at", DESCENDING)]
+
+
+def watermark(count: int, latest: Optional[Dict]) -> Dict:
+    """Change watermark {"version", "updated_at"} from a document count and the newest updated_at.
+
+    Every write changes one of the two: inserts and hard deletes the count,
+    updates and soft deletes the newest updated_at. Two writes within the
+    same millisecond may leave it unchanged.
+    """
+    updated_at = latest.get("updated_at") if latest else None
+    if updated_at is None:
+        return {"version": f"{count}-0", "updated_at": None}
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return {"version": f"{count}-{int(updated_at.timestamp() * 1000)}", "updated_at": updated_at}
+
+
+def active_assignment_query(field: str, value: str) -> Dict:
+    """Build the filter for assignments that are ongoing or end in the future."""
+    now = datetime.now(timezone.utc)
+    return {
+        field: value,
+        "$or": [
+            {"end_datetime": None},
+            {"end_datetime": {"$gte": now}}
+        ]
+    }
+
+
+def keyset_query(query: Dict, after: Optional[tuple]) -> Dict:
+    """Restrict query to documents sorted after the (created_at, id) key under DEFAULT_SORT."""
+    if not after:
+        return query
+    created_at, last_id = after
+    position = {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": last_id}},
+    ]}
+    return {"$and": [query, position]} if query else position
+
+
+def assignment_list_query(driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, active: Optional[bool] = None,
+                          start_from: Optional[datetime] = None, start_to: Optional[datetime] = None) -> Dict:
+    """Build the list_assignments filter; active=False selects closed assignments."""
+    query = {}
+    if driver_id:
+        query["driver_id"] = driver_id
+    if vehicle_id:
+        query["vehicle_id"] = vehicle_id
+    if active is not None:
+        now = datetime.now(timezone.utc)
+        if active:
+            query["$or"] = [{"end_datetime": None}, {"end_datetime": {"$gte": now}}]
+        else:
+            query["end_datetime"] = {"$lt": now}
+    if start_from or start_to:
+        query["start_datetime"] = {}
+        if start_from:
+            query["start_datetime"]["$gte"] = start_from
+        if start_to:
+            query["start_datetime"]["$lt"] = start_to
+    return query
+
+
+def assignment_preflight_pipeline(driver_id: str, vehicle_id: str) -> List[Dict]:
+    """Build an aggregate, run on drivers, that returns in one round trip the
+    driver, the vehicle and at most one active assignment of each, tagged by kind."""
+    def active(field: str, value: str, kind: str) -> Dict:
+        return {"$unionWith": {"coll": "assignments", "pipeline": [
+            {"$match": active_assignment_query(field, value)},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "kind": {"$literal": kind}}},
+        ]}}
+    return [
+        {"$match": {"id": driver_id}},
+        {"$project": {"_id": 0, "kind": {"$literal": "driver"}, "status": 1, "deleted": 1}},
+        {"$unionWith": {"coll": "vehicles", "pipeline": [
+            {"$match": {"id": vehicle_id}},
+            {"$project": {"_id": 0, "kind": {"$literal": "vehicle"}, "status": 1, "deleted": 1}},
+        ]}},
+        active("driver_id", driver_id, "driver_assignment"),
+        active("vehicle_id", vehicle_id, "vehicle_assignment"),
+    ]
+
+
+def check_assignment_preflight(docs: List[Dict]):
+    """Raise StorageConflict for the first assignment rule the preflight docs violate."""
+    found = {d["kind"]: d for d in docs}
+    driver = found.get("driver")
+    vehicle = found.get("vehicle")
+    if not driver or driver.get("deleted"):
+        raise StorageConflict("DRIVER_NOT_FOUND", "Driver not found", status_code=404)
+    if not vehicle or vehicle.get("deleted"):
+        raise StorageConflict("VEHICLE_NOT_FOUND", "Vehicle not found", status_code=404)
+    if driver.get("status") == "SUSPENDED":
+        raise StorageConflict("DRIVER_SUSPENDED", "Driver suspended")
+    if vehicle.get("status") in ("INACTIVE", "MAINTENANCE"):
+        raise StorageConflict("VEHICLE_INACTIVE", "Vehicle inactive or under maintenance")
+    if "driver_assignment" in found:
+        raise StorageConflict("DRIVER_ALREADY_ASSIGNED", "Driver already has an active assignment")
+    if "vehicle_assignment" in found:
+        raise StorageConflict("VEHICLE_ALREADY_ASSIGNED", "Vehicle already has an active assignment")
+
+
+def conflict_from_duplicate(exc: DuplicateKeyError) -> ValueError:
+    """Map a duplicate key on the ongoing-assignment indexes to its business error."""
+    return _assignment_duplicate((exc.details or {}).get("keyPattern") or {}, str(exc))
+
+
+def _assignment_duplicate(key: Dict, message: str) -> ValueError:
+    if "driver_id" in key or "driver_id_ongoing_unique" in message:
+        return StorageConflict("DRIVER_ALREADY_ASSIGNED", "Driver already has an active assignment")
+    if "vehicle_id" in key or "vehicle_id_ongoing_unique" in message:
+        return StorageConflict("VEHICLE_ALREADY_ASSIGNED", "Vehicle already has an active assignment")
+    return ValueError("Duplicate assignment")
+
+
+def bulk_write_failures(exc: BulkWriteError, duplicate: Callable[[Dict], ValueError]) -> Dict[int, ValueError]:
+    """Map the writeErrors of an unordered insert_many to {input index: error}."""
+    failures = {}
+    for err in (exc.details or {}).get("writeErrors", []):
+        if err.get("code") == 11000:
+            failures[err["index"]] = duplicate(err)
+        else:
+            failures[err["index"]] = ValueError(err.get("errmsg", "Write failed"))
+    return failures
+
+
+def unique_key_error(field: str) -> Callable[[Dict], ValueError]:
+    """duplicate callback for bulk_write_failures: a conflict on field's unique index, a plain ValueError on any other."""
+    def duplicate(err: Dict) -> ValueError:
+        if field in (err.get("keyPattern") or {}) or f"{field}_1" in err.get("errmsg", ""):
+            return duplicate_key(field)
+        return ValueError(err.get("errmsg", "Duplicate key"))
+    return duplicate
+
+
+def assignment_write_error(err: Dict) -> ValueError:
+    """duplicate callback for bulk_write_failures on the assignments collection."""
+    return _assignment_duplicate(err.get("keyPattern") or {}, err.get("errmsg", ""))
+
+
+def bulk_active_assignments_query(driver_ids: List[str], vehicle_ids: List[str]) -> Dict:
+    """Filter for active assignments held by any of the given drivers or vehicles."""
+    now = datetime.now(timezone.utc)
+    return {"$and": [
+        {"$or": [{"driver_id": {"$in": driver_ids}}, {"vehicle_id": {"$in": vehicle_ids}}]},
+        {"$or": [{"end_datetime": None}, {"end_datetime": {"$gte": now}}]},
+    ]}
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def plan_assignment_batch(assignments: List[Dict], drivers: Dict[str, Dict], vehicles: Dict[str, Dict], active: List[Dict]) -> tuple:
+    """Apply the create_assignment rules to a batch without touching the database.
+
+    drivers/vehicles map id to document, active lists the current active
+    assignments of the referenced drivers and vehicles. Earlier items in the
+    batch claim their driver and vehicle for later ones. Returns per-item
+    errors (None when accepted) and (index, document) pairs to insert.
+    """
+    busy_drivers = {a["driver_id"] for a in active}
+    busy_vehicles = {a["vehicle_id"] for a in active}
+    now = datetime.now(timezone.utc)
+    errors: List[Optional[ValueError]] = [None] * len(assignments)
+    accepted = []
+    for index, assignment in enumerate(assignments):
+        docs = []
+        if assignment["driver_id"] in drivers:
+            docs.append({**drivers[assignment["driver_id"]], "kind": "driver"})
+        if assignment["vehicle_id"] in vehicles:
+            docs.append({**vehicles[assignment["vehicle_id"]], "kind": "vehicle"})
+        if assignment["driver_id"] in busy_drivers:
+            docs.append({"kind": "driver_assignment"})
+        if assignment["vehicle_id"] in busy_vehicles:
+            docs.append({"kind": "vehicle_assignment"})
+        try:
+            check_assignment_preflight(docs)
+        except StorageConflict as e:
+            errors[index] = e
+            continue
+        end = assignment.get("end_datetime")
+        if end is None or _as_utc(end) >= now:
+            busy_drivers.add(assignment["driver_id"])
+            busy_vehicles.add(assignment["vehicle_id"])
+        accepted.append((index, _with_ongoing_flag({"end_datetime": None, **assignment})))
+    return errors, accepted
+
+
+def projection(fields: Optional[List[str]] = None) -> Dict:
+    """Mongo projection for a read: only fields when given, never _id or the ongoing flag."""
+    if fields is None:
+        return {"_id": 0, "ongoing": 0}
+    return {"_id": 0, **{f: 1 for f in fields}}
+
+
+def _with_ongoing_flag(fields: Dict) -> Dict:
+    """Mirror end_datetime into the ongoing flag used by the partial unique indexes."""
+    if "end_datetime" not in fields:
+        return fields
+    return {**fields, "ongoing": fields["end_datetime"] is None}
+
+
 def disconnect_mongo():
     """Close MongoDB connection."""
-    global _client
+    global _client, _db
     if _client:
         _client.close()
+    _client = None
+    _db = None
 
 
 def get_db():
@@ -43,8 +357,12 @@ def get_db():
 class MongoStorage:
     """MongoDB-backed storage for fleet management entities."""
 
-    def __init__(self, db=None):
+    def __init__(self, db=None, cache: Optional[EntityCache] = None, read_model: Optional[ReadModel] = None):
         self.db = db if db is not None else get_db()
+        # Read-through cache for get_*; None reads every entity from the database
+        self.cache = cache
+        # Change-stream replica answering vehicle and driver lookups when fresh
+        self.read_model = read_model
 
     # Vehicle operations
     def create_vehicle(self, vehicle: Dict):
@@ -53,34 +371,153 @@ class MongoStorage:
         vehicle_copy["deleted"] = False
         try:
             result = self.db.vehicles.insert_one(vehicle_copy)
+            self._touch("vehicles", vehicle_copy["id"])
             vehicle_copy["_id"] = result.inserted_id
             return vehicle_copy
         except DuplicateKeyError:
             raise ValueError("Duplicate plate number")
 
-    def get_vehicle(self, vid: str) -> Optional[Dict]:
-        return self.db.vehicles.find_one({"id": vid})
+    def create_vehicles_bulk(self, vehicles: List[Dict]) -> List[Optional[ValueError]]:
+        """Insert vehicles with one unordered insert_many; returns per-item errors (None on success)."""
+        docs = [{**v, "deleted": False} for v in vehicles]
+        return self._insert_many(self.db.vehicles, docs, unique_key_error("plate_number"))
+
+    def get_vehicle(self, vid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        return self._get(self.db.vehicles, vid, fields)
+
+    def get_vehicle_version(self, vid: str) -> Optional[datetime]:
+        """updated_at of a non-deleted vehicle, answered from the covering version index."""
+        return self._version(self.db.vehicles, vid)
 
     def find_vehicle_by_plate(self, plate_norm: str) -> Optional[Dict]:
-        return self.db.vehicles.find_one({"plate_number": plate_norm, "deleted": False})
+        return self._find_key(self.db.vehicles, "plate_number", plate_norm)
 
     def update_vehicle(self, vid: str, updates: Dict) -> Optional[Dict]:
-        self.db.vehicles.update_one({"id": vid}, {"$set": updates})
-        return self.get_vehicle(vid)
+        try:
+            return self._touched("vehicles", vid, self.db.vehicles.find_one_and_update({"id": vid}, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate plate number")
+
+    def update_vehicle_if_match(self, vid: str, expected_updated_at: datetime, updates: Dict) -> Optional[Dict]:
+        """Apply updates only if the vehicle is not deleted and still has expected_updated_at.
+
+        Returns the updated vehicle, or None when nothing matched (missing, deleted
+        or modified since the caller read it).
+        """
+        query = {"id": vid, "deleted": False, "updated_at": expected_updated_at}
+        try:
+            return self._touched("vehicles", vid, self.db.vehicles.find_one_and_update(query, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate plate number")
 
     def soft_delete_vehicle(self, vid: str):
-        self.db.vehicles.update_one({"id": vid}, {"$set": {"deleted": True}})
+        self.db.vehicles.update_one({"id": vid}, {"$set": {"deleted": True, "updated_at": datetime.now(timezone.utc)}})
+        self._touch("vehicles", vid)
+
+    def _insert_many(self, collection, docs: List[Dict], duplicate: Callable[[Dict], ValueError]) -> List[Optional[ValueError]]:
+        errors: List[Optional[ValueError]] = [None] * len(docs)
+        if not docs:
+            return errors
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for index, error in bulk_write_failures(e, duplicate).items():
+                errors[index] = error
+        if any(error is None for error in errors):
+            self._touch(collection.name, *(doc["id"] for doc, error in zip(docs, errors) if error is None))
+        return errors
+
+    def clear(self):
+        """Delete every vehicle, driver and assignment."""
+        for name in ("vehicles", "drivers", "assignments"):
+            self.db[name].delete_many({})
+            self._touch(name)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _touch(self, collection: str, *ids: str):
+        """Drop the written ids from the cache and the read model."""
+        if self.cache is not None and ids:
+            self.cache.invalidate(collection, ids)
+        if self.read_model is not None and ids:
+            self.read_model.invalidate(collection, ids)
+
+    def _touched(self, collection: str, id_: str, result: Optional[Dict]) -> Optional[Dict]:
+        if result is not None:
+            self._touch(collection, id_)
+        return result
+
+    def _get(self, collection, id_: str, fields: Optional[List[str]], fresh: bool = False) -> Optional[Dict]:
+        if fresh:
+            return collection.find_one({"id": id_}, projection(fields))
+        if self.read_model is not None:
+            doc = self.read_model.get(collection.name, id_, fields)
+            if doc is not UNKNOWN:
+                return doc
+        if self.cache is None:
+            return collection.find_one({"id": id_}, projection(fields))
+        doc = self.cache.get(collection.name, id_, fields)
+        if doc is not None:
+            return doc
+        # The whole document is fetched and cached; fields are applied in process
+        generation = self.cache.generation(collection.name)
+        doc = collection.find_one({"id": id_}, projection())
+        if doc is not None:
+            self.cache.put(collection.name, id_, doc, generation)
+        return select_fields(doc, fields)
+
+    def get_watermark(self, collection: str) -> Dict:
+        """Return the change watermark {"version", "updated_at"} of a collection.
+
+        Derived from the collection metadata count and the updated_at index, so
+        writes pay nothing for it.
+        """
+        coll = self.db[collection]
+        latest = next(iter(coll.find({}, LATEST_PROJECTION).sort(LATEST_SORT).limit(1)), None)
+        return watermark(coll.estimated_document_count(), latest)
+
+    def _find_key(self, collection, field: str, value: str) -> Optional[Dict]:
+        if self.read_model is not None:
+            doc = self.read_model.find(collection.name, value)
+            if doc is not UNKNOWN:
+                return doc
+        return collection.find_one({field: value, "deleted": False}, projection())
+
+    def _version(self, collection, id_: str) -> Optional[datetime]:
+        if self.read_model is not None:
+            doc = self.read_model.get(collection.name, id_, ["deleted", "updated_at"])
+            if doc is not UNKNOWN:
+                return None if doc is None or doc.get("deleted") else doc.get("updated_at")
+        # Not from the entity cache: it could answer 304 for a version another worker replaced
+        cursor = collection.find({"id": id_, "deleted": False}, {"_id": 0, "updated_at": 1}).hint(VERSION_INDEX).limit(1)
+        for doc in cursor:
+            return doc.get("updated_at")
+        return None
+
+    def _iter(self, collection, query: Dict, sort: Optional[List], after: Optional[tuple], batch_size: int, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        cursor = collection.find(keyset_query(query, after), projection(fields)).sort(sort or DEFAULT_SORT).batch_size(batch_size)
+        yield from cursor
+
+    def _find_page(self, collection, query: Dict, limit: int, skip: int, sort: Optional[List], after: Optional[tuple], with_total: bool, fields: Optional[List[str]] = None) -> tuple:
+        total = collection.count_documents(query) if with_total else None
+        cursor = collection.find(keyset_query(query, after), projection(fields)).sort(sort or DEFAULT_SORT).skip(skip).limit(limit)
+        return list(cursor), total
+
+    def list_vehicles(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True,
+                      fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of vehicles matching filter and the total match count.
+
+        after is a (created_at, id) keyset position under DEFAULT_SORT; with
+        with_total=False the count is skipped and None is returned instead.
+        """
+        return self._find_page(self.db.vehicles, filter or {}, limit, skip, sort, after, with_total, fields)
+
+    def iter_vehicles(self, filter: Optional[Dict] = None, sort: Optional[List] = None, after: Optional[tuple] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every vehicle matching filter, fetching batch_size documents per round trip."""
+        return self._iter(self.db.vehicles, filter or {}, sort, after, batch_size, fields)
 
     def list_active_assignments_for_vehicle(self, vehicle_id: str) -> List[Dict]:
-        now = datetime.now(timezone.utc)
-        query = {
-            "vehicle_id": vehicle_id,
-            "$or": [
-                {"end_datetime": None},
-                {"end_datetime": {"$gte": now}}
-            ]
-        }
-        return list(self.db.assignments.find(query))
+        return list(self.db.assignments.find(active_assignment_query("vehicle_id", vehicle_id), projection()))
 
     # Driver operations
     def create_driver(self, driver: Dict):
@@ -88,57 +525,128 @@ class MongoStorage:
         driver_copy["deleted"] = False
         try:
             result = self.db.drivers.insert_one(driver_copy)
+            self._touch("drivers", driver_copy["id"])
             driver_copy["_id"] = result.inserted_id
             return driver_copy
         except DuplicateKeyError:
             raise ValueError("Duplicate license number")
 
-    def get_driver(self, did: str) -> Optional[Dict]:
-        return self.db.drivers.find_one({"id": did})
+    def create_drivers_bulk(self, drivers: List[Dict]) -> List[Optional[ValueError]]:
+        """Insert drivers with one unordered insert_many; returns per-item errors (None on success)."""
+        docs = [{**d, "deleted": False} for d in drivers]
+        return self._insert_many(self.db.drivers, docs, unique_key_error("license_number"))
+
+    def get_driver(self, did: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        return self._get(self.db.drivers, did, fields)
+
+    def get_driver_version(self, did: str) -> Optional[datetime]:
+        """updated_at of a non-deleted driver, answered from the covering version index."""
+        return self._version(self.db.drivers, did)
 
     def find_driver_by_license(self, license_norm: str) -> Optional[Dict]:
-        return self.db.drivers.find_one({"license_number": license_norm, "deleted": False})
+        return self._find_key(self.db.drivers, "license_number", license_norm)
 
     def update_driver(self, did: str, updates: Dict) -> Optional[Dict]:
-        self.db.drivers.update_one({"id": did}, {"$set": updates})
-        return self.get_driver(did)
+        try:
+            return self._touched("drivers", did, self.db.drivers.find_one_and_update({"id": did}, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate license number")
+
+    def update_driver_if_match(self, did: str, expected_updated_at: datetime, updates: Dict) -> Optional[Dict]:
+        """Apply updates only if the driver is not deleted and still has expected_updated_at.
+
+        Returns the updated driver, or None when nothing matched (missing, deleted
+        or modified since the caller read it).
+        """
+        query = {"id": did, "deleted": False, "updated_at": expected_updated_at}
+        try:
+            return self._touched("drivers", did, self.db.drivers.find_one_and_update(query, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate license number")
 
     def soft_delete_driver(self, did: str):
-        self.db.drivers.update_one({"id": did}, {"$set": {"deleted": True}})
+        self.db.drivers.update_one({"id": did}, {"$set": {"deleted": True, "updated_at": datetime.now(timezone.utc)}})
+        self._touch("drivers", did)
+
+    def list_drivers(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True,
+                     fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of drivers matching filter and the total match count."""
+        return self._find_page(self.db.drivers, filter or {}, limit, skip, sort, after, with_total, fields)
+
+    def iter_drivers(self, filter: Optional[Dict] = None, sort: Optional[List] = None, after: Optional[tuple] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every driver matching filter, fetching batch_size documents per round trip."""
+        return self._iter(self.db.drivers, filter or {}, sort, after, batch_size, fields)
 
     def list_active_assignments_for_driver(self, driver_id: str) -> List[Dict]:
-        now = datetime.now(timezone.utc)
-        query = {
-            "driver_id": driver_id,
-            "$or": [
-                {"end_datetime": None},
-                {"end_datetime": {"$gte": now}}
-            ]
-        }
-        return list(self.db.assignments.find(query))
+        return list(self.db.assignments.find(active_assignment_query("driver_id", driver_id), projection()))
 
     # Assignment operations
     def create_assignment(self, assignment: Dict):
-        result = self.db.assignments.insert_one(assignment)
-        assignment["_id"] = result.inserted_id
-        return assignment
+        assignment_copy = _with_ongoing_flag({"end_datetime": None, **assignment})
+        try:
+            result = self.db.assignments.insert_one(assignment_copy)
+            self._touch("assignments", assignment_copy["id"])
+        except DuplicateKeyError as e:
+            raise conflict_from_duplicate(e)
+        assignment_copy["_id"] = result.inserted_id
+        return assignment_copy
+
+    def create_assignment_checked(self, assignment: Dict):
+        """Validate the driver, vehicle and exclusivity with one aggregate, then insert.
 
-    def get_assignment(self, aid: str) -> Optional[Dict]:
-        return self.db.assignments.find_one({"id": aid})
+        Raises StorageConflict with the business error code. The partial unique
+        indexes on ongoing assignments reject a concurrent create that passed
+        the same checks.
+        """
+        pipeline = assignment_preflight_pipeline(assignment["driver_id"], assignment["vehicle_id"])
+        check_assignment_preflight(list(self.db.drivers.aggregate(pipeline)))
+        return self.create_assignment(assignment)
+
+    def create_assignments_bulk(self, assignments: List[Dict]) -> List[Optional[ValueError]]:
+        """Validate and insert a batch of assignments; returns per-item errors (None on success).
+
+        Three reads load every referenced driver, vehicle and active assignment,
+        then accepted items go out in one unordered insert_many guarded by the
+        ongoing-assignment unique indexes.
+        """
+        driver_ids = list({a["driver_id"] for a in assignments})
+        vehicle_ids = list({a["vehicle_id"] for a in assignments})
+        fields = {"_id": 0, "id": 1, "status": 1, "deleted": 1}
+        drivers = {d["id"]: d for d in self.db.drivers.find({"id": {"$in": driver_ids}}, fields)}
+        vehicles = {v["id"]: v for v in self.db.vehicles.find({"id": {"$in": vehicle_ids}}, fields)}
+        active = list(self.db.assignments.find(bulk_active_assignments_query(driver_ids, vehicle_ids), {"_id": 0, "driver_id": 1, "vehicle_id": 1}))
+        errors, accepted = plan_assignment_batch(assignments, drivers, vehicles, active)
+        insert_errors = self._insert_many(self.db.assignments, [doc for _, doc in accepted], assignment_write_error)
+        for (index, _), error in zip(accepted, insert_errors):
+            errors[index] = error
+        return errors
+
+    def get_assignment(self, aid: str, fields: Optional[List[str]] = None, fresh: bool = False) -> Optional[Dict]:
+        """Assignment by id; fresh=True reads the database, for reads that decide a write."""
+        return self._get(self.db.assignments, aid, fields, fresh)
 
     def update_assignment(self, aid: str, updates: Dict) -> Optional[Dict]:
-        self.db.assignments.update_one({"id": aid}, {"$set": updates})
-        return self.get_assignment(aid)
+        try:
+            return self._touched("assignments", aid, self.db.assignments.find_one_and_update({"id": aid}, {"$set": _with_ongoing_flag(updates)}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError as e:
+            raise conflict_from_duplicate(e)
 
     def delete_assignment(self, aid: str):
         self.db.assignments.delete_one({"id": aid})
+        self._touch("assignments", aid)
+
+    def list_assignments(self, limit: int = 50, skip: int = 0, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, after: Optional[tuple] = None, with_total: bool = True,
+                         active: Optional[bool] = None, start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of assignments and the total match count.
+
+        active=True keeps ongoing/future-ending assignments, active=False closed ones;
+        start_from/start_to bound start_datetime as a half-open range.
+        """
+        query = assignment_list_query(driver_id, vehicle_id, active, start_from, start_to)
+        return self._find_page(self.db.assignments, query, limit, skip, None, after, with_total, fields)
 
-    def list_assignments(self, limit: int = 50, skip: int = 0, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None) -> tuple:
-        query = {}
-        if driver_id:
-            query["driver_id"] = driver_id
-        if vehicle_id:
-            query["vehicle_id"] = vehicle_id
-        total = self.db.assignments.count_documents(query)
-        items = list(self.db.assignments.find(query).skip(skip).limit(limit))
-        return items, total
+    def iter_assignments(self, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, after: Optional[tuple] = None, active: Optional[bool] = None,
+                         start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield every assignment matching the list_assignments filters, batch_size per round trip."""
+        query = assignment_list_query(driver_id, vehicle_id, active, start_from, start_to)
+        return self._iter(self.db.assignments, query, None, after, batch_size, fields)
@@ -0,0 +1,340 @@
+"""Asyncio MongoDB storage built on Motor, mirroring MongoStorage."""
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ServerSelectionTimeoutError
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Optional, List, Dict
+from app.config import settings
+from app.storage.cache import EntityCache, select_fields
+from app.storage.pool import client_options, warm_up_async
+from app.storage.read_model import UNKNOWN, ReadModel
+from app.storage.slowlog import SLOW_QUERIES
+from app.storage.mongo import (
+    DEFAULT_SORT, INDEXES, LATEST_PROJECTION, ONGOING_BACKFILL, ONGOING_INDEXES, close_duplicates, duplicate_ongoing_pipeline, LATEST_SORT, VERSION_INDEX, LEGACY_INDEXES, _is_legacy_index, _with_ongoing_flag, active_assignment_query,
+    assignment_preflight_pipeline, check_assignment_preflight, conflict_from_duplicate, keyset_query,
+    assignment_list_query, assignment_write_error, projection, bulk_active_assignments_query, bulk_write_failures, plan_assignment_batch, unique_key_error, watermark,
+)
+
+# Global Motor client, created inside the running event loop
+_client: Optional[AsyncIOMotorClient] = None
+_db = None
+
+
+async def connect_motor():
+    """Connect to MongoDB with Motor, create indexes and warm the pool up to MONGO_MIN_POOL_SIZE."""
+    global _client, _db
+    try:
+        _client = AsyncIOMotorClient(settings.MONGODB_URI, **client_options())
+        await _client.admin.command('ping')
+        _db = _client[settings.DATABASE_NAME]
+        await ensure_indexes_async(_db)
+        await warm_up_async()
+        # Explains run on a worker thread, through the synchronous client Motor wraps
+        SLOW_QUERIES.bind(get_delegate_db())
+        return _db
+    except ServerSelectionTimeoutError as e:
+        raise ConnectionError(f"Failed to connect to MongoDB: {e}")
+
+
+async def ensure_indexes_async(db):
+    """Create the indexes required by the storage queries, as `app.storage.mongo.ensure_indexes` does."""
+    for coll, name in LEGACY_INDEXES:
+        info = await db[coll].index_information()
+        if _is_legacy_index(info.get(name)):
+            await db[coll].drop_index(name)
+    existing = await db.assignments.index_information()
+    missing = [field for field, name in ONGOING_INDEXES.items() if name not in existing]
+    if missing:
+        await db.assignments.update_many(*ONGOING_BACKFILL)
+    for field in missing:
+        async for group in db.assignments.aggregate(duplicate_ongoing_pipeline(field)):
+            await db.assignments.update_many(*close_duplicates(field, group))
+    for coll, keys, options in INDEXES:
+        await db[coll].create_index(keys, **options)
+
+
+def disconnect_motor():
+    """Close the Motor connection."""
+    global _client, _db
+    if _client:
+        _client.close()
+    _client = None
+    _db = None
+
+
+def get_delegate_db():
+    """pymongo Database behind the Motor client, for work done on threads."""
+    if _client is None:
+        raise RuntimeError("MongoDB not connected. Call connect_motor() first.")
+    return _client.delegate[settings.DATABASE_NAME]
+
+
+def get_async_db():
+    """Get the Motor database instance."""
+    if _db is None:
+        raise RuntimeError("MongoDB not connected. Call connect_motor() first.")
+    return _db
+
+
+class AsyncMongoStorage:
+    """Motor-backed storage with the same operations as MongoStorage, as coroutines."""
+
+    def __init__(self, db=None, cache: Optional[EntityCache] = None, read_model: Optional[ReadModel] = None):
+        self.db = db if db is not None else get_async_db()
+        # Read-through cache for get_*; None reads every entity from the database
+        self.cache = cache
+        # Change-stream replica answering vehicle and driver lookups when fresh
+        self.read_model = read_model
+
+    # Vehicle operations
+    async def create_vehicle(self, vehicle: Dict):
+        """Insert a vehicle; returns the vehicle."""
+        vehicle_copy = vehicle.copy()
+        vehicle_copy["deleted"] = False
+        try:
+            result = await self.db.vehicles.insert_one(vehicle_copy)
+            await self._touch("vehicles", vehicle_copy["id"])
+            vehicle_copy["_id"] = result.inserted_id
+            return vehicle_copy
+        except DuplicateKeyError:
+            raise ValueError("Duplicate plate number")
+
+    async def create_vehicles_bulk(self, vehicles: List[Dict]) -> List[Optional[ValueError]]:
+        """Insert vehicles with one unordered insert_many; returns per-item errors (None on success)."""
+        docs = [{**v, "deleted": False} for v in vehicles]
+        return await self._insert_many(self.db.vehicles, docs, unique_key_error("plate_number"))
+
+    async def get_vehicle(self, vid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        return await self._get(self.db.vehicles, vid, fields)
+
+    async def get_vehicle_version(self, vid: str) -> Optional[datetime]:
+        """updated_at of a non-deleted vehicle, answered from the covering version index."""
+        return await self._version(self.db.vehicles, vid)
+
+    async def find_vehicle_by_plate(self, plate_norm: str) -> Optional[Dict]:
+        return await self._find_key(self.db.vehicles, "plate_number", plate_norm)
+
+    async def update_vehicle(self, vid: str, updates: Dict) -> Optional[Dict]:
+        try:
+            return await self._touched("vehicles", vid, await self.db.vehicles.find_one_and_update({"id": vid}, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate plate number")
+
+    async def update_vehicle_if_match(self, vid: str, expected_updated_at: datetime, updates: Dict) -> Optional[Dict]:
+        """Apply updates only if the vehicle is not deleted and still has expected_updated_at."""
+        query = {"id": vid, "deleted": False, "updated_at": expected_updated_at}
+        try:
+            return await self._touched("vehicles", vid, await self.db.vehicles.find_one_and_update(query, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate plate number")
+
+    async def soft_delete_vehicle(self, vid: str):
+        await self.db.vehicles.update_one({"id": vid}, {"$set": {"deleted": True, "updated_at": datetime.now(timezone.utc)}})
+        await self._touch("vehicles", vid)
+
+    async def _insert_many(self, collection, docs: List[Dict], duplicate: Callable[[Dict], ValueError]) -> List[Optional[ValueError]]:
+        errors: List[Optional[ValueError]] = [None] * len(docs)
+        if not docs:
+            return errors
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for index, error in bulk_write_failures(e, duplicate).items():
+                errors[index] = error
+        if any(error is None for error in errors):
+            await self._touch(collection.name, *(doc["id"] for doc, error in zip(docs, errors) if error is None))
+        return errors
+
+    async def _touch(self, collection: str, *ids: str):
+        """Drop the written ids from the cache and the read model."""
+        if self.cache is not None and ids:
+            self.cache.invalidate(collection, ids)
+        if self.read_model is not None and ids:
+            self.read_model.invalidate(collection, ids)
+
+    async def _touched(self, collection: str, id_: str, result: Optional[Dict]) -> Optional[Dict]:
+        if result is not None:
+            await self._touch(collection, id_)
+        return result
+
+    async def _get(self, collection, id_: str, fields: Optional[List[str]], fresh: bool = False) -> Optional[Dict]:
+        if fresh:
+            return await collection.find_one({"id": id_}, projection(fields))
+        if self.read_model is not None:
+            doc = self.read_model.get(collection.name, id_, fields)
+            if doc is not UNKNOWN:
+                return doc
+        if self.cache is None:
+            return await collection.find_one({"id": id_}, projection(fields))
+        doc = self.cache.get(collection.name, id_, fields)
+        if doc is not None:
+            return doc
+        generation = self.cache.generation(collection.name)
+        doc = await collection.find_one({"id": id_}, projection())
+        if doc is not None:
+            self.cache.put(collection.name, id_, doc, generation)
+        return select_fields(doc, fields)
+
+    async def get_watermark(self, collection: str) -> Dict:
+        """Return the change watermark {"version", "updated_at"} of a collection, derived as in MongoStorage."""
+        coll = self.db[collection]
+        latest = None
+        async for doc in coll.find({}, LATEST_PROJECTION).sort(LATEST_SORT).limit(1):
+            latest = doc
+        return watermark(await coll.estimated_document_count(), latest)
+
+    async def _find_key(self, collection, field: str, value: str) -> Optional[Dict]:
+        if self.read_model is not None:
+            doc = self.read_model.find(collection.name, value)
+            if doc is not UNKNOWN:
+                return doc
+        return await collection.find_one({field: value, "deleted": False}, projection())
+
+    async def _version(self, collection, id_: str) -> Optional[datetime]:
+        if self.read_model is not None:
+            doc = self.read_model.get(collection.name, id_, ["deleted", "updated_at"])
+            if doc is not UNKNOWN:
+                return None if doc is None or doc.get("deleted") else doc.get("updated_at")
+        # Not from the entity cache: it could answer 304 for a version another worker replaced
+        cursor = collection.find({"id": id_, "deleted": False}, {"_id": 0, "updated_at": 1}).hint(VERSION_INDEX).limit(1)
+        async for doc in cursor:
+            return doc.get("updated_at")
+        return None
+
+    async def _iter(self, collection, query: Dict, sort: Optional[List], after: Optional[tuple], batch_size: int, fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        cursor = collection.find(keyset_query(query, after), projection(fields)).sort(sort or DEFAULT_SORT).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
+
+    async def _find_page(self, collection, query: Dict, limit: int, skip: int, sort: Optional[List], after: Optional[tuple], with_total: bool, fields: Optional[List[str]] = None) -> tuple:
+        total = await collection.count_documents(query) if with_total else None
+        cursor = collection.find(keyset_query(query, after), projection(fields)).sort(sort or DEFAULT_SORT).skip(skip).limit(limit)
+        return await cursor.to_list(length=None), total
+
+    async def list_vehicles(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True,
+                            fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of vehicles matching filter and the total match count."""
+        return await self._find_page(self.db.vehicles, filter or {}, limit, skip, sort, after, with_total, fields)
+
+    def iter_vehicles(self, filter: Optional[Dict] = None, sort: Optional[List] = None, after: Optional[tuple] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """Yield every vehicle matching filter, fetching batch_size documents per round trip."""
+        return self._iter(self.db.vehicles, filter or {}, sort, after, batch_size, fields)
+
+    async def list_active_assignments_for_vehicle(self, vehicle_id: str) -> List[Dict]:
+        cursor = self.db.assignments.find(active_assignment_query("vehicle_id", vehicle_id), projection())
+        return await cursor.to_list(length=None)
+
+    # Driver operations
+    async def create_driver(self, driver: Dict):
+        driver_copy = driver.copy()
+        driver_copy["deleted"] = False
+        try:
+            result = await self.db.drivers.insert_one(driver_copy)
+            await self._touch("drivers", driver_copy["id"])
+            driver_copy["_id"] = result.inserted_id
+            return driver_copy
+        except DuplicateKeyError:
+            raise ValueError("Duplicate license number")
+
+    async def create_drivers_bulk(self, drivers: List[Dict]) -> List[Optional[ValueError]]:
+        """Insert drivers with one unordered insert_many; returns per-item errors (None on success)."""
+        docs = [{**d, "deleted": False} for d in drivers]
+        return await self._insert_many(self.db.drivers, docs, unique_key_error("license_number"))
+
+    async def get_driver(self, did: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        return await self._get(self.db.drivers, did, fields)
+
+    async def get_driver_version(self, did: str) -> Optional[datetime]:
+        """updated_at of a non-deleted driver, answered from the covering version index."""
+        return await self._version(self.db.drivers, did)
+
+    async def find_driver_by_license(self, license_norm: str) -> Optional[Dict]:
+        return await self._find_key(self.db.drivers, "license_number", license_norm)
+
+    async def update_driver(self, did: str, updates: Dict) -> Optional[Dict]:
+        try:
+            return await self._touched("drivers", did, await self.db.drivers.find_one_and_update({"id": did}, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate license number")
+
+    async def update_driver_if_match(self, did: str, expected_updated_at: datetime, updates: Dict) -> Optional[Dict]:
+        """Apply updates only if the driver is not deleted and still has expected_updated_at."""
+        query = {"id": did, "deleted": False, "updated_at": expected_updated_at}
+        try:
+            return await self._touched("drivers", did, await self.db.drivers.find_one_and_update(query, {"$set": updates}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError:
+            raise ValueError("Duplicate license number")
+
+    async def soft_delete_driver(self, did: str):
+        await self.db.drivers.update_one({"id": did}, {"$set": {"deleted": True, "updated_at": datetime.now(timezone.utc)}})
+        await self._touch("drivers", did)
+
+    async def list_drivers(self, filter: Optional[Dict] = None, limit: int = 50, skip: int = 0, sort: Optional[List] = None, after: Optional[tuple] = None, with_total: bool = True,
+                           fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of drivers matching filter and the total match count."""
+        return await self._find_page(self.db.drivers, filter or {}, limit, skip, sort, after, with_total, fields)
+
+    def iter_drivers(self, filter: Optional[Dict] = None, sort: Optional[List] = None, after: Optional[tuple] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """Yield every driver matching filter, fetching batch_size documents per round trip."""
+        return self._iter(self.db.drivers, filter or {}, sort, after, batch_size, fields)
+
+    async def list_active_assignments_for_driver(self, driver_id: str) -> List[Dict]:
+        cursor = self.db.assignments.find(active_assignment_query("driver_id", driver_id), projection())
+        return await cursor.to_list(length=None)
+
+    # Assignment operations
+    async def create_assignment(self, assignment: Dict):
+        assignment_copy = _with_ongoing_flag({"end_datetime": None, **assignment})
+        try:
+            result = await self.db.assignments.insert_one(assignment_copy)
+            await self._touch("assignments", assignment_copy["id"])
+        except DuplicateKeyError as e:
+            raise conflict_from_duplicate(e)
+        assignment_copy["_id"] = result.inserted_id
+        return assignment_copy
+
+    async def create_assignment_checked(self, assignment: Dict):
+        """Validate the driver, vehicle and exclusivity with one aggregate, then insert."""
+        pipeline = assignment_preflight_pipeline(assignment["driver_id"], assignment["vehicle_id"])
+        check_assignment_preflight(await self.db.drivers.aggregate(pipeline).to_list(length=None))
+        return await self.create_assignment(assignment)
+
+    async def create_assignments_bulk(self, assignments: List[Dict]) -> List[Optional[ValueError]]:
+        """Validate and insert a batch of assignments; returns per-item errors (None on success)."""
+        driver_ids = list({a["driver_id"] for a in assignments})
+        vehicle_ids = list({a["vehicle_id"] for a in assignments})
+        fields = {"_id": 0, "id": 1, "status": 1, "deleted": 1}
+        drivers = {d["id"]: d for d in await self.db.drivers.find({"id": {"$in": driver_ids}}, fields).to_list(length=None)}
+        vehicles = {v["id"]: v for v in await self.db.vehicles.find({"id": {"$in": vehicle_ids}}, fields).to_list(length=None)}
+        active = await self.db.assignments.find(bulk_active_assignments_query(driver_ids, vehicle_ids), {"_id": 0, "driver_id": 1, "vehicle_id": 1}).to_list(length=None)
+        errors, accepted = plan_assignment_batch(assignments, drivers, vehicles, active)
+        insert_errors = await self._insert_many(self.db.assignments, [doc for _, doc in accepted], assignment_write_error)
+        for (index, _), error in zip(accepted, insert_errors):
+            errors[index] = error
+        return errors
+
+    async def get_assignment(self, aid: str, fields: Optional[List[str]] = None, fresh: bool = False) -> Optional[Dict]:
+        """Assignment by id; fresh=True reads the database, for reads that decide a write."""
+        return await self._get(self.db.assignments, aid, fields, fresh)
+
+    async def update_assignment(self, aid: str, updates: Dict) -> Optional[Dict]:
+        try:
+            return await self._touched("assignments", aid, await self.db.assignments.find_one_and_update({"id": aid}, {"$set": _with_ongoing_flag(updates)}, return_document=ReturnDocument.AFTER, projection=projection()))
+        except DuplicateKeyError as e:
+            raise conflict_from_duplicate(e)
+
+    async def delete_assignment(self, aid: str):
+        await self.db.assignments.delete_one({"id": aid})
+        await self._touch("assignments", aid)
+
+    async def list_assignments(self, limit: int = 50, skip: int = 0, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, after: Optional[tuple] = None, with_total: bool = True,
+                               active: Optional[bool] = None, start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, fields: Optional[List[str]] = None) -> tuple:
+        """Return one page of assignments and the total match count."""
+        query = assignment_list_query(driver_id, vehicle_id, active, start_from, start_to)
+        return await self._find_page(self.db.assignments, query, limit, skip, None, after, with_total, fields)
+
+    def iter_assignments(self, driver_id: Optional[str] = None, vehicle_id: Optional[str] = None, after: Optional[tuple] = None, active: Optional[bool] = None,
+                         start_from: Optional[datetime] = None, start_to: Optional[datetime] = None, batch_size: int = 500, fields: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """Yield every assignment matching the list_assignments filters, batch_size per round trip."""
+        query = assignment_list_query(driver_id, vehicle_id, active, start_from, start_to)
+        return self._iter(self.db.assignments, query, None, after, batch_size, fields)
@@ -0,0 +1,207 @@
+"""Mongo client options and connection pool monitoring.
+
+client_options() turns the MONGO_* settings into MongoClient keyword
+arguments (shared by the pymongo and Motor backends) and registers
+POOL_STATS, a CMAP listener that keeps live pool counters and a histogram of
+checkout wait times, next to the command latency listener. warm_up() holds startup until the driver has opened
+MONGO_MIN_POOL_SIZE connections in every server's pool, so the first requests after a deploy do not
+pay for connection setup.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+from app.config import settings
+from app.metrics import REGISTRY, Gauges
+from app.storage.commands import COMMAND_STATS
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets; the last bucket is open
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Aggregates connection pool events across every server the client talks to.
+
+    Events arrive on driver threads, so all counters are updated under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pools = set()
+            # Open connections per server address; minPoolSize applies to each
+            self.open_by_pool: Dict[tuple, int] = {}
+            self.created = 0
+            self.closed = 0
+            self.checkout_started = 0
+            self.checked_out = 0
+            self.checked_in = 0
+            self.checkout_failed: Dict[str, int] = {}
+            self.cleared = 0
+            self.wait_buckets: List[int] = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_sum_ms = 0.0
+            self.wait_max_ms = 0.0
+
+    def _record_wait(self, duration: Optional[float]):
+        # duration is in seconds; checkouts before pymongo 4.7 do not carry it
+        if duration is None:
+            return
+        ms = duration * 1000
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms <= bound), len(WAIT_BUCKETS_MS))
+        self.wait_buckets[index] += 1
+        self.wait_sum_ms += ms
+        self.wait_max_ms = max(self.wait_max_ms, ms)
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools.add(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.discard(event.address)
+            self.open_by_pool.pop(event.address, None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+            self.open_by_pool[event.address] = self.open_by_pool.get(event.address, 0) + 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self.open_by_pool[event.address] = self.open_by_pool.get(event.address, 0) - 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.checkout_started += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failed[event.reason] = self.checkout_failed.get(event.reason, 0) + 1
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_in += 1
+
+    @property
+    def open(self) -> int:
+        return self.created - self.closed
+
+    def warm(self, size: int) -> bool:
+        """Whether every server's pool holds at least size open connections."""
+        # No pool events at all means the client is not monitored (e.g. a test double)
+        with self._lock:
+            return all(self.open_by_pool.get(address, 0) >= size for address in self.pools)
+
+    def snapshot(self) -> Dict:
+        """Point-in-time view of the pool, suitable for a JSON response."""
+        with self._lock:
+            failed = sum(self.checkout_failed.values())
+            count = self.checked_out + failed
+            buckets = [{"le_ms": bound, "count": n} for bound, n in zip(WAIT_BUCKETS_MS, self.wait_buckets)]
+            buckets.append({"le_ms": None, "count": self.wait_buckets[-1]})
+            return {
+                "pools": sorted(f"{host}:{port}" for host, port in self.pools),
+                "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+                "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+                "open": self.created - self.closed,
+                "checked_out": self.checked_out - self.checked_in,
+                "waiting": self.checkout_started - self.checked_out - failed,
+                "created": self.created,
+                "closed": self.closed,
+                "cleared": self.cleared,
+                "checkouts": self.checked_out,
+                "checkout_failed": dict(self.checkout_failed),
+                "wait_time_ms": {
+                    "count": count,
+                    "mean": round(self.wait_sum_ms / count, 3) if count else 0.0,
+                    "max": round(self.wait_max_ms, 3),
+                    "buckets": buckets,
+                },
+            }
+
+
+POOL_STATS = PoolStats()
+
+
+def _pool_gauges() -> Dict:
+    snap = POOL_STATS.snapshot()
+    return {
+        "mongo_pool_open_connections": ("Connections currently open.", snap["open"]),
+        "mongo_pool_checked_out_connections": ("Connections currently checked out.", snap["checked_out"]),
+        "mongo_pool_waiting_checkouts": ("Checkouts waiting for a connection.", snap["waiting"]),
+    }
+
+
+REGISTRY.register(Gauges(_pool_gauges))
+
+
+def _write_concern(value: str):
+    return int(value) if value.isdigit() else value
+
+
+def client_options() -> Dict:
+    """MongoClient keyword arguments built from the MONGO_* settings."""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS or None,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS or None,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [POOL_STATS, COMMAND_STATS],
+    }
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    if settings.MONGO_READ_CONCERN:
+        options["readConcernLevel"] = settings.MONGO_READ_CONCERN
+    if settings.MONGO_WRITE_CONCERN:
+        options["w"] = _write_concern(settings.MONGO_WRITE_CONCERN)
+    if settings.MONGO_READ_PREFERENCE:
+        options["readPreference"] = settings.MONGO_READ_PREFERENCE
+    return options
+
+
+def warm_up(stats: PoolStats = POOL_STATS, size: Optional[int] = None) -> int:
+    """Wait until the driver's background maintenance has opened minPoolSize connections per server.
+
+    Bounded by MONGO_WARMUP_TIMEOUT_MS; returns the number of open connections
+    across all servers.
+    """
+    size = settings.MONGO_MIN_POOL_SIZE if size is None else size
+    deadline = time.monotonic() + settings.MONGO_WARMUP_TIMEOUT_MS / 1000
+    while not stats.warm(size) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return stats.open
+
+
+async def warm_up_async(stats: PoolStats = POOL_STATS, size: Optional[int] = None) -> int:
+    """Coroutine counterpart of warm_up for the Motor backend."""
+    size = settings.MONGO_MIN_POOL_SIZE if size is None else size
+    deadline = time.monotonic() + settings.MONGO_WARMUP_TIMEOUT_MS / 1000
+    while not stats.warm(size) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return stats.open
@@ -0,0 +1,365 @@
+"""In-process replica of the vehicles and drivers collections, kept current by a change stream.
+
+With READ_MODEL enabled each worker loads both collections at startup and a
+background thread tails one change stream over them (fullDocument
+updateLookup), applying every insert, update and delete to dictionaries
+indexed by id, by the _id of the document (for deletes), and by plate
+number / license number among non-deleted records. The stream is opened
+before the snapshot is read, so no change can fall between the two.
+
+The thread keeps the last resume token and reopens the stream from it
+after a network error. When the server can no longer resume from it
+(oplog rolled over) or the stream is invalidated (collection dropped or
+renamed), it does a full resync: open a new stream, reload and swap.
+
+Staleness is how old the newest state known to be applied is: the
+wallTime (or clusterTime) of the last applied change while a backlog is
+being worked through, and the time of the poll once try_next() comes back
+empty, meaning the replica has caught up. Comparing server timestamps with
+the local clock makes the measure subject to clock skew between the hosts.
+
+Lookups answer UNKNOWN, so storage falls back to the database, when:
+- the replica is more than READ_MODEL_MAX_STALENESS_MS behind (the bound
+  on cross-process staleness);
+- the id was written by this process and its change event has not arrived
+  yet, so a worker always reads its own writes.
+
+Staleness, event lag, resyncs and fallbacks are served at
+GET /admin/read-model and on /metrics (resyncs and fallbacks as counters).
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config import settings
+from app.metrics import REGISTRY, Counters, Gauges
+from app.storage.cache import select_fields
+
+logger = logging.getLogger("app.read_model")
+
+# Replicated collections and the field each one is also indexed by
+KEYS = {"vehicles": "plate_number", "drivers": "license_number"}
+# Server errors after which the stream cannot be resumed: ChangeStreamFatalError,
+# ChangeStreamHistoryLost, and the token no longer being in the oplog
+RESYNC_CODES = frozenset({280, 286, 136})
+# Events after which the stream is closed for good
+INVALIDATING = frozenset({"invalidate", "drop", "rename", "dropDatabase"})
+# Change streams require a replica set or sharded cluster
+UNSUPPORTED_CODES = frozenset({40573})
+
+UNKNOWN = object()
+
+
+def _strip(doc: Dict) -> Dict:
+    # Same fields as a read through projection()
+    return {key: value for key, value in doc.items() if key not in ("_id", "ongoing")}
+
+
+def _change_time(change: Dict) -> Optional[float]:
+    """Epoch seconds of a change: wallTime (MongoDB 6.0+, ms precision) or clusterTime (seconds)."""
+    wall = change.get("wallTime")
+    if isinstance(wall, datetime):
+        return (wall if wall.tzinfo else wall.replace(tzinfo=timezone.utc)).timestamp()
+    cluster_time = change.get("clusterTime")
+    return float(cluster_time.time) if cluster_time is not None else None
+
+
+class _Replica:
+    """Documents of one collection with their id, _id and key indexes."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.docs: Dict[str, Dict] = {}
+        self.oids: Dict = {}
+        self.keys: Dict[str, str] = {}
+        # ids written by this process whose change event has not been applied yet
+        self.pending: Dict[str, float] = {}
+
+    def put(self, doc: Dict):
+        id_ = doc["id"]
+        self.remove(id_)
+        self.docs[id_] = _strip(doc)
+        self.oids[doc["_id"]] = id_
+        if not doc.get("deleted") and doc.get(self.key) is not None:
+            self.keys[doc[self.key]] = id_
+        self.pending.pop(id_, None)
+
+    def remove(self, id_: str):
+        old = self.docs.pop(id_, None)
+        if old is not None and self.keys.get(old.get(self.key)) == id_:
+            del self.keys[old[self.key]]
+
+    def remove_oid(self, oid):
+        id_ = self.oids.pop(oid, None)
+        if id_ is not None:
+            self.remove(id_)
+            self.pending.pop(id_, None)
+
+
+class ReadModel:
+    """Change-stream synchronized replica of vehicles and drivers, one per worker process."""
+
+    def __init__(self, max_staleness_ms: float = 2000, max_await_ms: int = 500, clock: Callable[[], float] = time.time):
+        self.max_staleness_ms = max_staleness_ms
+        self.max_await_ms = max_await_ms
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._db = None
+        self._stream = None
+        self._token = None
+        self._replicas = {name: _Replica(key) for name, key in KEYS.items()}
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.ready = False
+        self._synced_at: Optional[float] = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.events = 0
+        self.resyncs = 0
+        self.errors = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.last_event_lag_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    # Lifecycle
+    def start(self, db, background: bool = True) -> bool:
+        """Load the collections from db and start tailing; False when the deployment has no change streams."""
+        self.stop()
+        self._db = db
+        self._reset_stats()
+        try:
+            self._resync()
+        except OperationFailure as e:
+            if e.code in UNSUPPORTED_CODES:
+                logger.warning("read model disabled: %s", e)
+                self._db = None
+                return False
+            raise
+        if background:
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="read-model", daemon=True)
+            self._worker.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout=self.max_await_ms / 1000 + 1)
+        self._close_stream()
+        with self._lock:
+            self.ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except PyMongoError as e:
+                self._failed(e)
+                self._stop.wait(1.0)
+
+    def poll(self):
+        """Wait up to max_await_ms for one change and apply it; resumes or resyncs as needed."""
+        if self._stream is None:
+            self._reopen()
+        change = self._stream.try_next()
+        with self._lock:
+            if change is None:
+                # Nothing left to apply: current as of now
+                self._synced_at = self.clock()
+            else:
+                self._apply(change)
+            self._token = self._stream.resume_token
+            self._expire_pending()
+        if change is not None and change["operationType"] in INVALIDATING:
+            logger.warning("read model stream invalidated by %s, resyncing", change["operationType"])
+            self._resync()
+
+    def _watch(self, resume_after=None):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(KEYS)}}}]
+        return self._db.watch(pipeline, full_document="updateLookup", resume_after=resume_after, max_await_time_ms=self.max_await_ms)
+
+    def _reopen(self):
+        if self._token is not None:
+            try:
+                self._stream = self._watch(resume_after=self._token)
+                return
+            except OperationFailure as e:
+                if e.code not in RESYNC_CODES:
+                    raise
+                logger.warning("read model cannot resume (%s), resyncing", e)
+        self._resync()
+
+    def _resync(self):
+        """Open a fresh stream, reload both collections and swap them in."""
+        self._close_stream()
+        stream = self._watch()
+        replicas = {name: _Replica(key) for name, key in KEYS.items()}
+        for name, replica in replicas.items():
+            for doc in self._db[name].find({}):
+                replica.put(doc)
+        with self._lock:
+            # Writes made by this process during the load stay pending
+            for name, replica in replicas.items():
+                replica.pending = self._replicas[name].pending
+            self._replicas = replicas
+            self._stream = stream
+            self._token = stream.resume_token
+            self._synced_at = self.clock()
+            self.ready = True
+            self.resyncs += 1
+
+    def _expire_pending(self):
+        # A write that changed nothing (e.g. deleting a deleted record) produces
+        # no event; once the stream is well past it, stop waiting for one
+        cutoff = self._synced_at - self.max_staleness_ms / 1000
+        for replica in self._replicas.values():
+            if replica.pending:
+                for id_ in [id_ for id_, marked in replica.pending.items() if marked < cutoff]:
+                    del replica.pending[id_]
+
+    def _failed(self, error: Exception):
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error)
+        logger.warning("read model stream error: %s", error)
+        if isinstance(error, OperationFailure) and error.code in RESYNC_CODES:
+            self._token = None
+        self._close_stream()
+
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except PyMongoError:
+                pass
+
+    def _apply(self, change: Dict):
+        replica = self._replicas.get(change.get("ns", {}).get("coll"))
+        if replica is None:
+            return
+        self.events += 1
+        changed_at = _change_time(change)
+        if changed_at is not None:
+            self.last_event_lag_ms = round((self.clock() - changed_at) * 1000, 3)
+            # Everything up to this change is applied; later ones may still be queued
+            self._synced_at = max(self._synced_at or changed_at, changed_at)
+        doc = change.get("fullDocument")
+        if doc is not None:
+            replica.put(doc)
+        elif "documentKey" in change:
+            # Deleted, or updated and deleted again before the lookup
+            replica.remove_oid(change["documentKey"]["_id"])
+
+    # Lookups
+    def staleness_ms(self) -> Optional[float]:
+        """Milliseconds between now and the newest point the replica is known to reflect."""
+        synced_at = self._synced_at
+        return None if synced_at is None else (self.clock() - synced_at) * 1000
+
+    def fresh(self) -> bool:
+        staleness = self.staleness_ms()
+        return self.ready and staleness is not None and staleness <= self.max_staleness_ms
+
+    def get(self, collection: str, id_: str, fields: Optional[List[str]] = None):
+        """Document by id (a copy, projected to fields), None when it does not exist, or UNKNOWN."""
+        replica = self._replicas.get(collection)
+        if replica is None:
+            return UNKNOWN
+        with self._lock:
+            if not self.fresh() or id_ in replica.pending:
+                self.fallbacks += 1
+                return UNKNOWN
+            self.hits += 1
+            doc = replica.docs.get(id_)
+        return select_fields(doc, fields)
+
+    def find(self, collection: str, value: str):
+        """Non-deleted document by plate number or license number, None, or UNKNOWN."""
+        replica = self._replicas.get(collection)
+        if replica is None:
+            return UNKNOWN
+        with self._lock:
+            # A pending write may have moved a key onto value
+            if not self.fresh() or replica.pending:
+                self.fallbacks += 1
+                return UNKNOWN
+            self.hits += 1
+            doc = replica.docs.get(replica.keys.get(value))
+        return select_fields(doc, None)
+
+    def invalidate(self, collection: str, ids: Iterable[str]):
+        """Route lookups of ids to the database until their change events are applied."""
+        replica = self._replicas.get(collection)
+        if replica is None or not self.enabled:
+            return
+        now = self.clock()
+        with self._lock:
+            for id_ in ids:
+                replica.pending[id_] = now
+
+    def snapshot(self) -> Dict:
+        """Point-in-time state and counters, suitable for a JSON response."""
+        with self._lock:
+            staleness = self.staleness_ms()
+            now = self.clock()
+            return {
+                "enabled": self.enabled,
+                "ready": self.ready,
+                "fresh": self.fresh(),
+                "max_staleness_ms": self.max_staleness_ms,
+                "staleness_ms": None if staleness is None else round(staleness, 3),
+                "last_event_lag_ms": self.last_event_lag_ms,
+                "events": self.events,
+                "resyncs": self.resyncs,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "hits": self.hits,
+                "fallbacks": self.fallbacks,
+                "collections": {
+                    name: {
+                        "documents": len(replica.docs),
+                        "pending": len(replica.pending),
+                        "oldest_pending_ms": round((now - min(replica.pending.values())) * 1000, 3) if replica.pending else None,
+                    }
+                    for name, replica in self._replicas.items()
+                },
+            }
+
+
+READ_MODEL = ReadModel(settings.READ_MODEL_MAX_STALENESS_MS, settings.READ_MODEL_MAX_AWAIT_MS)
+
+
+def _read_model_gauges() -> Dict:
+    if not READ_MODEL.enabled:
+        return {}
+    snap = READ_MODEL.snapshot()
+    return {
+        "read_model_staleness_seconds": ("Time since the read model was last caught up with its change stream.", (snap["staleness_ms"] or 0) / 1000),
+        "read_model_event_lag_seconds": ("Delay between the last change and its arrival in the read model.", (snap["last_event_lag_ms"] or 0) / 1000),
+    }
+
+
+def _read_model_counters() -> Dict:
+    if not READ_MODEL.enabled:
+        return {}
+    snap = READ_MODEL.snapshot()
+    return {
+        "read_model_resyncs_total": ("Full reloads of the read model.", snap["resyncs"]),
+        "read_model_fallbacks_total": ("Lookups the read model could not answer and sent to the database.", snap["fallbacks"]),
+    }
+
+
+REGISTRY.register(Gauges(_read_model_gauges))
+REGISTRY.register(Counters(_read_model_counters))
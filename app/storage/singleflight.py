@@ -0,0 +1,158 @@
+"""Single-flight coalescing of concurrent identical storage reads.
+
+When many requests read the same entity at once (a dispatch board
+refreshing), the first one becomes the leader and runs the query; the
+others wait for it and receive its result instead of issuing their own.
+Each caller gets its own shallow copy, so routers can still modify what
+they receive.
+
+Writes go through forget(): a read started after a write never joins a
+flight that began before it, so a request still reads its own writes.
+
+SingleFlight serves the threaded pymongo routes and AsyncSingleFlight the
+Motor routes, where the query runs as a task of its own so a leader whose
+client disconnects does not cancel the followers' query. Both record into
+COALESCING, served at GET /admin/coalescing and on /metrics.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+
+from app.metrics import REGISTRY, Counters, Gauges
+
+
+def _copy(result: Any) -> Any:
+    return dict(result) if isinstance(result, dict) else result
+
+
+class CoalescingStats:
+    """Reads per collection split into executed (leaders) and coalesced (followers)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.executed: Dict[str, int] = {}
+            self.coalesced: Dict[str, int] = {}
+
+    def record(self, collection: str, leader: bool):
+        counts = self.executed if leader else self.coalesced
+        with self._lock:
+            counts[collection] = counts.get(collection, 0) + 1
+
+    def snapshot(self) -> Dict:
+        """Totals and coalescing ratio (coalesced / all reads), overall and per collection."""
+        def summary(executed: int, coalesced: int) -> Dict:
+            reads = executed + coalesced
+            return {"reads": reads, "executed": executed, "coalesced": coalesced,
+                    "coalescing_ratio": round(coalesced / reads, 4) if reads else 0.0}
+
+        with self._lock:
+            names = sorted(set(self.executed) | set(self.coalesced))
+            per = {name: summary(self.executed.get(name, 0), self.coalesced.get(name, 0)) for name in names}
+            total = summary(sum(self.executed.values()), sum(self.coalesced.values()))
+        return {**total, "collections": per}
+
+
+COALESCING = CoalescingStats()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe single-flight group; keys are (collection, id, ...) tuples."""
+
+    def __init__(self, stats: CoalescingStats = COALESCING):
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple, _Call] = {}
+
+    def do(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        """Result of fn(), shared with every concurrent do() of the same key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self.stats.record(key[0], leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _copy(call.result)
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return _copy(call.result)
+
+    def forget(self, collection: str, ids: Iterable[str]):
+        """Let later reads of ids start a new flight instead of joining a running one."""
+        ids = set(ids)
+        with self._lock:
+            for key in [key for key in self._calls if key[0] == collection and key[1] in ids]:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Single-flight group for coroutines, used from one event loop."""
+
+    def __init__(self, stats: CoalescingStats = COALESCING):
+        self.stats = stats
+        self._calls: Dict[Tuple, asyncio.Task] = {}
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of await fn(), shared with every concurrent do() of the same key."""
+        task = self._calls.get(key)
+        self.stats.record(key[0], task is None)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return _copy(await asyncio.shield(task))
+
+    def _finished(self, key: Tuple, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the error retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def forget(self, collection: str, ids: Iterable[str]):
+        """Let later reads of ids start a new flight instead of joining a running one."""
+        ids = set(ids)
+        for key in [key for key in self._calls if key[0] == collection and key[1] in ids]:
+            del self._calls[key]
+
+
+def _coalescing_gauges() -> Dict:
+    snap = COALESCING.snapshot()
+    return {
+        "storage_coalescing_ratio": ("Share of entity reads that were coalesced.", snap["coalescing_ratio"]),
+    }
+
+
+def _coalescing_counters() -> Dict:
+    snap = COALESCING.snapshot()
+    return {
+        "storage_reads_total": ("Coalescable entity reads.", snap["reads"]),
+        "storage_reads_coalesced_total": ("Entity reads answered by another request's in-flight query.", snap["coalesced"]),
+    }
+
+
+REGISTRY.register(Gauges(_coalescing_gauges))
+REGISTRY.register(Counters(_coalescing_counters))
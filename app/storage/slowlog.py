@@ -0,0 +1,181 @@
+"""Slow query log with sampled explain plans, grouped by query shape.
+
+CommandStats hands every command slower than SLOW_QUERY_MS to SLOW_QUERIES.
+Commands are grouped by shape (collection, command and filter/sort/pipeline
+with literal values replaced by "?"), so one entry accumulates count, total
+and max time, and docs returned for every run of the same query. The first
+slow run of a shape, and a sample of later ones, is re-run as
+explain("executionStats") on a background thread, recording docs and keys
+examined and the winning plan stage (COLLSCAN, IXSCAN...). New shapes and
+explain results are logged on the app.slow_query logger; the full summary is
+served at GET /admin/slow-queries.
+"""
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+slow_query_log = logging.getLogger("app.slow_query")
+
+# Read commands that can be explained without side effects
+EXPLAINABLE = frozenset({"find", "aggregate", "count", "distinct"})
+# Command fields that decide which plan the server picks
+_SHAPE_FIELDS = ("filter", "sort", "projection", "hint", "pipeline", "query", "key")
+# Driver/session fields that must not be forwarded inside an explain
+_SESSION_FIELDS = frozenset({"$db", "lsid", "$clusterTime", "txnNumber", "$readPreference", "readConcern", "writeConcern", "$audit", "apiVersion"})
+
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values with "?", keeping keys and operators."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+
+def command_shape(command_name: str, command: Dict) -> Dict:
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return {"q": query_shape(statements[0].get("q", {}))}
+    shape = {field: query_shape(command[field]) for field in _SHAPE_FIELDS if field in command}
+    if "sort" in command:
+        # Sort directions pick the index, so they are kept
+        shape["sort"] = dict(command["sort"])
+    return shape
+
+
+def docs_returned(command_name: str, reply: Dict) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "count":
+        return reply.get("n")
+    if command_name == "distinct":
+        return len(reply.get("values") or [])
+    if command_name == "findAndModify":
+        return 0 if reply.get("value") is None else 1
+    return None
+
+
+def _walk(plan: Dict):
+    # Single-child chain from the root stage down to the leaf scan
+    while isinstance(plan, dict):
+        yield plan
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0] or plan.get("queryPlan")
+
+
+def summarize_explain(result: Dict) -> Dict:
+    """Docs/keys examined, docs returned and plan stages from explain("executionStats")."""
+    if "stages" in result:  # aggregate: the $cursor stage carries the find explain
+        cursor = next((stage["$cursor"] for stage in result["stages"] if "$cursor" in stage), {})
+        result = {**cursor, **result}
+    stats = result.get("executionStats", {})
+    winning = result.get("queryPlanner", {}).get("winningPlan", {})
+    stages = [stage["stage"] for stage in _walk(winning) if "stage" in stage]
+    return {
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "n_returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "index": next((stage["indexName"] for stage in _walk(winning) if stage.get("indexName")), None),
+    }
+
+
+class SlowQueryLog:
+    """Thread-safe slow query entries keyed by shape, with a background explain worker."""
+
+    def __init__(self, max_shapes: int = 500):
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], Dict] = {}
+        self._db = None
+        self._jobs: "queue.Queue" = queue.Queue(maxsize=100)
+        self._worker: Optional[threading.Thread] = None
+
+    def bind(self, db):
+        """Database used to run explains; a pymongo (not Motor) Database."""
+        self._db = db
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, collection: str, command_name: str, command: Dict, reply: Dict, duration_ms: float):
+        shape = command_shape(command_name, command)
+        key = (collection, command_name, json.dumps(shape, sort_keys=True, default=str))
+        returned = docs_returned(command_name, reply)
+        with self._lock:
+            entry = self._entries.get(key)
+            new = entry is None
+            if new:
+                if len(self._entries) >= self.max_shapes:
+                    return
+                entry = self._entries[key] = {
+                    "collection": collection, "command": command_name, "shape": shape,
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "docs_returned": None, "explain": None,
+                    "first_seen": time.time(), "last_seen": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = time.time()
+            if returned is not None:
+                entry["docs_returned"] = returned
+        if new:
+            slow_query_log.warning(json.dumps({"event": "slow_query", "collection": collection, "command": command_name, "shape": shape,
+                                               "duration_ms": round(duration_ms, 3), "docs_returned": returned}, default=str))
+        if command_name in EXPLAINABLE and (new or random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+            self._submit(key, command)
+
+    def _submit(self, key: Tuple[str, str, str], command: Dict):
+        if self._db is None:
+            return
+        explained = {field: value for field, value in command.items() if field not in _SESSION_FIELDS}
+        try:
+            self._jobs.put_nowait((key, explained))
+        except queue.Full:
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            key, command = self._jobs.get()
+            try:
+                plan = summarize_explain(self._db.command({"explain": command, "verbosity": "executionStats"}))
+            except Exception as e:
+                plan = {"error": str(e)}
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["explain"] = plan
+            slow_query_log.warning(json.dumps({"event": "slow_query_explain", "collection": key[0], "command": key[1], "shape": json.loads(key[2]), **plan}, default=str))
+            self._jobs.task_done()
+
+    def summary(self) -> List[Dict]:
+        """Entries ordered by total time, slowest shapes first."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        for entry in entries:
+            entry["mean_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+
+SLOW_QUERIES = SlowQueryLog(settings.SLOW_QUERY_MAX_SHAPES)
@@ -0,0 +1,160 @@
+"""Per-request time breakdown for the Server-Timing header and the access log.
+
+The middleware in app.main opens a RequestTimings for each request in a
+context variable. Storage adapter methods (see instrument_storage) and
+serialization steps (see timed_serialization) add their wall time to it, so
+a slow request can be split into Mongo round trips, rendering and the rest
+(validation, routing, business logic) without a profiler.
+"""
+import functools
+import inspect
+import json
+import logging
+import sys
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.config import settings
+
+access_log = logging.getLogger("app.access")
+
+
+class RequestTimings:
+    __slots__ = ("start", "db_calls", "db_seconds", "ser_calls", "ser_seconds")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.ser_calls = 0
+        self.ser_seconds = 0.0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; app is whatever is neither db nor ser."""
+        total = self.elapsed()
+        app = max(total - self.db_seconds - self.ser_seconds, 0.0)
+        queries = "query" if self.db_calls == 1 else "queries"
+        return (f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_calls} {queries}", '
+                f"ser;dur={self.ser_seconds * 1000:.1f}, app;dur={app * 1000:.1f}, total;dur={total * 1000:.1f}")
+
+    def as_log(self) -> Dict:
+        return {
+            "duration_ms": round(self.elapsed() * 1000, 3),
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "db_calls": self.db_calls,
+            "ser_ms": round(self.ser_seconds * 1000, 3),
+        }
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def _timed_iter(iterator, timings: RequestTimings):
+    # Cursor batches are fetched lazily, so each step counts as database time
+    while True:
+        start = time.perf_counter()
+        try:
+            doc = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings.db_seconds += time.perf_counter() - start
+        yield doc
+
+
+async def _atimed_iter(iterator, timings: RequestTimings):
+    while True:
+        start = time.perf_counter()
+        try:
+            doc = await iterator.__anext__()
+        except StopAsyncIteration:
+            return
+        finally:
+            timings.db_seconds += time.perf_counter() - start
+        yield doc
+
+
+def _timed_storage_call(fn):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def call(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return await fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                timings.db_calls += 1
+                timings.db_seconds += time.perf_counter() - start
+        return call
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            timings.db_calls += 1
+            timings.db_seconds += time.perf_counter() - start
+        if hasattr(result, "__anext__"):
+            return _atimed_iter(result, timings)
+        if hasattr(result, "__next__"):
+            return _timed_iter(result, timings)
+        return result
+    return call
+
+
+def instrument_storage(cls):
+    """Class decorator timing every public method of a storage adapter."""
+    for name, member in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(member):
+            setattr(cls, name, _timed_storage_call(member))
+    return cls
+
+
+def timed_serialization(fn):
+    """Decorator adding the wall time of a rendering step to the current request."""
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings.ser_calls += 1
+            timings.ser_seconds += time.perf_counter() - start
+    return call
+
+
+def configure_access_log():
+    """Send the access log, one JSON object per line, to stderr unless configured elsewhere."""
+    if not settings.ACCESS_LOG:
+        access_log.disabled = True
+        return
+    if not access_log.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        access_log.addHandler(handler)
+        access_log.propagate = False
+    access_log.setLevel(logging.INFO)
+
+
+def log_access(entry: Dict):
+    if access_log.isEnabledFor(logging.INFO):
+        access_log.info(json.dumps(entry, separators=(",", ":")))
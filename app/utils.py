@@ -1,4 +1,6 @@
-from datetime import datetime, timezone
+import base64
+import json
+from datetime import datetime, timezone, timedelta
 
 
 def now_utc_iso() -> str:
@@ -10,6 +12,24 @@ def make_etag(updated_at: str) -> str:
     return f'"{updated_at}"'
 
 
+def parse_etag(etag: str):
+    """Recover the updated_at datetime quoted in an If-Match ETag made by make_etag.
+
+    Returns None when the value is not a timestamp ETag, or is weak: If-Match
+    uses strong comparison (RFC 9110 13.1.1), so a weak ETag never matches.
+    """
+    value = etag.strip()
+    if value.startswith("W/"):
+        return None
+    try:
+        dt = datetime.fromisoformat(value.strip('"'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
 def normalize_plate(plate: str) -> str:
     return plate.strip().upper()
 
@@ -40,3 +60,33 @@ def serialize_datetime(dt) -> str:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.isoformat()
+
+
+def next_updated_at(previous=None) -> datetime:
+    """Return a new updated_at at least one millisecond after previous.
+
+    Guarantees the ETag changes on every write even within the same millisecond.
+    """
+    now = truncate_to_milliseconds(datetime.now(timezone.utc))
+    if previous is not None and now <= previous:
+        now = previous + timedelta(milliseconds=1)
+    return now
+
+
+def encode_cursor(doc: dict) -> str:
+    """Build an opaque pagination cursor from a document's (created_at, id) sort key."""
+    raw = json.dumps([serialize_datetime(doc["created_at"]), doc["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Recover the (created_at, id) key from encode_cursor output; None if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, last_id = json.loads(raw)
+        dt = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt, str(last_id)
@@ -0,0 +1,7 @@
+"""HTTP benchmarks for the fleet API.
+
+python -m benchmarks.load runs scripted scenarios at a fixed concurrency
+against the ASGI app in-process or a running server and writes requests/sec
+and p50/p95/p99 latency per endpoint as JSON; python -m benchmarks.compare
+diffs two such reports and fails on regressions.
+"""
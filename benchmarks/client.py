@@ -0,0 +1,55 @@
+"""HTTP client for a benchmark target: the ASGI app in-process or a server URL."""
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+
+import httpx
+
+from benchmarks.stats import Recorder
+
+AUTH_HEADERS = {"Authorization": "Bearer benchmark"}
+
+
+class StepFailed(Exception):
+    """A scenario request failed or returned an unexpected status; the iteration is abandoned."""
+
+
+@asynccontextmanager
+async def open_client(target: str, concurrency: int, timeout: float = 30.0) -> AsyncIterator[httpx.AsyncClient]:
+    """AsyncClient for target: "asgi" runs app.main:app in this process (with its lifespan), anything else is a base URL.
+
+    In-process runs use STORAGE_BACKEND from the environment, so
+    STORAGE_BACKEND=memory measures the HTTP layer alone.
+    """
+    if target == "asgi":
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", headers=AUTH_HEADERS, timeout=timeout) as client:
+                yield client
+        return
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, headers=AUTH_HEADERS, timeout=timeout, limits=limits) as client:
+        yield client
+
+
+class Session:
+    """Issues scenario requests and records each one under its endpoint label."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder):
+        self.client = client
+        self.recorder = recorder
+
+    async def request(self, endpoint: str, method: str, url: str, expect: Iterable[int] = (200,), headers: Optional[dict] = None, **kwargs) -> httpx.Response:
+        """Send one request labelled endpoint (e.g. "GET /vehicles/{vid}"); raises StepFailed on a status outside expect."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, error=True)
+            raise StepFailed(f"{endpoint}: {e!r}")
+        ok = response.status_code in expect
+        self.recorder.record(endpoint, time.perf_counter() - start, error=not ok)
+        if not ok:
+            raise StepFailed(f"{endpoint}: HTTP {response.status_code} {response.text[:200]}")
+        return response
@@ -0,0 +1,60 @@
+"""Compare two load reports: ``python -m benchmarks.compare baseline.json candidate.json``.
+
+For every endpoint present in both reports, prints the change in
+requests/sec and in the chosen latency percentile, and exits with status 1
+when any endpoint got slower (or lost throughput) by more than
+--max-regression, so CI can gate on it.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+
+def regressions(baseline: Dict, candidate: Dict, metric: str = "p95_ms", max_regression: float = 0.10) -> List[Dict]:
+    """One row per shared endpoint (and the total) with the relative changes and a regressed flag."""
+    rows = []
+    shared = [name for name in baseline["endpoints"] if name in candidate["endpoints"]]
+    pairs = [(name, baseline["endpoints"][name], candidate["endpoints"][name]) for name in shared]
+    pairs.append(("total", baseline["total"], candidate["total"]))
+    for name, before, after in pairs:
+        latency = _change(before.get(metric), after.get(metric))
+        rps = _change(before.get("rps"), after.get("rps"))
+        regressed = (latency is not None and latency > max_regression) or (rps is not None and rps < -max_regression) or after.get("errors", 0) > before.get("errors", 0)
+        rows.append({"endpoint": name, metric: (before.get(metric), after.get(metric)), "latency_change": latency,
+                     "rps": (before.get("rps"), after.get("rps")), "rps_change": rps, "regressed": regressed})
+    return rows
+
+
+def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def _percent(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value * 100:+.1f}%"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p95_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+    parser.add_argument("--max-regression", type=float, default=0.10, help="tolerated relative change, e.g. 0.10 for 10%%")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    rows = regressions(baseline, candidate, args.metric, args.max_regression)
+    print(f"{baseline.get('git_revision')} -> {candidate.get('git_revision')} ({args.metric}, max regression {args.max_regression:.0%})")
+    for row in rows:
+        before, after = row[args.metric]
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['endpoint']:<40} {args.metric} {before} -> {after} ({_percent(row['latency_change'])})  rps {_percent(row['rps_change'])}  {flag}")
+    sys.exit(1 if any(row["regressed"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
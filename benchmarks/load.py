@@ -0,0 +1,155 @@
+"""Closed-loop HTTP load test: ``python -m benchmarks.load``.
+
+CONCURRENCY virtual users each run scenario iterations back to back (users
+start on different scenarios and rotate through the selected ones) for
+--duration seconds or --iterations iterations, after an unrecorded
+warm-up. Every request is timed under its endpoint label and the JSON
+report carries requests/sec and p50/p95/p99 per endpoint and overall, with
+the git revision and settings needed to compare runs across versions.
+
+    STORAGE_BACKEND=memory python -m benchmarks.load --concurrency 32 --output before.json
+    python -m benchmarks.load --target http://localhost:8000 --scenario vehicle_crud
+"""
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from benchmarks.client import Session, StepFailed, open_client
+from benchmarks.scenarios import SCENARIOS, UserContext, run_tag, seed_vehicles
+from benchmarks.stats import Recorder
+
+logger = logging.getLogger("benchmarks.load")
+
+# User number of the context that seeds shared data, clear of virtual user numbers
+SEED_USER = 999
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def target_info(target: str) -> Dict:
+    """Where the load went; in-process runs also record the storage backend."""
+    info = {"target": target, "git_revision": git_revision()}
+    if target == "asgi":
+        from app.config import settings
+        info["storage_backend"] = settings.STORAGE_BACKEND
+    return info
+
+
+async def delete_vehicles(session: Session, ids: List[str], concurrency: int):
+    pending = iter(ids)
+
+    async def worker():
+        for vid in pending:
+            await session.request("DELETE /vehicles/{vid}", "DELETE", f"/vehicles/{vid}", expect=(204,), headers={"If-Match": "*"})
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _users(session: Session, scenarios: List[str], tag: str, args: argparse.Namespace, seconds: Optional[float], iterations: Optional[int]) -> Dict:
+    deadline = time.perf_counter() + seconds if seconds is not None else None
+    counts = {"iterations": 0, "failed_iterations": 0}
+    options = {"page_size": args.page_size, "page_depth": args.page_depth}
+
+    async def user(number: int):
+        ctx = UserContext(tag, args.seed, number, options)
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or time.perf_counter() < deadline):
+            scenario = SCENARIOS[scenarios[(number + done) % len(scenarios)]]
+            try:
+                await scenario(session, ctx)
+            except StepFailed as e:
+                counts["failed_iterations"] += 1
+                if counts["failed_iterations"] <= 5:
+                    logger.warning("iteration failed: %s", e)
+            done += 1
+            counts["iterations"] += 1
+
+    await asyncio.gather(*(user(number) for number in range(args.concurrency)))
+    return counts
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    """Seed, warm up, measure and clean up; returns the JSON report."""
+    scenarios = args.scenario or list(SCENARIOS)
+    recorder = Recorder()
+    tag = run_tag(args.seed)
+    started_at = datetime.now(timezone.utc).isoformat()
+    async with open_client(args.target, args.concurrency, args.timeout) as client:
+        session = Session(client, recorder)
+        recorder.recording = False
+        seeded = []
+        if "list_pagination" in scenarios:
+            seeded = await seed_vehicles(session, UserContext(tag, args.seed, SEED_USER, {}), args.seed_vehicles)
+        if args.warmup > 0:
+            await _users(session, scenarios, tag, args, args.warmup, None)
+        recorder.start()
+        counts = await _users(session, scenarios, tag, args, None if args.iterations else args.duration, args.iterations)
+        recorder.stop()
+        recorder.recording = False
+        # Soft-deletes the seeded vehicles so reruns against a server start from the same data
+        await delete_vehicles(session, seeded, args.concurrency)
+    return {
+        "benchmark": "load",
+        "started_at": started_at,
+        **target_info(args.target),
+        "config": {"scenarios": scenarios, "concurrency": args.concurrency, "duration_s": None if args.iterations else args.duration, "iterations_per_user": args.iterations,
+                   "warmup_s": args.warmup, "seed": args.seed, "seed_vehicles": len(seeded), "page_size": args.page_size, "page_depth": args.page_depth},
+        "elapsed_s": round(recorder.elapsed(), 3),
+        **counts,
+        **recorder.report(),
+    }
+
+
+def format_table(report: Dict) -> str:
+    rows = [("endpoint", "requests", "errors", "rps", "p50 ms", "p95 ms", "p99 ms")]
+    for name, summary in [*report["endpoints"].items(), ("total", report["total"])]:
+        rows.append((name, *(str(summary[key]) for key in ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"))))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return "\n".join("  ".join(cell.ljust(width) if column == 0 else cell.rjust(width) for column, (cell, width) in enumerate(zip(row, widths))) for row in rows)
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="asgi", help='"asgi" for app.main:app in-process, or a base URL such as http://localhost:8000')
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run; repeat for several (default: all)")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users sending requests back to back")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--iterations", type=int, help="scenario iterations per user, instead of --duration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unrecorded seconds before measuring")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the generated payloads")
+    parser.add_argument("--seed-vehicles", type=int, default=2000, help="vehicles created for list_pagination")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--page-depth", type=int, default=20, help="pages walked by list_pagination")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+    print(format_table(report), file=sys.stderr)
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
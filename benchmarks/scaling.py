@@ -0,0 +1,284 @@
+"""Data-size scaling benchmark: ``python -m benchmarks.scaling``.
+
+Grows the dataset through the :batch endpoints to each size in --sizes
+(vehicles, drivers and closed assignments, N of each) and, at every size,
+times a fixed set of endpoint probes one request at a time. A least-squares
+fit of log(latency) against log(N) gives each probe's growth exponent:
+about 0 for constant or logarithmic cost, about 1 for linear. Probes that
+should not depend on N are flagged when their exponent exceeds
+--max-slope, and the command exits 1, so a scan introduced on a request
+path shows up here before production.
+
+Seeding is cumulative and never cleaned up: point a URL target at a
+dedicated database, or run in-process with STORAGE_BACKEND=memory.
+
+    STORAGE_BACKEND=memory python -m benchmarks.scaling --sizes 1000,10000,100000 --output scaling.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.client import Session, open_client
+from benchmarks.load import target_info
+from benchmarks.scenarios import UserContext, run_tag
+from benchmarks.stats import Recorder, summarize
+
+logger = logging.getLogger("benchmarks.scaling")
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# Context user numbers for generated vehicles, drivers and probe writes
+VEHICLE_USER, DRIVER_USER, PROBE_USER = 1, 2, 3
+# Growth exponent bands used to describe a fitted slope
+GROWTH_BANDS = ((0.1, "flat"), (0.35, "sublinear"), (1.2, "linear"))
+# Exponent above which an endpoint expected to be linear is flagged as superlinear
+MAX_LINEAR_SLOPE = 1.2
+
+
+def fit_slope(sizes: List[int], latencies: List[Optional[float]]) -> Optional[float]:
+    """Least-squares slope of log(latency) over log(size); None with fewer than two points."""
+    points = [(math.log(size), math.log(latency)) for size, latency in zip(sizes, latencies) if latency]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def growth(slope: Optional[float]) -> Optional[str]:
+    if slope is None:
+        return None
+    for bound, name in GROWTH_BANDS:
+        if slope < bound:
+            return name
+    return "superlinear"
+
+
+def flagged(expected: str, slope: Optional[float], max_slope: float) -> bool:
+    """Whether a probe grew faster than its expected complexity allows."""
+    if slope is None:
+        return False
+    return slope > (MAX_LINEAR_SLOPE if expected == "linear" else max_slope)
+
+
+class Dataset:
+    """Ids seeded so far plus the generators that extend them."""
+
+    def __init__(self, tag: str, seed: int):
+        self.vehicles = UserContext(tag, seed, VEHICLE_USER, {})
+        self.drivers = UserContext(tag, seed, DRIVER_USER, {})
+        self.probe = UserContext(tag, seed, PROBE_USER, {})
+        self.rng = random.Random(seed)
+        self.vehicle_ids: List[str] = []
+        self.driver_ids: List[str] = []
+        self.assignments = 0
+
+    async def grow(self, session: Session, size: int, chunk: int, concurrency: int):
+        """Seed vehicles, drivers and closed assignments up to size of each."""
+        self.vehicle_ids += await _batches(session, "/vehicles:batch", [self.vehicles.vehicle() for _ in range(size - len(self.vehicle_ids))], chunk, concurrency)
+        self.driver_ids += await _batches(session, "/drivers:batch", [self.drivers.driver() for _ in range(size - len(self.driver_ids))], chunk, concurrency)
+        # Closed assignments never hold their driver or vehicle, so any pairing is accepted
+        end = datetime.now(timezone.utc) - timedelta(days=1)
+        items = [{"driver_id": self.driver_ids[index % len(self.driver_ids)], "vehicle_id": self.vehicle_ids[index % len(self.vehicle_ids)],
+                  "start_datetime": (end - timedelta(hours=1 + index % 24)).isoformat(), "end_datetime": end.isoformat()}
+                 for index in range(self.assignments, size)]
+        self.assignments += len(await _batches(session, "/assignments:batch", items, chunk, concurrency))
+
+
+async def _batches(session: Session, path: str, items: List[Dict], chunk: int, concurrency: int) -> List[str]:
+    chunks = iter([items[offset:offset + chunk] for offset in range(0, len(items), chunk)])
+    created: List[List[str]] = []
+
+    async def worker():
+        for batch in chunks:
+            results = (await session.request(f"POST {path}", "POST", path, json={"items": batch})).json()["data"]
+            created.append([result["id"] for result in results if result["success"]])
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return [id_ for batch in created for id_ in batch]
+
+
+# A probe prepares its request from the dataset (using the unrecorded setup
+# session for ETags or cursors) and returns a coroutine issuing the measured call
+Probe = Callable[[Session, Session, Dataset], Awaitable[Callable[[], Awaitable]]]
+
+
+def _probe(label: str, method: str, path: Callable[[Dataset], str], expect=(200,), **request) -> Probe:
+    async def prepare(measured: Session, setup: Session, data: Dataset):
+        async def call():
+            await measured.request(label, method, path(data), expect=expect, **request)
+        return call
+    return prepare
+
+
+async def _vehicle_not_modified(measured: Session, setup: Session, data: Dataset):
+    vid = data.rng.choice(data.vehicle_ids)
+    etag = (await setup.request("setup", "GET", f"/vehicles/{vid}")).headers["ETag"]
+
+    async def call():
+        await measured.request("GET /vehicles/{vid} (If-None-Match)", "GET", f"/vehicles/{vid}", expect=(304,), headers={"If-None-Match": etag})
+    return call
+
+
+async def _list_not_modified(measured: Session, setup: Session, data: Dataset):
+    etag = (await setup.request("setup", "GET", "/vehicles", params={"limit": 1})).headers["ETag"]
+
+    async def call():
+        await measured.request("GET /vehicles (If-None-Match)", "GET", "/vehicles", expect=(304,), headers={"If-None-Match": etag})
+    return call
+
+
+async def _middle_cursor(measured: Session, setup: Session, data: Dataset):
+    page = (await setup.request("setup", "GET", "/vehicles", params={"limit": 1, "skip": len(data.vehicle_ids) // 2})).json()
+    cursor = page["pagination"]["next_cursor"]
+
+    async def call():
+        await measured.request("GET /vehicles?cursor (middle)", "GET", "/vehicles", params={"limit": 50, "cursor": cursor})
+    return call
+
+
+async def _patch_driver(measured: Session, setup: Session, data: Dataset):
+    did = data.rng.choice(data.driver_ids)
+
+    async def call():
+        etag = (await setup.request("setup", "GET", f"/drivers/{did}")).headers["ETag"]
+        await measured.request("PATCH /drivers/{did}", "PATCH", f"/drivers/{did}", headers={"If-Match": etag}, json={"contact_number": f"+1555{data.rng.randint(0, 9999999):07d}"})
+    return call
+
+
+async def _create_vehicle(measured: Session, setup: Session, data: Dataset):
+    async def call():
+        await measured.request("POST /vehicles", "POST", "/vehicles", expect=(201,), json=data.probe.vehicle())
+    return call
+
+
+# (probe, expected complexity in N); "linear" probes are reported but only flagged when superlinear
+PROBES: List[tuple] = [
+    (_probe("GET /vehicles/{vid}", "GET", lambda data: f"/vehicles/{data.rng.choice(data.vehicle_ids)}"), "constant"),
+    (_vehicle_not_modified, "constant"),
+    (_probe("GET /drivers/{did}", "GET", lambda data: f"/drivers/{data.rng.choice(data.driver_ids)}"), "constant"),
+    (_list_not_modified, "constant"),
+    (_middle_cursor, "logarithmic"),
+    (_probe("GET /assignments?driver_id", "GET", lambda data: f"/assignments?driver_id={data.rng.choice(data.driver_ids)}"), "logarithmic"),
+    (_probe("GET /assignments?vehicle_id&state=closed", "GET", lambda data: f"/assignments?state=closed&vehicle_id={data.rng.choice(data.vehicle_ids)}"), "logarithmic"),
+    (_create_vehicle, "logarithmic"),
+    (_patch_driver, "logarithmic"),
+    # Offset pages count every match for the total and skip over the leading rows
+    (_probe("GET /vehicles (first page, total)", "GET", lambda data: "/vehicles?limit=50"), "linear"),
+    (_probe("GET /vehicles?skip (middle)", "GET", lambda data: f"/vehicles?limit=50&skip={len(data.vehicle_ids) // 2}"), "linear"),
+]
+
+
+async def measure(measured: Session, setup: Session, data: Dataset, requests: int, warmup: int) -> Dict[str, Dict]:
+    """Time every probe sequentially; returns {label: summary}."""
+    results = {}
+    for prepare, expected in PROBES:
+        recorder = measured.recorder
+        recorder.recording = False
+        call = await prepare(measured, setup, data)
+        for _ in range(warmup):
+            await call()
+        recorder.start()
+        for _ in range(requests):
+            await call()
+        recorder.stop()
+        for label, latencies in recorder.latencies.items():
+            results[label] = {"expected": expected, **summarize(latencies, recorder.errors.get(label, 0), recorder.elapsed())}
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    sizes = sorted(args.sizes)
+    data = Dataset(run_tag(args.seed), args.seed)
+    per_size: List[Dict[str, Dict]] = []
+    async with open_client(args.target, args.seed_concurrency, args.timeout) as client:
+        setup = Session(client, Recorder())
+        setup.recorder.recording = False
+        measured = Session(client, Recorder())
+        for size in sizes:
+            started = time.perf_counter()
+            await data.grow(setup, size, args.chunk, args.seed_concurrency)
+            logger.info("seeded %d vehicles, drivers and assignments in %.1fs", size, time.perf_counter() - started)
+            per_size.append(await measure(measured, setup, data, args.requests, args.warmup))
+    endpoints = {}
+    for label in per_size[0]:
+        expected = per_size[0][label]["expected"]
+        p50 = [results[label]["p50_ms"] for results in per_size]
+        slope = fit_slope(sizes, p50)
+        endpoints[label] = {
+            "expected": expected,
+            "p50_ms": p50,
+            "p95_ms": [results[label]["p95_ms"] for results in per_size],
+            "errors": sum(results[label]["errors"] for results in per_size),
+            "slope": None if slope is None else round(slope, 3),
+            "growth": growth(slope),
+            "ratio": round(p50[-1] / p50[0], 2) if p50[0] and p50[-1] else None,
+            "flagged": flagged(expected, slope, args.max_slope),
+        }
+    return {
+        "benchmark": "scaling",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        **target_info(args.target),
+        "config": {"sizes": sizes, "requests": args.requests, "warmup": args.warmup, "max_slope": args.max_slope, "seed": args.seed},
+        "endpoints": endpoints,
+        "flagged": sorted(label for label, endpoint in endpoints.items() if endpoint["flagged"]),
+    }
+
+
+def format_table(report: Dict) -> str:
+    sizes = report["config"]["sizes"]
+    lines = [f"{'endpoint':<44}{'expected':<13}" + "".join(f"{size:>11,}" for size in sizes) + f"{'slope':>8}  growth"]
+    for label, endpoint in report["endpoints"].items():
+        cells = "".join(f"{value:>11}" for value in endpoint["p50_ms"])
+        flag = "  FLAGGED" if endpoint["flagged"] else ""
+        lines.append(f"{label:<44}{endpoint['expected']:<13}{cells}{str(endpoint['slope']):>8}  {endpoint['growth']}{flag}")
+    return "\n".join(lines)
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.scaling", description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="asgi", help='"asgi" for app.main:app in-process, or a base URL')
+    parser.add_argument("--sizes", type=_sizes, default=list(DEFAULT_SIZES), help="comma-separated N values (vehicles, drivers and assignments each)")
+    parser.add_argument("--requests", type=int, default=30, help="measured requests per probe and size")
+    parser.add_argument("--warmup", type=int, default=5, help="unrecorded requests per probe and size")
+    parser.add_argument("--max-slope", type=float, default=0.25, help="growth exponent above which a constant/logarithmic probe is flagged")
+    parser.add_argument("--chunk", type=int, default=1000, help="items per :batch request while seeding")
+    parser.add_argument("--seed-concurrency", type=int, default=4, help=":batch requests in flight while seeding")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+    print(format_table(report), file=sys.stderr)
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+    if report["flagged"]:
+        print(f"endpoints growing with N: {', '.join(report['flagged'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
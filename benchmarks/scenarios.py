@@ -0,0 +1,126 @@
+"""Scripted benchmark scenarios.
+
+Each scenario is a coroutine running one iteration of a fixed request
+sequence for one virtual user. Data comes from a per-user random.Random
+seeded from the run seed and the user number, so a run with the same seed
+and concurrency sends the same requests. Plates and licenses carry a run
+tag, so repeated runs against the same server do not collide.
+"""
+import random
+import string
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.client import Session
+
+VEHICLE_TYPES = ("SEDAN", "SUV", "TRUCK", "VAN")
+FUEL_TYPES = ("GASOLINE", "DIESEL", "ELECTRIC", "HYBRID")
+_BASE36 = string.digits + string.ascii_uppercase
+
+
+def run_tag(seed: int) -> str:
+    """Three alphanumeric characters identifying a run, unique enough across reruns."""
+    rng = random.Random(f"{seed}-{datetime.now(timezone.utc).isoformat()}")
+    return "".join(rng.choice(_BASE36) for _ in range(3))
+
+
+def etag_of(entity: Dict) -> str:
+    """ETag of an entity from its rendered updated_at, as GET and PATCH compute it."""
+    return f'"{entity["updated_at"]}"'
+
+
+class UserContext:
+    """Per virtual user state: deterministic random data and unique keys."""
+
+    def __init__(self, tag: str, seed: int, user: int, options: Dict):
+        self.tag = tag
+        self.user = user
+        self.rng = random.Random(seed * 100003 + user)
+        self.options = options
+        self._serial = 0
+
+    def key(self) -> str:
+        # <tag:3><user:3><serial:4 base36> = 10 characters, the plate_number limit
+        self._serial += 1
+        serial, digits = self._serial, ""
+        for _ in range(4):
+            serial, digit = divmod(serial, 36)
+            digits = _BASE36[digit] + digits
+        return f"{self.tag}{self.user % 1000:03d}{digits}"
+
+    def vehicle(self) -> Dict:
+        return {"plate_number": self.key(), "model": f"Model {self.rng.randint(1, 50)}", "year": self.rng.randint(2000, 2025),
+                "type": self.rng.choice(VEHICLE_TYPES), "fuel_type": self.rng.choice(FUEL_TYPES)}
+
+    def driver(self) -> Dict:
+        return {"name": f"Driver {self.rng.randint(1, 100000)}", "license_number": f"L{self.key()}", "contact_number": f"+1555{self.rng.randint(0, 9999999):07d}"}
+
+
+async def vehicle_crud(session: Session, ctx: UserContext):
+    """Create, read, conditionally update and delete one vehicle."""
+    created = (await session.request("POST /vehicles", "POST", "/vehicles", expect=(201,), json=ctx.vehicle())).json()
+    vid = created["id"]
+    got = await session.request("GET /vehicles/{vid}", "GET", f"/vehicles/{vid}")
+    patched = (await session.request("PATCH /vehicles/{vid}", "PATCH", f"/vehicles/{vid}", headers={"If-Match": got.headers["ETag"]},
+                                     json={"model": f"Model {ctx.rng.randint(51, 99)}"})).json()
+    await session.request("DELETE /vehicles/{vid}", "DELETE", f"/vehicles/{vid}", expect=(204,), headers={"If-Match": etag_of(patched)})
+
+
+async def driver_crud(session: Session, ctx: UserContext):
+    """Driver CRUD exercising ETags: revalidation (304), a stale If-Match (409) and a matching one."""
+    created = (await session.request("POST /drivers", "POST", "/drivers", expect=(201,), json=ctx.driver())).json()
+    did = created["id"]
+    got = await session.request("GET /drivers/{did}", "GET", f"/drivers/{did}")
+    etag = got.headers["ETag"]
+    await session.request("GET /drivers/{did} (If-None-Match)", "GET", f"/drivers/{did}", expect=(304,), headers={"If-None-Match": etag})
+    patched = (await session.request("PATCH /drivers/{did}", "PATCH", f"/drivers/{did}", headers={"If-Match": etag},
+                                     json={"contact_number": f"+1555{ctx.rng.randint(0, 9999999):07d}"})).json()
+    await session.request("PATCH /drivers/{did} (stale If-Match)", "PATCH", f"/drivers/{did}", expect=(409,), headers={"If-Match": etag}, json={"status": "ACTIVE"})
+    await session.request("DELETE /drivers/{did}", "DELETE", f"/drivers/{did}", expect=(204,), headers={"If-Match": etag_of(patched)})
+
+
+async def assignment_lifecycle(session: Session, ctx: UserContext):
+    """Assign a new driver to a new vehicle, read and list it, close it, then delete everything."""
+    driver = (await session.request("POST /drivers", "POST", "/drivers", expect=(201,), json=ctx.driver())).json()
+    vehicle = (await session.request("POST /vehicles", "POST", "/vehicles", expect=(201,), json=ctx.vehicle())).json()
+    start = datetime.now(timezone.utc).isoformat()
+    assignment = (await session.request("POST /assignments", "POST", "/assignments", expect=(201,),
+                                        json={"driver_id": driver["id"], "vehicle_id": vehicle["id"], "start_datetime": start})).json()
+    aid = assignment["id"]
+    await session.request("GET /assignments/{aid}", "GET", f"/assignments/{aid}")
+    await session.request("GET /assignments?driver_id", "GET", "/assignments", params={"driver_id": driver["id"], "state": "active"})
+    await session.request("PATCH /assignments/{aid}", "PATCH", f"/assignments/{aid}", json={"end_datetime": datetime.now(timezone.utc).isoformat()})
+    await session.request("DELETE /assignments/{aid}", "DELETE", f"/assignments/{aid}", expect=(204,))
+    await session.request("DELETE /drivers/{did}", "DELETE", f"/drivers/{driver['id']}", expect=(204,), headers={"If-Match": etag_of(driver)})
+    await session.request("DELETE /vehicles/{vid}", "DELETE", f"/vehicles/{vehicle['id']}", expect=(204,), headers={"If-Match": etag_of(vehicle)})
+
+
+async def list_pagination(session: Session, ctx: UserContext):
+    """Walk the vehicle list by cursor to the configured depth, then jump to the same depth with skip."""
+    limit, depth = ctx.options["page_size"], ctx.options["page_depth"]
+    params = {"limit": limit}
+    for _ in range(depth):
+        page = (await session.request("GET /vehicles?cursor", "GET", "/vehicles", params=params)).json()
+        cursor = page["pagination"]["next_cursor"]
+        if not cursor:
+            break
+        params = {"limit": limit, "cursor": cursor}
+    await session.request("GET /vehicles?skip", "GET", "/vehicles", params={"limit": limit, "skip": limit * (depth - 1)})
+
+
+async def seed_vehicles(session: Session, ctx: UserContext, count: int, chunk: int = 1000) -> List[str]:
+    """Create count vehicles through POST /vehicles:batch; returns their ids."""
+    ids = []
+    for offset in range(0, count, chunk):
+        items = [ctx.vehicle() for _ in range(min(chunk, count - offset))]
+        results = (await session.request("POST /vehicles:batch", "POST", "/vehicles:batch", json={"items": items})).json()["data"]
+        ids.extend(result["id"] for result in results if result["success"])
+    return ids
+
+
+SCENARIOS: Dict[str, Callable[[Session, UserContext], Awaitable[None]]] = {
+    "vehicle_crud": vehicle_crud,
+    "driver_crud": driver_crud,
+    "assignment_lifecycle": assignment_lifecycle,
+    "list_pagination": list_pagination,
+}
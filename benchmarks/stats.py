@@ -0,0 +1,70 @@
+"""Latency samples per endpoint and their summary."""
+import math
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100) of an ascending list."""
+    if not ordered:
+        return None
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict:
+    """Count, errors, requests/sec and latency in milliseconds for one endpoint."""
+    ordered = sorted(latencies)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / seconds, 2) if seconds > 0 else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+
+class Recorder:
+    """Collects (endpoint, latency, error) samples; recording is off during warm-up."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.recording = True
+        self.started = time.perf_counter()
+        self.stopped: Optional[float] = None
+
+    def start(self):
+        self.latencies.clear()
+        self.errors.clear()
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+
+    def record(self, endpoint: str, seconds: float, error: bool = False):
+        if not self.recording:
+            return
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if error:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def elapsed(self) -> float:
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def report(self) -> Dict:
+        """{"total": summary, "endpoints": {endpoint: summary}} over the recorded window."""
+        seconds = self.elapsed()
+        every = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            "total": summarize(every, sum(self.errors.values()), seconds),
+            "endpoints": {endpoint: summarize(latencies, self.errors.get(endpoint, 0), seconds) for endpoint, latencies in sorted(self.latencies.items())},
+        }
@@ -1,9 +1,9 @@
-"""E2E test configuration with real MongoDB backend."""
+"""E2E test configuration; runs against STORAGE_BACKEND (STORAGE_BACKEND=memory needs no MongoDB)."""
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime, timezone
 from app.main import app
-from app.storage import store
+from app.storage import get_store
 import asyncio
 
 
@@ -17,22 +17,19 @@ def event_loop():
 
 @pytest.fixture(scope="function", autouse=True)
 def cleanup_db():
-    """Clear database before and after each E2E test."""
-    # Clear before test
-    store.mongo.db.vehicles.delete_many({})
-    store.mongo.db.drivers.delete_many({})
-    store.mongo.db.assignments.delete_many({})
+    """Clear the configured storage backend before and after each E2E test."""
+    # Storage connects lazily; the client fixture's lifespan reuses this connection
+    get_store().clear()
     yield
-    # Clear after test
-    store.mongo.db.vehicles.delete_many({})
-    store.mongo.db.drivers.delete_many({})
-    store.mongo.db.assignments.delete_many({})
+    # Clear after test; the lifespan closed the store it shared, so reopen it
+    get_store().clear()
 
 
 @pytest.fixture
 def client():
-    """FastAPI test client with real MongoDB backend."""
-    return TestClient(app)
+    """FastAPI test client on the configured backend; runs the app lifespan."""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.fixture
@@ -1,42 +1,36 @@
 import pytest
 from fastapi.testclient import TestClient
 
+from app.config import settings
+
+# Against MongoDB every functional test runs on both the sync pymongo routers
+# and the async Motor routers (app/routers/aio); the memory backend has no async twin
+BACKENDS = ["mongo", "motor"] if settings.STORAGE_BACKEND in ("mongo", "motor") else [settings.STORAGE_BACKEND]
+
 
 @pytest.fixture(autouse=True)
 def cleanup_mongo():
-    """Clear MongoDB collections before each test."""
-    from app.storage.mongo import get_db
+    """Clear the configured storage backend before each test."""
+    from app.storage import get_store
     try:
-        db = get_db()
-        db.vehicles.delete_many({})
-        db.drivers.delete_many({})
-        db.assignments.delete_many({})
+        get_store().clear()
     except:
         # MongoDB might not be available during early test collection
         pass
     yield
     # Cleanup after test
     try:
-        db = get_db()
-        db.vehicles.delete_many({})
-        db.drivers.delete_many({})
-        db.assignments.delete_many({})
+        get_store().clear()
     except:
         pass
 
 
-@pytest.fixture
-def client():
-    """Test client fixture expecting an ASGI app at `app.main:app`.
-
-    Tests follow TDD: the app may not exist yet — creating tests first.
-    """
-    try:
-        from app.main import app
-    except Exception as exc:  # pragma: no cover - failing import is expected in TDD
-        raise
+@pytest.fixture(params=BACKENDS)
+def client(request):
+    """Test client for the app built by `app.main.create_app` on each backend in BACKENDS."""
+    from app.main import create_app
 
-    with TestClient(app) as client:
+    with TestClient(create_app(request.param)) as client:
         yield client
 
 
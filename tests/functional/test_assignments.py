@@ -172,3 +172,77 @@ def test_patch_assignment_end_datetime_parsing_and_delete_not_found(client, auth
     # delete nonexistent assignment
     rdel = client.delete(f"/assignments/{str(uuid.uuid4())}", headers=auth_headers)
     assert rdel.status_code == 404
+
+
+def test_create_assignment_vehicle_already_assigned_409(client, auth_headers):
+    rv = client.post("/vehicles", json={"plate_number": "EXCL1", "model": "X", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"}, headers=auth_headers)
+    vid = rv.json()["id"]
+    dids = []
+    for i in range(2):
+        rd = client.post("/drivers", json={"name": f"Driver {i}", "license_number": f"EXD{i}", "contact_number": "+15550002222"}, headers=auth_headers)
+        dids.append(rd.json()["id"])
+
+    now = datetime.now(timezone.utc).isoformat()
+    r1 = client.post("/assignments", json={"driver_id": dids[0], "vehicle_id": vid, "start_datetime": now}, headers=auth_headers)
+    assert r1.status_code == 201
+    assert "ongoing" not in client.get(f"/assignments/{r1.json()['id']}", headers=auth_headers).json()
+
+    r2 = client.post("/assignments", json={"driver_id": dids[1], "vehicle_id": vid, "start_datetime": now}, headers=auth_headers)
+    assert r2.status_code == 409
+    assert r2.json()["error"]["code"] == "VEHICLE_ALREADY_ASSIGNED"
+
+    # Closing the first assignment frees the vehicle
+    r_close = client.patch(f"/assignments/{r1.json()['id']}", json={"end_datetime": now}, headers=auth_headers)
+    assert r_close.status_code == 200
+    r3 = client.post("/assignments", json={"driver_id": dids[1], "vehicle_id": vid, "start_datetime": now}, headers=auth_headers)
+    assert r3.status_code == 201
+
+
+def test_list_assignments_filters_by_vehicle_and_state(client, auth_headers):
+    vids, dids = [], []
+    for i in range(2):
+        rv = client.post("/vehicles", json={"plate_number": f"LSA{i}", "model": "X", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"}, headers=auth_headers)
+        vids.append(rv.json()["id"])
+        rd = client.post("/drivers", json={"name": f"Lister {i}", "license_number": f"LSAD{i}", "contact_number": "+15550003333"}, headers=auth_headers)
+        dids.append(rd.json()["id"])
+
+    start = datetime.now(timezone.utc) - timedelta(hours=2)
+    closed = client.post("/assignments", json={"driver_id": dids[0], "vehicle_id": vids[0], "start_datetime": start.isoformat(), "end_datetime": (start + timedelta(hours=1)).isoformat()}, headers=auth_headers)
+    open_ = client.post("/assignments", json={"driver_id": dids[1], "vehicle_id": vids[0], "start_datetime": datetime.now(timezone.utc).isoformat()}, headers=auth_headers)
+    other = client.post("/assignments", json={"driver_id": dids[0], "vehicle_id": vids[1], "start_datetime": datetime.now(timezone.utc).isoformat()}, headers=auth_headers)
+    assert closed.status_code == open_.status_code == other.status_code == 201
+
+    body = client.get(f"/assignments?vehicle_id={vids[0]}", headers=auth_headers).json()
+    assert {a["id"] for a in body["data"]} == {closed.json()["id"], open_.json()["id"]}
+
+    body = client.get(f"/assignments?vehicle_id={vids[0]}&state=active", headers=auth_headers).json()
+    assert [a["id"] for a in body["data"]] == [open_.json()["id"]]
+
+    body = client.get("/assignments?state=closed", headers=auth_headers).json()
+    assert [a["id"] for a in body["data"]] == [closed.json()["id"]]
+
+    r = client.get("/assignments?state=unknown", headers=auth_headers)
+    assert r.status_code == 422
+
+
+def test_create_assignments_batch_enforces_exclusivity_within_batch(client, auth_headers):
+    vehicles = client.post("/vehicles:batch", json={"items": [{"plate_number": f"BAS{i}", "model": "X", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"} for i in range(2)]}, headers=auth_headers).json()["data"]
+    drivers = client.post("/drivers:batch", json={"items": [{"name": f"Batch {i}", "license_number": f"BASD{i}", "contact_number": "+15550004444"} for i in range(2)] + [{"name": "Bad", "license_number": "BASDX", "contact_number": "555"}]}, headers=auth_headers).json()["data"]
+    assert drivers[2]["error"]["code"] == "VALIDATION_ERROR"
+    vids = [v["id"] for v in vehicles]
+    dids = [d["id"] for d in drivers[:2]]
+
+    now = datetime.now(timezone.utc).isoformat()
+    items = [
+        {"driver_id": dids[0], "vehicle_id": vids[0], "start_datetime": now},
+        {"driver_id": dids[1], "vehicle_id": vids[0], "start_datetime": now},
+        {"driver_id": dids[1], "vehicle_id": vids[1], "start_datetime": now},
+        {"driver_id": str(uuid.uuid4()), "vehicle_id": vids[1], "start_datetime": now},
+    ]
+    r = client.post("/assignments:batch", json={"items": items}, headers=auth_headers)
+    assert r.status_code == 200
+    results = r.json()["data"]
+    assert [res.get("error", {}).get("code") for res in results] == [None, "VEHICLE_ALREADY_ASSIGNED", None, "DRIVER_NOT_FOUND"]
+    assert results[3]["status"] == 404
+    body = client.get("/assignments?state=active", headers=auth_headers).json()
+    assert {a["id"] for a in body["data"]} == {results[0]["id"], results[2]["id"]}
@@ -69,6 +69,21 @@ def test_suspend_driver_with_active_assignment_conflict(client, auth_headers):
     assert err["error"]["code"] in ("DRIVER_HAS_ACTIVE_ASSIGNMENTS", "CONFLICT")
 
 
+def test_suspend_with_stale_etag_is_a_concurrency_conflict(client, auth_headers):
+    """The If-Match precondition is checked before the active-assignment rule"""
+    rd = client.post("/drivers", json=make_driver_payload(license_number="STALEDRV"), headers=auth_headers)
+    did = rd.json()["id"]
+    stale = client.get(f"/drivers/{did}", headers=auth_headers).headers["ETag"]
+    rv = client.post("/vehicles", json={"plate_number": "VSTALE1", "model": "M", "year": 2021, "type": "VAN", "fuel_type": "DIESEL"}, headers=auth_headers)
+    ra = client.post("/assignments", json={"driver_id": did, "vehicle_id": rv.json()["id"], "start_datetime": datetime.now(timezone.utc).isoformat()}, headers=auth_headers)
+    assert ra.status_code == 201
+    assert client.patch(f"/drivers/{did}", json={"name": "Renamed"}, headers={**auth_headers, "If-Match": stale}).status_code == 200
+
+    r = client.patch(f"/drivers/{did}", json={"status": "SUSPENDED"}, headers={**auth_headers, "If-Match": stale})
+    assert r.status_code == 409
+    assert r.json()["error"]["code"] == "CONCURRENCY_CONFLICT"
+
+
 def test_delete_driver_only_when_not_assigned(client, auth_headers):
     d_payload = make_driver_payload(license_number="DELDRV")
     rd = client.post("/drivers", json=d_payload, headers=auth_headers)
@@ -106,3 +121,32 @@ def test_delete_driver_only_when_not_assigned(client, auth_headers):
         headers2["If-Match"] = etag2
     rdel2 = client.delete(f"/drivers/{did}", headers=headers2)
     assert rdel2.status_code == 204
+
+
+def test_license_can_be_reused_after_driver_soft_delete(client, auth_headers):
+    r1 = client.post("/drivers", json=make_driver_payload(license_number="REUSE1"), headers=auth_headers)
+    assert r1.status_code == 201
+    did = r1.json()["id"]
+
+    etag = client.get(f"/drivers/{did}", headers=auth_headers).headers.get("ETag")
+    rdel = client.delete(f"/drivers/{did}", headers={**auth_headers, "If-Match": etag})
+    assert rdel.status_code == 204
+    assert client.get(f"/drivers/{did}", headers=auth_headers).status_code == 404
+
+    r2 = client.post("/drivers", json=make_driver_payload(license_number="reuse1"), headers=auth_headers)
+    assert r2.status_code == 201
+    assert r2.json()["id"] != did
+
+
+def test_list_drivers_filters_by_status(client, auth_headers):
+    r1 = client.post("/drivers", json=make_driver_payload(license_number="LST1"), headers=auth_headers)
+    r2 = client.post("/drivers", json={**make_driver_payload(license_number="LST2"), "status": "SUSPENDED"}, headers=auth_headers)
+    assert r1.status_code == 201 and r2.status_code == 201
+
+    body = client.get("/drivers?status=SUSPENDED", headers=auth_headers).json()
+    assert body["success"] is True
+    assert [d["id"] for d in body["data"]] == [r2.json()["id"]]
+    assert body["pagination"]["total"] == 1 and body["pagination"]["has_more"] is False
+
+    body = client.get("/drivers?limit=1", headers=auth_headers).json()
+    assert body["pagination"]["total"] == 2 and body["pagination"]["next_cursor"]
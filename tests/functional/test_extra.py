@@ -1,6 +1,17 @@
 from datetime import datetime, timezone
 import uuid
 
+import pytest
+
+
+def test_client_serves_the_routers_of_its_backend(client, request, auth_headers):
+    """The motor client runs the async routers in app/routers/aio on Motor, the others the sync ones"""
+    import app.storage
+
+    backend = request.node.callspec.params["client"]
+    assert client.get("/vehicles", headers=auth_headers).status_code == 200
+    assert (app.storage._async_store_instance is not None) == (backend == "motor")
+
 
 def test_unauthorized_access_is_401(client):
     # no auth header
@@ -33,3 +44,141 @@ def test_delete_nonexistent_vehicle_returns_404(client, auth_headers):
     headers = {**auth_headers, "If-Match": '"dummy"'}
     r = client.delete(f"/vehicles/{vid}", headers=headers)
     assert r.status_code == 404
+
+
+def test_admin_pool_reports_pool_statistics(client, auth_headers):
+    """GET /admin/pool serves the live counters kept from the driver's pool events"""
+    from types import SimpleNamespace
+    from app.storage.pool import POOL_STATS
+
+    assert client.get("/admin/pool").status_code == 401
+    event = SimpleNamespace(address=("pool-test", 27017), connection_id=1)
+    before = client.get("/admin/pool", headers=auth_headers).json()["data"]
+    POOL_STATS.pool_created(event)
+    try:
+        POOL_STATS.connection_created(event)
+        POOL_STATS.connection_check_out_started(event)
+        POOL_STATS.connection_checked_out(SimpleNamespace(duration=0.003, **vars(event)))
+        r = client.get("/admin/pool", headers=auth_headers)
+        assert r.status_code == 200
+        data = r.json()["data"]
+        assert "pool-test:27017" in data["pools"]
+        assert data["checkouts"] - before["checkouts"] == 1
+        assert data["checked_out"] - before["checked_out"] == 1
+        assert data["waiting"] == before["waiting"]
+        assert data["wait_time_ms"]["count"] - before["wait_time_ms"]["count"] == 1
+        fast = {bucket["le_ms"]: bucket["count"] for bucket in before["wait_time_ms"]["buckets"]}
+        assert {bucket["le_ms"]: bucket["count"] for bucket in data["wait_time_ms"]["buckets"]}[5] - fast[5] == 1
+    finally:
+        # Leave the process-wide counters as the driver left them
+        POOL_STATS.connection_checked_in(event)
+        POOL_STATS.connection_closed(event)
+        POOL_STATS.pool_closed(event)
+
+
+def test_metrics_exposes_route_and_mongo_histograms(client, auth_headers):
+    """GET /metrics reports request counts by route template in Prometheus text format"""
+    r = client.post("/vehicles", json={"plate_number": "MT01", "model": "M", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"}, headers=auth_headers)
+    client.get(f"/vehicles/{r.json()['id']}", headers=auth_headers)
+    m = client.get("/metrics")
+    assert m.status_code == 200
+    assert m.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/vehicles/{vid}",status="200"}' in m.text
+    assert "# TYPE mongo_command_duration_seconds histogram" in m.text
+
+
+def test_server_timing_reports_storage_and_serialization(client, auth_headers, monkeypatch):
+    """Responses carry a Server-Timing breakdown and produce one access log entry"""
+    from app import timing
+
+    r = client.post("/vehicles", json={"plate_number": "ST01", "model": "M", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"}, headers=auth_headers)
+    entries = []
+    monkeypatch.setattr(timing, "log_access", entries.append)
+    g = client.get(f"/vehicles/{r.json()['id']}", headers=auth_headers)
+    server_timing = g.headers["Server-Timing"]
+    assert 'db;dur=' in server_timing and 'desc="1 query"' in server_timing
+    assert "ser;dur=" in server_timing and "total;dur=" in server_timing
+    assert entries[-1]["route"] == "/vehicles/{vid}"
+    assert entries[-1]["db_calls"] == 1 and entries[-1]["status"] == 200
+    assert entries[-1]["bytes"] == len(g.content)
+
+
+def test_admin_slow_queries_lists_recorded_shapes(client, auth_headers, monkeypatch):
+    """GET /admin/slow-queries groups commands over SLOW_QUERY_MS by shape, literals replaced"""
+    from types import SimpleNamespace
+    from app.config import settings
+    from app.storage.commands import COMMAND_STATS
+    from app.storage.slowlog import SLOW_QUERIES
+
+    SLOW_QUERIES.reset()
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 50)
+    # The events the driver hands the command listener for two runs of one list query
+    for request_id, status in ((1, "ACTIVE"), (2, "INACTIVE")):
+        command = {"find": "vehicles", "filter": {"deleted": False, "status": status}, "sort": {"created_at": 1, "id": 1}, "limit": 50}
+        COMMAND_STATS.started(SimpleNamespace(request_id=request_id, command_name="find", command=command))
+        COMMAND_STATS.succeeded(SimpleNamespace(request_id=request_id, duration_micros=80_000, reply={"cursor": {"firstBatch": [{}, {}]}}))
+    r = client.get("/admin/slow-queries", headers=auth_headers)
+    assert r.status_code == 200
+    entries = [e for e in r.json()["data"] if e["collection"] == "vehicles" and e["command"] == "find"]
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry["shape"]["filter"] == {"deleted": "?", "status": "?"}
+    assert entry["shape"]["sort"] == {"created_at": 1, "id": 1}
+    assert entry["count"] == 2 and entry["max_ms"] == 80.0 and entry["docs_returned"] == 2
+
+
+def test_entity_cache_serves_repeat_reads_and_sees_writes(client, auth_headers, monkeypatch):
+    """Repeated GETs of a vehicle hit the entity cache and a PATCH is visible on the next GET"""
+    import app.storage
+    from app.storage.cache import ENTITY_CACHE
+
+    # The adapter serving the routes: Motor's when STORAGE_BACKEND=motor
+    storage = (app.storage._async_store_instance or app.storage.get_store()).mongo
+    if not hasattr(storage, "cache"):
+        pytest.skip("entity cache only fronts the Mongo backends")
+    # Off by default; enable it for this test
+    monkeypatch.setattr(ENTITY_CACHE, "ttl", 5.0)
+    monkeypatch.setattr(storage, "cache", ENTITY_CACHE)
+    r = client.post("/vehicles", json={"plate_number": "EC01", "model": "M", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"}, headers=auth_headers)
+    vid = r.json()["id"]
+    before = client.get("/admin/cache", headers=auth_headers).json()["data"]
+    g1 = client.get(f"/vehicles/{vid}", headers=auth_headers)
+    g2 = client.get(f"/vehicles/{vid}", headers=auth_headers)
+    after = client.get("/admin/cache", headers=auth_headers).json()["data"]
+    assert after["collections"]["vehicles"]["hits"] - before["collections"]["vehicles"]["hits"] >= 1
+    assert g1.json() == g2.json()
+    p = client.patch(f"/vehicles/{vid}", json={"model": "Changed"}, headers={**auth_headers, "If-Match": g2.headers["ETag"]})
+    assert p.status_code == 200
+    g3 = client.get(f"/vehicles/{vid}", headers=auth_headers)
+    assert g3.json()["model"] == "Changed" and g3.headers["ETag"] != g2.headers["ETag"]
+
+
+def test_admin_coalescing_reports_shared_reads(client, auth_headers):
+    """GET /admin/coalescing counts every entity read; sequential reads each run their own query"""
+    import app.storage
+
+    if (app.storage._async_store_instance or app.storage.get_store()).flights is None:
+        pytest.skip("reads are coalesced by the Mongo backends only")
+    r = client.post("/vehicles", json={"plate_number": "SF01", "model": "M", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE"}, headers=auth_headers)
+    before = client.get("/admin/coalescing", headers=auth_headers).json()["data"]
+    for _ in range(3):
+        assert client.get(f"/vehicles/{r.json()['id']}", headers=auth_headers).status_code == 200
+    after = client.get("/admin/coalescing", headers=auth_headers).json()["data"]
+    vehicles_before = before["collections"].get("vehicles", {"executed": 0, "coalesced": 0})
+    vehicles_after = after["collections"]["vehicles"]
+    assert vehicles_after["executed"] - vehicles_before["executed"] == 3
+    assert vehicles_after["coalesced"] == vehicles_before["coalesced"]
+    assert after["coalescing_ratio"] == round(after["coalesced"] / after["reads"], 4)
+    metrics = client.get("/metrics").text
+    assert "# TYPE storage_coalescing_ratio gauge" in metrics
+    assert "# TYPE storage_reads_total counter" in metrics
+    assert "# TYPE storage_reads_coalesced_total counter" in metrics
+
+
+@pytest.mark.parametrize("path", ["/vehicles", "/drivers", "/assignments"])
+@pytest.mark.parametrize("query, field", [("limit=-1", "limit"), ("limit=0", "limit"), ("limit=501", "limit"), ("skip=-1", "skip")])
+def test_list_paging_parameters_are_bounded(client, auth_headers, path, query, field):
+    """limit must be 1..500 and skip non-negative on every list route"""
+    r = client.get(f"{path}?{query}", headers=auth_headers)
+    assert r.status_code == 422
+    assert field in r.json()["error"]["details"]
@@ -0,0 +1,23 @@
+"""Smoke tests running the load and scaling benchmarks briefly against the app in-process."""
+import asyncio
+
+from benchmarks import load, scaling
+from benchmarks.scenarios import SCENARIOS
+
+
+def test_load_benchmark_runs_every_scenario_without_errors():
+    args = load.parser().parse_args(["--iterations", "1", "--warmup", "0", "--concurrency", str(len(SCENARIOS)), "--seed-vehicles", "120", "--page-depth", "2"])
+    report = asyncio.run(load.run(args))
+    assert report["iterations"] == len(SCENARIOS)
+    assert report["failed_iterations"] == 0 and report["total"]["errors"] == 0
+    assert {"POST /vehicles", "GET /drivers/{did} (If-None-Match)", "POST /assignments", "GET /vehicles?cursor"} <= set(report["endpoints"])
+    assert report["endpoints"]["GET /vehicles?cursor"]["requests"] == 2
+
+
+def test_scaling_benchmark_measures_every_probe_at_every_size():
+    args = scaling.parser().parse_args(["--sizes", "20,60", "--requests", "2", "--warmup", "0", "--chunk", "25"])
+    report = asyncio.run(scaling.run(args))
+    assert len(report["endpoints"]) == len(scaling.PROBES)
+    for endpoint in report["endpoints"].values():
+        assert len(endpoint["p50_ms"]) == 2 and endpoint["errors"] == 0
+        assert endpoint["slope"] is not None
@@ -1,3 +1,4 @@
+import json
 import uuid
 from datetime import datetime, timezone, timedelta
 
@@ -130,6 +131,24 @@ def test_change_status_to_inactive_when_assigned_is_conflict(client, auth_header
     assert err["error"]["code"] in ("VEHICLE_HAS_ACTIVE_ASSIGNMENTS", "CONFLICT")
 
 
+def test_stale_etag_is_a_concurrency_conflict_even_when_assigned(client, auth_headers):
+    """The If-Match precondition is checked before the active-assignment rule"""
+    r = client.post("/vehicles", json=make_vehicle_payload(plate="STALE1"), headers=auth_headers)
+    vid = r.json()["id"]
+    stale = client.get(f"/vehicles/{vid}", headers=auth_headers).headers["ETag"]
+    rd = client.post("/drivers", json={"name": "Jane Roe", "license_number": "LNSTALE1", "contact_number": "+15551234567"}, headers=auth_headers)
+    ra = client.post("/assignments", json={"driver_id": rd.json()["id"], "vehicle_id": vid, "start_datetime": datetime.now(timezone.utc).isoformat()}, headers=auth_headers)
+    assert ra.status_code == 201
+    assert client.patch(f"/vehicles/{vid}", json={"model": "Changed"}, headers={**auth_headers, "If-Match": stale}).status_code == 200
+
+    r_stale = client.patch(f"/vehicles/{vid}", json={"status": "INACTIVE"}, headers={**auth_headers, "If-Match": stale})
+    assert r_stale.status_code == 409
+    assert r_stale.json()["error"]["code"] == "CONCURRENCY_CONFLICT"
+    current = client.get(f"/vehicles/{vid}", headers=auth_headers).headers["ETag"]
+    r_current = client.patch(f"/vehicles/{vid}", json={"status": "INACTIVE"}, headers={**auth_headers, "If-Match": current})
+    assert r_current.json()["error"]["code"] == "VEHICLE_HAS_ACTIVE_ASSIGNMENTS"
+
+
 def test_delete_vehicle_only_when_not_assigned(client, auth_headers):
     """DELETE vehicle with active assignment -> 409; after closing assignment -> 204"""
     payload = make_vehicle_payload(plate="DELTEST")
@@ -183,3 +202,174 @@ def test_list_vehicles_pagination(client, auth_headers):
     assert r_list.status_code == 200
     body = r_list.json()
     assert "pagination" in body and "total" in body["pagination"] and "has_more" in body["pagination"]
+
+
+def test_list_vehicles_filters_by_status_and_hides_deleted(client, auth_headers):
+    """GET /vehicles applies status filter and excludes soft-deleted vehicles by default"""
+    ids = []
+    for i, status in enumerate(("ACTIVE", "MAINTENANCE", "ACTIVE")):
+        payload = {**make_vehicle_payload(plate=f"FS{i}"), "status": status}
+        r = client.post("/vehicles", json=payload, headers=auth_headers)
+        assert r.status_code == 201
+        ids.append(r.json()["id"])
+
+    etag = client.get(f"/vehicles/{ids[2]}", headers=auth_headers).headers.get("ETag")
+    rdel = client.delete(f"/vehicles/{ids[2]}", headers={**auth_headers, "If-Match": etag})
+    assert rdel.status_code == 204
+
+    body = client.get("/vehicles?status=ACTIVE", headers=auth_headers).json()
+    assert [v["id"] for v in body["data"]] == [ids[0]]
+    assert body["pagination"]["total"] == 1
+
+    body = client.get("/vehicles?status=ACTIVE&include_deleted=true", headers=auth_headers).json()
+    assert [v["id"] for v in body["data"]] == [ids[0], ids[2]]
+    assert body["pagination"]["has_more"] is False
+
+
+def test_weak_if_match_is_a_concurrency_conflict(client, auth_headers):
+    """If-Match uses strong comparison: a weak copy of the current ETag -> 409 CONCURRENCY_CONFLICT"""
+    r = client.post("/vehicles", json=make_vehicle_payload(plate="WEAK1"), headers=auth_headers)
+    vid = r.json()["id"]
+    weak = "W/" + client.get(f"/vehicles/{vid}", headers=auth_headers).headers["ETag"]
+
+    for payload in ({"model": "Changed"}, {"status": "INACTIVE"}):
+        r_weak = client.patch(f"/vehicles/{vid}", json=payload, headers={**auth_headers, "If-Match": weak})
+        assert r_weak.status_code == 409
+        assert r_weak.json()["error"]["code"] == "CONCURRENCY_CONFLICT"
+    r_del = client.delete(f"/vehicles/{vid}", headers={**auth_headers, "If-Match": weak})
+    assert r_del.status_code == 409
+    assert r_del.json()["error"]["code"] == "CONCURRENCY_CONFLICT"
+    assert client.get(f"/vehicles/{vid}", headers=auth_headers).json()["model"] == make_vehicle_payload()["model"]
+
+
+def test_patch_vehicle_stale_etag_conflict(client, auth_headers):
+    """A second PATCH with the ETag read before the first one -> 409 CONCURRENCY_CONFLICT"""
+    r = client.post("/vehicles", json=make_vehicle_payload(plate="CAS1"), headers=auth_headers)
+    vid = r.json()["id"]
+    etag = client.get(f"/vehicles/{vid}", headers=auth_headers).headers.get("ETag")
+
+    r1 = client.patch(f"/vehicles/{vid}", json={"model": "First"}, headers={**auth_headers, "If-Match": etag})
+    assert r1.status_code == 200
+    r2 = client.patch(f"/vehicles/{vid}", json={"model": "Second"}, headers={**auth_headers, "If-Match": etag})
+    assert r2.status_code == 409
+    assert r2.json()["error"]["code"] == "CONCURRENCY_CONFLICT"
+
+    body = client.get(f"/vehicles/{vid}", headers=auth_headers).json()
+    assert body["model"] == "First"
+    assert body["plate_number"] == "CAS1"
+
+
+def test_list_vehicles_cursor_pagination_walks_all_pages(client, auth_headers):
+    """next_cursor from an offset page continues in keyset mode until has_more is false"""
+    created = []
+    for i in range(5):
+        r = client.post("/vehicles", json=make_vehicle_payload(plate=f"KS{i}"), headers=auth_headers)
+        created.append(r.json()["id"])
+
+    body = client.get("/vehicles?limit=2", headers=auth_headers).json()
+    seen = [v["id"] for v in body["data"]]
+    while body["pagination"]["has_more"]:
+        cursor = body["pagination"]["next_cursor"]
+        body = client.get(f"/vehicles?limit=2&cursor={cursor}", headers=auth_headers).json()
+        assert body["pagination"]["total"] is None
+        seen += [v["id"] for v in body["data"]]
+    # every vehicle exactly once (ties on created_at are ordered by id)
+    assert sorted(seen) == sorted(created)
+    assert body["pagination"]["next_cursor"] is None
+
+    r_bad = client.get("/vehicles?cursor=not-a-cursor", headers=auth_headers)
+    assert r_bad.status_code == 422
+    assert "cursor" in r_bad.json()["error"]["details"]
+
+
+def test_create_vehicles_batch_reports_per_item_results(client, auth_headers):
+    """POST /vehicles:batch - valid items are created, duplicates and invalid items fail individually"""
+    client.post("/vehicles", json=make_vehicle_payload(plate="BAT0"), headers=auth_headers)
+    items = [make_vehicle_payload(plate="BAT1"), make_vehicle_payload(plate="bat0"), make_vehicle_payload(plate="BAD PLATE"), make_vehicle_payload(plate="BAT1"), make_vehicle_payload(plate="BAT2")]
+    r = client.post("/vehicles:batch", json={"items": items}, headers=auth_headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["summary"] == {"total": 5, "created": 2, "failed": 3}
+    results = body["data"]
+    assert [res["index"] for res in results] == [0, 1, 2, 3, 4]
+    assert [res["success"] for res in results] == [True, False, False, False, True]
+    assert results[1]["error"]["code"] == "DUPLICATE_PLATE" and results[1]["status"] == 409
+    assert results[2]["error"]["code"] == "VALIDATION_ERROR" and "plate_number" in results[2]["error"]["details"]
+    assert results[3]["error"]["code"] == "DUPLICATE_PLATE"
+    r = client.get(f"/vehicles/{results[4]['id']}", headers=auth_headers)
+    assert r.json()["plate_number"] == "BAT2"
+
+    assert client.post("/vehicles:batch", json={"items": []}, headers=auth_headers).status_code == 422
+
+
+def test_list_vehicles_streams_json_and_ndjson(client, auth_headers, monkeypatch):
+    """GET /vehicles?stream=true returns every match; Accept: application/x-ndjson returns one vehicle per line"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "STREAM_BATCH_SIZE", 2)
+    items = [make_vehicle_payload(plate=f"STR{i}") for i in range(5)]
+    created = client.post("/vehicles:batch", json={"items": items}, headers=auth_headers).json()["data"]
+    ids = sorted(res["id"] for res in created)
+
+    r = client.get("/vehicles?stream=true&limit=1", headers=auth_headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["success"] is True and "pagination" not in body
+    assert sorted(v["id"] for v in body["data"]) == ids
+    assert all(v["created_at"].endswith("Z") or "+" in v["created_at"] for v in body["data"])
+
+    r = client.get("/vehicles", headers={**auth_headers, "Accept": "application/x-ndjson"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(v["id"] for v in lines) == ids
+    assert all("_id" not in v for v in lines)
+
+
+def test_vehicle_sparse_fieldsets(client, auth_headers):
+    """fields= limits GET and list responses to the requested fields plus id"""
+    vid = client.post("/vehicles", json=make_vehicle_payload(plate="FLD1"), headers=auth_headers).json()["id"]
+    client.post("/vehicles", json=make_vehicle_payload(plate="FLD2"), headers=auth_headers)
+
+    r = client.get(f"/vehicles/{vid}?fields=plate_number,status", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.json() == {"id": vid, "plate_number": "FLD1", "status": "ACTIVE"}
+    assert r.headers.get("ETag")
+
+    r = client.get("/vehicles?fields=plate_number&limit=1&skip=0", headers=auth_headers)
+    first = r.json()["data"][0]
+    assert set(first) == {"id", "plate_number"}
+    next_cursor = client.get("/vehicles?limit=1", headers=auth_headers).json()["pagination"]["next_cursor"]
+    page = client.get(f"/vehicles?fields=status&limit=1&cursor={next_cursor}", headers=auth_headers).json()
+    assert set(page["data"][0]) == {"id", "status"}
+
+    r = client.get(f"/vehicles/{vid}?fields=plate_number,_id", headers=auth_headers)
+    assert r.status_code == 422
+    assert r.json()["error"]["details"]["fields"][0]["code"] == "INVALID_FIELD"
+
+
+def test_conditional_get_vehicle_and_list(client, auth_headers):
+    """If-None-Match answers 304 until the vehicle (or, for lists, the collection) changes"""
+    r = client.post("/vehicles", json=make_vehicle_payload(plate="cg100"), headers=auth_headers)
+    vid = r.json()["id"]
+
+    g = client.get(f"/vehicles/{vid}", headers=auth_headers)
+    etag = g.headers["ETag"]
+    not_modified = client.get(f"/vehicles/{vid}", headers={**auth_headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    listed = client.get("/vehicles", headers=auth_headers)
+    list_etag = listed.headers["ETag"]
+    assert list_etag.startswith('W/"')
+    assert "Last-Modified" in listed.headers
+    assert client.get("/vehicles", headers={**auth_headers, "If-None-Match": list_etag}).status_code == 304
+    assert client.get("/vehicles", headers={**auth_headers, "If-Modified-Since": listed.headers["Last-Modified"]}).status_code == 304
+
+    patched = client.patch(f"/vehicles/{vid}", json={"model": "Changed"}, headers={**auth_headers, "If-Match": etag})
+    assert patched.status_code == 200
+    g2 = client.get(f"/vehicles/{vid}", headers={**auth_headers, "If-None-Match": etag})
+    assert g2.status_code == 200
+    assert g2.json()["model"] == "Changed"
+    l2 = client.get("/vehicles", headers={**auth_headers, "If-None-Match": list_etag})
+    assert l2.status_code == 200
+    assert l2.headers["ETag"] != list_etag
@@ -1,6 +1,6 @@
 import pytest
 from pymongo import MongoClient
-from app.storage.mongo import MongoStorage
+from app.storage.mongo import MongoStorage, ensure_indexes
 from datetime import datetime, timezone
 from uuid import uuid4
 
@@ -197,3 +197,32 @@ def test_update_assignment(mongo_storage):
     
     updated = mongo_storage.update_assignment(assignment["id"], {"notes": "Test", "updated_at": datetime.now(timezone.utc)})
     assert updated["notes"] == "Test"
+
+
+def test_ensure_indexes_closes_duplicate_ongoing_assignments(test_db):
+    """Two ongoing assignments for one vehicle from before the unique index do not stop the index build"""
+    test_db.assignments.drop_indexes()
+    vid = str(uuid4())
+    older = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    newer = datetime(2024, 2, 1, tzinfo=timezone.utc)
+    for start in (older, newer):
+        # Written before the ongoing flag existed
+        test_db.assignments.insert_one({
+            "id": str(uuid4()),
+            "vehicle_id": vid,
+            "driver_id": str(uuid4()),
+            "start_datetime": start,
+            "end_datetime": None,
+            "created_at": start,
+            "updated_at": start,
+        })
+
+    ensure_indexes(test_db)
+
+    assert "vehicle_id_ongoing_unique" in test_db.assignments.index_information()
+    closed = test_db.assignments.find_one({"vehicle_id": vid, "start_datetime": older})
+    kept = test_db.assignments.find_one({"vehicle_id": vid, "start_datetime": newer})
+    assert closed["ongoing"] is False
+    assert closed["end_datetime"].replace(tzinfo=timezone.utc) == newer
+    assert kept["ongoing"] is True
+    assert kept["end_datetime"] is None
@@ -0,0 +1,58 @@
+"""Unit tests for the benchmark statistics and report comparison."""
+from benchmarks.compare import regressions
+from benchmarks.scaling import fit_slope, flagged, growth
+from benchmarks.stats import Recorder, percentile, summarize
+
+
+def test_percentile_is_nearest_rank():
+    ordered = [float(n) for n in range(1, 101)]
+    assert percentile(ordered, 50) == 50.0
+    assert percentile(ordered, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_reports_milliseconds_and_rate():
+    summary = summarize([0.001, 0.002, 0.003, 0.004], errors=1, seconds=2.0)
+    assert summary["requests"] == 4 and summary["errors"] == 1
+    assert summary["rps"] == 2.0
+    assert (summary["p50_ms"], summary["p99_ms"], summary["max_ms"]) == (2.0, 4.0, 4.0)
+
+
+def test_recorder_ignores_samples_while_not_recording():
+    recorder = Recorder()
+    recorder.recording = False
+    recorder.record("GET /vehicles", 0.5)
+    recorder.start()
+    recorder.record("GET /vehicles", 0.01)
+    recorder.record("GET /vehicles", 0.02, error=True)
+    recorder.stop()
+    report = recorder.report()
+    assert report["endpoints"]["GET /vehicles"]["requests"] == 2
+    assert report["total"]["errors"] == 1
+
+
+def test_regressions_flag_slower_or_failing_endpoints():
+    def report(p95, rps, errors=0):
+        summary = {"p95_ms": p95, "rps": rps, "errors": errors}
+        return {"endpoints": {"GET /vehicles": summary}, "total": summary}
+
+    assert not any(row["regressed"] for row in regressions(report(10.0, 100.0), report(10.5, 98.0)))
+    assert regressions(report(10.0, 100.0), report(12.0, 100.0))[0]["regressed"]
+    assert regressions(report(10.0, 100.0), report(10.0, 80.0))[0]["regressed"]
+    assert regressions(report(10.0, 100.0), report(10.0, 100.0, errors=3))[0]["regressed"]
+
+
+def test_fit_slope_recovers_the_growth_exponent():
+    sizes = [1_000, 10_000, 100_000]
+    assert fit_slope(sizes, [2.0, 2.0, 2.0]) == 0
+    assert round(fit_slope(sizes, [1.0, 10.0, 100.0]), 6) == 1
+    assert fit_slope(sizes, [1.0, None, None]) is None
+
+
+def test_only_probes_growing_past_their_expected_complexity_are_flagged():
+    assert growth(0.02) == "flat" and growth(0.9) == "linear" and growth(1.8) == "superlinear"
+    assert flagged("constant", 0.6, max_slope=0.25)
+    assert not flagged("logarithmic", 0.1, max_slope=0.25)
+    assert not flagged("linear", 0.95, max_slope=0.25)
+    assert flagged("linear", 1.6, max_slope=0.25)
@@ -0,0 +1,48 @@
+"""Unit tests for the python -m app entry point."""
+from app.__main__ import main, server_options
+
+
+def test_server_options_come_from_settings(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "mongo")
+    monkeypatch.setattr(settings, "WEB_WORKERS", 4)
+    monkeypatch.setattr(settings, "MAX_REQUESTS", 0)
+    monkeypatch.setattr(settings, "GRACEFUL_TIMEOUT", 15)
+    options = server_options(port=9000)
+    assert (options["workers"], options["port"]) == (4, 9000)
+    assert options["limit_max_requests"] is None
+    assert options["timeout_graceful_shutdown"] == 15
+    assert options["loop"] in ("uvloop", "asyncio") and options["http"] in ("httptools", "h11")
+
+
+def test_memory_backend_runs_one_worker_without_recycling(monkeypatch, caplog):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "MAX_REQUESTS", 1000)
+    with caplog.at_level("WARNING", logger="app.cli"):
+        options = server_options(workers=4)
+    assert options["workers"] == 1
+    assert options["limit_max_requests"] is None
+    assert "ignoring --workers 4" in caplog.text
+
+
+def test_server_options_skip_jitter_on_older_uvicorn(monkeypatch):
+    import app.__main__ as cli
+
+    monkeypatch.setattr(cli, "_accepts", lambda option: False)
+    assert "limit_max_requests_jitter" not in server_options()
+    monkeypatch.setattr(cli, "_accepts", lambda option: True)
+    assert "limit_max_requests_jitter" in server_options()
+
+
+def test_serve_runs_uvicorn_with_the_app(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "mongo")
+    calls = []
+    monkeypatch.setattr("uvicorn.run", lambda app, **options: calls.append((app, options)))
+    main(["serve", "--workers", "2"])
+    assert calls[0][0] == "app.main:app"
+    assert calls[0][1]["workers"] == 2
@@ -0,0 +1,107 @@
+"""Unit tests for the entity read-through cache."""
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from app.storage.cache import EntityCache, doc_size
+from app.storage.mongo import MongoStorage
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entity_cache_returns_copies_projected_to_fields():
+    cache = EntityCache(ttl=5)
+    cache.put("vehicles", "v1", {"id": "v1", "status": "ACTIVE", "model": "M"}, cache.generation("vehicles"))
+    doc = cache.get("vehicles", "v1")
+    doc["status"] = "INACTIVE"
+    assert cache.get("vehicles", "v1")["status"] == "ACTIVE"
+    assert cache.get("vehicles", "v1", ["id", "status", "missing"]) == {"id": "v1", "status": "ACTIVE"}
+    assert cache.get("vehicles", "v2") is None
+    snap = cache.snapshot()
+    assert (snap["hits"], snap["misses"]) == (3, 1)
+    assert snap["collections"]["vehicles"] == {"hits": 3, "misses": 1}
+
+
+def test_entity_cache_evicts_least_recently_used_by_count_and_bytes():
+    cache = EntityCache(max_entries=2, ttl=5)
+    for id_ in ("a", "b"):
+        cache.put("drivers", id_, {"id": id_}, 0)
+    cache.get("drivers", "a")
+    cache.put("drivers", "c", {"id": "c"}, 0)
+    assert cache.get("drivers", "b") is None and cache.get("drivers", "a") is not None
+    size = doc_size({"id": "a"})
+    by_bytes = EntityCache(max_bytes=size * 2, ttl=5)
+    for id_ in ("a", "b", "c"):
+        by_bytes.put("drivers", id_, {"id": id_}, 0)
+    snap = by_bytes.snapshot()
+    assert snap["entries"] == 2 and snap["bytes"] <= size * 2 and snap["evictions"] == 1
+
+
+def test_entity_cache_entries_expire_after_ttl():
+    clock = Clock()
+    cache = EntityCache(ttl=5, clock=clock)
+    cache.put("assignments", "a1", {"id": "a1"}, 0)
+    clock.now = 4.9
+    assert cache.get("assignments", "a1") is not None
+    clock.now = 5.0
+    assert cache.get("assignments", "a1") is None
+    assert cache.snapshot()["expirations"] == 1
+
+
+def test_entity_cache_rejects_fill_that_raced_a_write():
+    cache = EntityCache(ttl=5)
+    generation = cache.generation("vehicles")
+    cache.invalidate("vehicles", ["v1"])
+    cache.put("vehicles", "v1", {"id": "v1"}, generation)
+    assert cache.get("vehicles", "v1") is None
+    assert cache.snapshot()["stale_fills"] == 1
+
+
+def test_entity_cache_is_off_by_default():
+    cache = EntityCache()
+    cache.put("vehicles", "v1", {"id": "v1"}, cache.generation("vehicles"))
+    assert not cache.enabled and cache.get("vehicles", "v1") is None
+
+
+def test_mongo_storage_reads_through_cache_and_invalidates_on_write():
+    mock_db = MagicMock()
+    mock_db.vehicles.name = "vehicles"
+    updated = datetime(2026, 2, 3, tzinfo=timezone.utc)
+    mock_db.vehicles.find_one.return_value = {"id": "v1", "status": "ACTIVE", "deleted": False, "updated_at": updated}
+    storage = MongoStorage(mock_db, cache=EntityCache(ttl=5))
+
+    assert storage.get_vehicle("v1", ["status"]) == {"status": "ACTIVE"}
+    assert storage.get_vehicle("v1")["id"] == "v1"
+    mock_db.vehicles.find_one.assert_called_once_with({"id": "v1"}, {"_id": 0, "ongoing": 0})
+
+    mock_db.vehicles.find_one_and_update.return_value = {"id": "v1", "status": "INACTIVE"}
+    storage.update_vehicle("v1", {"status": "INACTIVE"})
+    mock_db.vehicles.find_one.return_value = {"id": "v1", "status": "INACTIVE", "deleted": False, "updated_at": updated}
+    assert storage.get_vehicle("v1")["status"] == "INACTIVE"
+    storage.soft_delete_vehicle("v1")
+    storage.get_vehicle("v1")
+    assert mock_db.vehicles.find_one.call_count == 3
+
+
+def test_version_lookups_and_fresh_reads_bypass_the_cache():
+    """A 304 or a write decision must not rest on a copy another worker's write may have replaced."""
+    mock_db = MagicMock()
+    mock_db.vehicles.name = "vehicles"
+    mock_db.assignments.name = "assignments"
+    cache = EntityCache(ttl=5)
+    cache.put("vehicles", "v1", {"id": "v1", "deleted": False, "updated_at": datetime(2026, 1, 1, tzinfo=timezone.utc)}, 0)
+    cache.put("assignments", "a1", {"id": "a1", "end_datetime": None}, 0)
+    updated = datetime(2026, 2, 3, tzinfo=timezone.utc)
+    mock_db.vehicles.find.return_value.hint.return_value.limit.return_value.__iter__.return_value = iter([{"updated_at": updated}])
+    mock_db.assignments.find_one.return_value = {"id": "a1", "end_datetime": updated}
+    storage = MongoStorage(mock_db, cache=cache)
+
+    assert storage.get_vehicle_version("v1") == updated
+    assert storage.get_assignment("a1", fresh=True)["end_datetime"] == updated
+    assert storage.get_assignment("a1")["end_datetime"] is None
+    mock_db.assignments.find_one.assert_called_once_with({"id": "a1"}, {"_id": 0, "ongoing": 0})
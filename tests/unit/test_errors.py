@@ -1,7 +1,8 @@
 import pytest
 from fastapi import HTTPException
 from fastapi.exceptions import RequestValidationError
-from app.errors import http_exception_handler, validation_exception_handler
+from pymongo.errors import WaitQueueTimeoutError
+from app.errors import database_unavailable_handler, http_exception_handler, validation_exception_handler
 from starlette.requests import Request
 
 
@@ -46,3 +47,16 @@ async def test_validation_exception_handler_builds_details():
     body = _json.loads(resp.body)
     assert body["error"]["code"] == "VALIDATION_ERROR"
     assert "field" in body["error"]["details"]
+
+
+@pytest.mark.asyncio
+async def test_database_unavailable_handler_returns_503_with_retry_after():
+    scope = {"type": "http"}
+    request = Request(scope)
+    exc = WaitQueueTimeoutError("Timed out while checking out a connection from connection pool")
+    resp = await database_unavailable_handler(request, exc)
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+    import json as _json
+    body = _json.loads(resp.body)
+    assert body["error"]["code"] == "SERVICE_UNAVAILABLE"
@@ -0,0 +1,50 @@
+"""Unit tests for the Prometheus metrics registry and the Mongo command listener."""
+from types import SimpleNamespace
+
+from app.metrics import MONGO_LATENCY, REGISTRY, Counter, Histogram
+from app.storage.commands import CommandStats, command_target
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "Test.", ("route",), (0.1, 1.0))
+    h.observe(("/a",), 0.05)
+    h.observe(("/a",), 0.5)
+    h.observe(("/a",), 5)
+    lines = h.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 't_seconds_count{route="/a"} 3' in lines
+    assert 't_seconds_sum{route="/a"} 5.55' in lines
+
+
+def test_counter_escapes_label_values():
+    c = Counter("t_total", "Test.", ("route",))
+    c.inc(('say "hi"',))
+    assert 't_total{route="say \\"hi\\""} 1' in c.render()
+
+
+def test_snapshot_counters_render_with_counter_type():
+    text = REGISTRY.render()
+    assert "# TYPE entity_cache_hits_total counter" in text
+    assert "# TYPE entity_cache_misses_total counter" in text
+    assert "# TYPE entity_cache_entries gauge" in text
+
+
+def test_command_listener_labels_by_collection_and_command():
+    assert command_target("getMore", {"getMore": 42, "collection": "drivers"}) == "drivers"
+    assert command_target("find", {"find": "vehicles"}) == "vehicles"
+
+    stats = CommandStats()
+    stats.started(SimpleNamespace(request_id=7, command_name="find", command={"find": "unit_test_coll"}))
+    stats.succeeded(SimpleNamespace(request_id=7, duration_micros=1500))
+    assert any(line.startswith('mongo_command_duration_seconds_count{collection="unit_test_coll",command="find"} 1') for line in MONGO_LATENCY.render())
+
+
+def test_command_listener_skips_awaitdata_getmores():
+    stats = CommandStats()
+    stats.started(SimpleNamespace(request_id=8, command_name="getMore", command={"getMore": 1, "collection": "unit_await_coll", "maxTimeMS": 500}))
+    stats.succeeded(SimpleNamespace(request_id=8, duration_micros=500000, reply={}))
+    stats.started(SimpleNamespace(request_id=9, command_name="getMore", command={"getMore": 1, "collection": "unit_await_coll"}))
+    stats.succeeded(SimpleNamespace(request_id=9, duration_micros=1000, reply={}))
+    assert any(line.startswith('mongo_command_duration_seconds_count{collection="unit_await_coll",command="getMore"} 1') for line in MONGO_LATENCY.render())
@@ -0,0 +1,60 @@
+"""Unit tests for Mongo client options and pool monitoring."""
+from types import SimpleNamespace
+
+from app.storage.commands import COMMAND_STATS
+from app.storage.pool import POOL_STATS, PoolStats, client_options
+
+
+def event(address=("db", 27017), **fields):
+    return SimpleNamespace(address=address, connection_id=1, **fields)
+
+
+def test_pool_stats_tracks_connections_and_wait_times():
+    stats = PoolStats()
+    stats.pool_created(event())
+    for _ in range(3):
+        stats.connection_created(event())
+    stats.connection_check_out_started(event())
+    stats.connection_checked_out(event(duration=0.003))
+    stats.connection_check_out_started(event())
+    stats.connection_check_out_started(event())
+    stats.connection_check_out_failed(event(duration=2.0, reason="timeout"))
+    stats.connection_closed(event())
+
+    snap = stats.snapshot()
+    assert snap["pools"] == ["db:27017"]
+    assert (snap["open"], snap["checked_out"], snap["waiting"]) == (2, 1, 1)
+    assert snap["checkout_failed"] == {"timeout": 1}
+    assert snap["wait_time_ms"]["count"] == 2
+    counts = {b["le_ms"]: b["count"] for b in snap["wait_time_ms"]["buckets"]}
+    assert counts[5] == 1 and counts[2500] == 1
+
+
+def test_pool_stats_is_warm_when_every_server_has_min_pool_size():
+    stats = PoolStats()
+    primary, secondary = ("db1", 27017), ("db2", 27017)
+    stats.pool_created(event(primary))
+    stats.pool_created(event(secondary))
+    for _ in range(3):
+        stats.connection_created(event(primary))
+    stats.connection_created(event(secondary))
+    # minPoolSize is per server: four open in total is not enough for two
+    assert stats.open == 4
+    assert not stats.warm(2)
+    stats.connection_created(event(secondary))
+    assert stats.warm(2)
+
+
+def test_client_options_come_from_settings(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "MONGO_MAX_POOL_SIZE", 50)
+    monkeypatch.setattr(settings, "MONGO_SOCKET_TIMEOUT_MS", 0)
+    monkeypatch.setattr(settings, "MONGO_COMPRESSORS", "zlib")
+    monkeypatch.setattr(settings, "MONGO_WRITE_CONCERN", "1")
+    options = client_options()
+    assert options["maxPoolSize"] == 50
+    assert options["socketTimeoutMS"] is None
+    assert options["compressors"] == "zlib"
+    assert options["w"] == 1
+    assert options["event_listeners"] == [POOL_STATS, COMMAND_STATS]
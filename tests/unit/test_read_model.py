@@ -0,0 +1,216 @@
+"""Unit tests for the change-stream read model."""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from app.storage.mongo import MongoStorage
+from app.storage.read_model import UNKNOWN, ReadModel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Stream:
+    def __init__(self, number):
+        self.events = []
+        self.resume_token = {"_data": f"stream-{number}"}
+        self.closed = False
+
+    def try_next(self):
+        event = self.events.pop(0) if self.events else None
+        if isinstance(event, Exception):
+            raise event
+        return event
+
+    def close(self):
+        self.closed = True
+
+
+class Database:
+    """Collections as lists of documents and a recorded watch() per stream opened."""
+
+    def __init__(self, vehicles=(), drivers=()):
+        self.collections = {"vehicles": list(vehicles), "drivers": list(drivers)}
+        self.streams = []
+        self.resumed_from = []
+
+    def watch(self, pipeline, full_document=None, resume_after=None, max_await_time_ms=None):
+        self.resumed_from.append(resume_after)
+        self.streams.append(Stream(len(self.streams)))
+        return self.streams[-1]
+
+    def __getitem__(self, name):
+        collection = MagicMock()
+        collection.find.return_value = [dict(doc) for doc in self.collections[name]]
+        return collection
+
+
+def vehicle(id_, plate, deleted=False, oid=None):
+    return {"_id": oid or f"oid-{id_}", "id": id_, "plate_number": plate, "status": "ACTIVE", "deleted": deleted, "updated_at": f"t-{id_}"}
+
+
+def change(op, coll, doc=None, oid=None):
+    event = {"operationType": op, "ns": {"db": "fleet", "coll": coll}, "documentKey": {"_id": oid or (doc or {}).get("_id")}}
+    if doc is not None:
+        event["fullDocument"] = doc
+    return event
+
+
+def started(db, **options):
+    model = ReadModel(clock=Clock(), **options)
+    assert model.start(db, background=False)
+    return model
+
+
+def test_read_model_loads_collections_with_id_and_key_indexes():
+    db = Database([vehicle("v1", "AAA1"), vehicle("v2", "BBB2", deleted=True)], [{"_id": "x", "id": "d1", "license_number": "L1", "deleted": False}])
+    model = started(db)
+    assert model.get("vehicles", "v1") == {"id": "v1", "plate_number": "AAA1", "status": "ACTIVE", "deleted": False, "updated_at": "t-v1"}
+    assert model.get("vehicles", "v1", ["status"]) == {"status": "ACTIVE"}
+    assert model.get("vehicles", "v2")["deleted"] is True
+    assert model.get("vehicles", "missing") is None
+    assert model.find("vehicles", "AAA1")["id"] == "v1"
+    assert model.find("vehicles", "BBB2") is None
+    assert model.find("drivers", "L1")["id"] == "d1"
+    assert model.get("assignments", "a1") is UNKNOWN
+
+
+def test_read_model_applies_inserts_updates_and_deletes():
+    db = Database([vehicle("v1", "AAA1")])
+    model = started(db)
+    stream = db.streams[-1]
+    stream.events += [
+        change("insert", "vehicles", vehicle("v2", "CCC3")),
+        change("update", "vehicles", vehicle("v1", "DDD4")),
+        change("delete", "vehicles", oid="oid-v2"),
+    ]
+    for _ in range(3):
+        model.poll()
+    assert model.find("vehicles", "AAA1") is None
+    assert model.find("vehicles", "DDD4")["id"] == "v1"
+    assert model.get("vehicles", "v2") is None
+    assert model.snapshot()["events"] == 3
+
+
+def test_read_model_defers_own_writes_to_the_database_until_their_event_arrives():
+    db = Database([vehicle("v1", "AAA1")])
+    model = started(db, max_staleness_ms=1000)
+    model.invalidate("vehicles", ["v1"])
+    assert model.get("vehicles", "v1") is UNKNOWN
+    assert model.find("vehicles", "AAA1") is UNKNOWN
+    db.streams[-1].events.append(change("update", "vehicles", vehicle("v1", "AAA1")))
+    model.poll()
+    assert model.get("vehicles", "v1")["id"] == "v1"
+    # A no-op write produces no event; it stops being pending once the stream is past it
+    model.invalidate("vehicles", ["v1"])
+    model.clock.now += 2
+    model.poll()
+    assert model.get("vehicles", "v1") is not UNKNOWN
+
+
+def test_read_model_falls_back_when_stale():
+    model = started(Database([vehicle("v1", "AAA1")]), max_staleness_ms=500)
+    model.clock.now += 0.6
+    assert model.get("vehicles", "v1") is UNKNOWN
+    snap = model.snapshot()
+    assert snap["fresh"] is False and snap["staleness_ms"] == 600.0 and snap["fallbacks"] == 1
+    model.poll()
+    assert model.get("vehicles", "v1") is not UNKNOWN
+
+
+def test_read_model_is_stale_while_working_through_a_backlog():
+    db = Database([vehicle("v1", "P0")])
+    model = started(db, max_staleness_ms=2000)
+    model.clock.now += 20
+    changed_at = datetime.fromtimestamp(model.clock.now - 10, timezone.utc)
+    for n in range(1, 1001):
+        db.streams[-1].events.append({**change("update", "vehicles", vehicle("v1", f"P{n}")), "wallTime": changed_at})
+    model.poll()
+    snap = model.snapshot()
+    assert snap["fresh"] is False and snap["staleness_ms"] == 10000.0 and snap["last_event_lag_ms"] == 10000.0
+    assert model.find("vehicles", "P1") is UNKNOWN
+    for _ in range(999):
+        model.poll()
+    assert model.get("vehicles", "v1") is UNKNOWN
+    model.poll()
+    assert model.fresh() and model.find("vehicles", "P1000")["id"] == "v1"
+
+
+def test_read_model_measures_staleness_from_cluster_time():
+    model = started(Database([vehicle("v1", "P0")]), max_staleness_ms=2000)
+    model.clock.now += 5
+    db_event = {**change("update", "vehicles", vehicle("v1", "P1")), "clusterTime": SimpleNamespace(time=int(model.clock.now - 1))}
+    model._stream.events.append(db_event)
+    model.poll()
+    assert model.staleness_ms() == 1000.0 and model.fresh()
+
+
+def test_read_model_resumes_after_errors_and_resyncs_on_gaps():
+    db = Database([vehicle("v1", "AAA1")])
+    model = started(db)
+    db.streams[-1].events.append(AutoReconnect("connection reset"))
+    try:
+        model.poll()
+    except AutoReconnect as e:
+        model._failed(e)
+    model.poll()
+    assert db.resumed_from[-1] == {"_data": "stream-0"}
+    assert model.snapshot()["resyncs"] == 1
+
+    db.collections["vehicles"].append(vehicle("v9", "ZZZ9"))
+    db.streams[-1].events.append(OperationFailure("history lost", code=286))
+    try:
+        model.poll()
+    except OperationFailure as e:
+        model._failed(e)
+    model.poll()
+    assert db.resumed_from[-1] is None and model.snapshot()["resyncs"] == 2
+    assert model.get("vehicles", "v9")["plate_number"] == "ZZZ9"
+
+    db.streams[-1].events.append({"operationType": "drop", "ns": {"db": "fleet", "coll": "vehicles"}})
+    model.poll()
+    assert model.snapshot()["resyncs"] == 3
+
+
+def test_read_model_is_disabled_without_change_stream_support():
+    db = MagicMock()
+    db.watch.side_effect = OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+    model = ReadModel()
+    assert model.start(db, background=False) is False
+    assert model.enabled is False and model.get("vehicles", "v1") is UNKNOWN
+
+
+def test_mongo_storage_answers_vehicle_lookups_from_read_model():
+    model = started(Database([vehicle("v1", "AAA1")]))
+    mock_db = MagicMock()
+    mock_db.vehicles.name = "vehicles"
+    storage = MongoStorage(mock_db, read_model=model)
+    assert storage.get_vehicle("v1")["plate_number"] == "AAA1"
+    assert storage.find_vehicle_by_plate("AAA1")["id"] == "v1"
+    assert storage.get_vehicle_version("v1") == "t-v1"
+    mock_db.vehicles.find_one.assert_not_called()
+    mock_db.vehicles.find.assert_not_called()
+
+    storage.soft_delete_vehicle("v1")
+    mock_db.vehicles.find_one.return_value = {"id": "v1", "deleted": True}
+    assert storage.get_vehicle("v1")["deleted"] is True
+    mock_db.vehicles.find_one.assert_called_once()
+
+
+def test_read_model_metrics_export_resyncs_and_fallbacks_as_counters(monkeypatch):
+    from app import metrics
+    from app.storage import read_model
+
+    monkeypatch.setattr(read_model, "READ_MODEL", started(Database()))
+    text = metrics.REGISTRY.render()
+    assert "# TYPE read_model_resyncs_total counter" in text
+    assert "# TYPE read_model_fallbacks_total counter" in text
+    assert "# TYPE read_model_staleness_seconds gauge" in text
+    assert "# TYPE read_model_event_lag_seconds gauge" in text
@@ -0,0 +1,89 @@
+"""Unit tests for the synthetic data generator."""
+from collections import defaultdict
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.seed import CHUNK_SIZE, Plan, seed
+
+AS_OF = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def generate_all(plan: Plan):
+    docs = defaultdict(list)
+    for collection, first, count in plan.chunks():
+        docs[collection] += plan.generate(collection, first, count)
+    return docs
+
+
+def test_output_depends_only_on_seed_and_as_of():
+    plan = Plan(7, 300, 200, 900, AS_OF)
+    assert plan.generate("assignments", 0, 50) == Plan(7, 300, 200, 900, AS_OF).generate("assignments", 0, 50)
+    assert plan.generate("vehicles", 0, 10) != Plan(8, 300, 200, 900, AS_OF).generate("vehicles", 0, 10)
+
+
+def test_chunks_cover_every_document_once():
+    plan = Plan(1, CHUNK_SIZE + 5, 3, 0, AS_OF)
+    chunks = list(plan.chunks())
+    assert [(collection, first) for collection, first, _ in chunks] == [("vehicles", 0), ("vehicles", CHUNK_SIZE), ("drivers", 0)]
+    assert sum(count for _, _, count in chunks) == CHUNK_SIZE + 8
+
+
+def test_keys_are_unique():
+    docs = generate_all(Plan(3, 2000, 1500, 0, AS_OF))
+    assert len({v["plate_number"] for v in docs["vehicles"]}) == 2000
+    assert len({v["id"] for v in docs["vehicles"]}) == 2000
+    assert len({d["license_number"] for d in docs["drivers"]}) == 1500
+    assert all(v["plate_number"].isalnum() and len(v["plate_number"]) <= 10 for v in docs["vehicles"])
+
+
+def test_assignment_histories_do_not_overlap_and_respect_statuses():
+    plan = Plan(5, 120, 80, 1000, AS_OF)
+    docs = generate_all(plan)
+    vehicles = {v["id"]: v for v in docs["vehicles"]}
+    drivers = {d["id"]: d for d in docs["drivers"]}
+    assert len(docs["assignments"]) == 1000
+    for field, owners in (("vehicle_id", vehicles), ("driver_id", drivers)):
+        history = defaultdict(list)
+        for assignment in docs["assignments"]:
+            assert assignment[field] in owners
+            history[assignment[field]].append(assignment)
+        for assignments in history.values():
+            assignments.sort(key=lambda a: a["start_datetime"])
+            for earlier, later in zip(assignments, assignments[1:]):
+                assert earlier["end_datetime"] is not None and earlier["end_datetime"] <= later["start_datetime"]
+    ongoing = [a for a in docs["assignments"] if a["end_datetime"] is None]
+    assert ongoing and all(a["ongoing"] for a in ongoing)
+    for assignment in ongoing:
+        vehicle, driver = vehicles[assignment["vehicle_id"]], drivers[assignment["driver_id"]]
+        assert vehicle["status"] == "ACTIVE" and driver["status"] == "ACTIVE"
+        assert not vehicle["deleted"] and not driver["deleted"]
+    assert all(a["start_datetime"] <= AS_OF for a in docs["assignments"])
+
+
+def test_seed_defers_indexes_on_empty_collections():
+    db = MagicMock()
+    collection = db.__getitem__.return_value
+    collection.estimated_document_count.return_value = 0
+    collection.index_information.return_value = {}
+    collection.insert_many.side_effect = lambda docs, ordered: MagicMock(inserted_ids=[d["id"] for d in docs])
+    report = seed(db, Plan(1, 30, 20, 40, AS_OF), workers=0, batch_size=25)
+    assert report["deferred_indexes"] is True
+    assert (report["vehicles"]["inserted"], report["drivers"]["inserted"], report["assignments"]["inserted"]) == (30, 20, 40)
+    assert all(call.kwargs == {"ordered": False} for call in collection.insert_many.call_args_list)
+    assert collection.drop_indexes.call_count == 3 and collection.create_index.called
+    # Indexes are built after the last insert
+    names = [name for name, _, _ in collection.method_calls]
+    assert names.index("create_index") > max(i for i, name in enumerate(names) if name == "insert_many")
+
+
+def test_seed_rebuilds_deferred_indexes_when_the_load_fails():
+    db = MagicMock()
+    collection = db.__getitem__.return_value
+    collection.estimated_document_count.return_value = 0
+    collection.index_information.return_value = {}
+    collection.insert_many.side_effect = KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        seed(db, Plan(1, 30, 20, 40, AS_OF), workers=0, batch_size=25)
+    assert collection.drop_indexes.call_count == 3 and collection.create_index.called
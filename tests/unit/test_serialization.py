@@ -0,0 +1,55 @@
+"""Unit tests for the per-entity response encoders."""
+import json
+from datetime import datetime, timezone
+
+from app.routers.fields import VEHICLE_FIELDS, fields_param
+from app.serialization import ASSIGNMENT, MAX_SHAPES, VEHICLE, EntityEncoder, render_one
+from app.utils import serialize_datetime
+
+
+def make_assignment_doc(**overrides):
+    now = datetime(2026, 2, 3, 4, 5, 6, 789000)
+    doc = {"id": "a1", "driver_id": "d1", "vehicle_id": "v1", "start_datetime": now, "end_datetime": None,
+           "notes": "Línea \"A\"", "created_at": now, "updated_at": now.replace(tzinfo=timezone.utc)}
+    doc.update(overrides)
+    return doc
+
+
+def test_assignment_encoder_matches_generic_serialization():
+    doc = make_assignment_doc()
+    expected = {k: serialize_datetime(v) if isinstance(v, datetime) else v for k, v in doc.items()}
+    assert json.loads(ASSIGNMENT.encode(doc)) == expected
+    assert "Línea" in ASSIGNMENT.encode(doc)
+
+
+def test_encoder_compiles_once_per_shape_and_handles_sparse_docs():
+    full = {"id": "v1", "plate_number": "AB1", "model": "X", "year": 2020, "type": "SEDAN", "fuel_type": "GASOLINE", "status": "ACTIVE",
+            "created_at": datetime(2026, 1, 1), "updated_at": datetime(2026, 1, 1), "deleted": False}
+    VEHICLE.encode(full)
+    VEHICLE.encode(dict(full, id="v2"))
+    assert VEHICLE._compiled.get(tuple(full)) is not None
+    sparse = json.loads(VEHICLE.encode_many([{"id": "v1", "status": "ACTIVE"}, {"id": "v2", "status": None}]))
+    assert sparse == [{"id": "v1", "status": "ACTIVE"}, {"id": "v2", "status": None}]
+    # values of an unexpected type fall back to the generic encoder
+    assert json.loads(VEHICLE.encode({"id": "v1", "year": "2020", "extra": [1]})) == {"id": "v1", "year": "2020", "extra": [1]}
+
+
+def test_encoder_compiles_a_bounded_number_of_shapes():
+    encoder = EntityEncoder("bounded", {"id": "str", "n": "int"})
+    for i in range(MAX_SHAPES + 10):
+        doc = {"id": "x", f"f{i}": i}
+        assert json.loads(encoder.encode(doc)) == doc
+    assert len(encoder._compiled) == MAX_SHAPES
+
+
+def test_fields_param_orders_fields_canonically():
+    assert fields_param("status,plate_number", VEHICLE_FIELDS) == ["id", "plate_number", "status"]
+    assert fields_param("plate_number,id,status", VEHICLE_FIELDS) == fields_param("status,plate_number", VEHICLE_FIELDS)
+
+
+def test_render_one_sets_status_and_headers():
+    response = render_one(ASSIGNMENT, make_assignment_doc(), status_code=201, headers={"ETag": '"x"'})
+    assert response.status_code == 201
+    assert response.headers["ETag"] == '"x"'
+    assert response.media_type == "application/json"
+    assert json.loads(response.body)["start_datetime"] == "2026-02-03T04:05:06.789000+00:00"
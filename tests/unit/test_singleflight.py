@@ -0,0 +1,125 @@
+"""Unit tests for single-flight coalescing of storage reads."""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.storage.adapter import StorageAdapter
+from app.storage.singleflight import AsyncSingleFlight, CoalescingStats, SingleFlight
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(flights, key, fn, count):
+    results, errors = [], []
+
+    def reader():
+        try:
+            results.append(flights.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_single_flight_shares_one_call_between_concurrent_readers():
+    stats = CoalescingStats()
+    flights = SingleFlight(stats)
+    release = threading.Event()
+    calls = []
+
+    def query():
+        calls.append(1)
+        release.wait()
+        return {"id": "v1"}
+
+    threads, results, _ = run_concurrently(flights, ("vehicles", "v1", "doc", None), query, 8)
+    wait_for(lambda: stats.snapshot()["reads"] == 8)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"id": "v1"}] * 8
+    assert len({id(result) for result in results}) == 8
+    snap = stats.snapshot()
+    assert (snap["executed"], snap["coalesced"], snap["coalescing_ratio"]) == (1, 7, 0.875)
+    assert snap["collections"]["vehicles"]["coalesced"] == 7
+
+
+def test_single_flight_raises_the_leaders_error_in_every_reader():
+    stats = CoalescingStats()
+    flights = SingleFlight(stats)
+    release = threading.Event()
+
+    def query():
+        release.wait()
+        raise ValueError("boom")
+
+    threads, results, errors = run_concurrently(flights, ("drivers", "d1", "doc", None), query, 4)
+    wait_for(lambda: stats.snapshot()["reads"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [] and len(errors) == 4 and all(str(e) == "boom" for e in errors)
+    # Failed flights are not remembered
+    assert flights.do(("drivers", "d1", "doc", None), lambda: {"id": "d1"}) == {"id": "d1"}
+
+
+def test_single_flight_forget_starts_a_new_flight_for_later_readers():
+    flights = SingleFlight(CoalescingStats())
+    release = threading.Event()
+    key = ("vehicles", "v1", "doc", None)
+    threads, results, _ = run_concurrently(flights, key, lambda: release.wait() and {"version": 1}, 1)
+    wait_for(lambda: key in flights._calls)
+    flights.forget("vehicles", ["v1"])
+    assert flights.do(key, lambda: {"version": 2}) == {"version": 2}
+    release.set()
+    threads[0].join()
+    assert results == [{"version": 1}]
+
+
+def test_async_single_flight_coalesces_and_survives_leader_cancellation():
+    stats = CoalescingStats()
+    flights = AsyncSingleFlight(stats)
+    calls = []
+
+    async def query():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "a1"}
+
+    async def scenario():
+        key = ("assignments", "a1", "doc", None)
+        leader = asyncio.ensure_future(flights.do(key, query))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flights.do(key, query)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(scenario()) == [{"id": "a1"}] * 3
+    assert len(calls) == 1
+    assert stats.snapshot()["coalesced"] == 3
+
+
+@pytest.mark.parametrize("write", [
+    lambda store: store.update_vehicle("v1", {"model": "M"}),
+    lambda store: store.update_vehicle_if_match("v1", None, {"model": "M"}),
+    lambda store: store.soft_delete_vehicle("v1"),
+    lambda store: store.add_vehicles_bulk([{"id": "v1"}]),
+])
+def test_storage_adapter_writes_end_running_flights(write):
+    flights = MagicMock()
+    store = StorageAdapter(MagicMock(), flights=flights)
+    write(store)
+    flights.forget.assert_called_once_with("vehicles", ["v1"])
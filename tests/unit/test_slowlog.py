@@ -0,0 +1,43 @@
+"""Unit tests for the slow query log."""
+from unittest.mock import MagicMock
+
+from app.storage.slowlog import SlowQueryLog, command_shape, summarize_explain
+
+COLLSCAN_EXPLAIN = {
+    "queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}},
+    "executionStats": {"nReturned": 2, "totalDocsExamined": 5000, "totalKeysExamined": 0, "executionTimeMillis": 140},
+}
+
+
+def test_command_shape_replaces_literals_and_keeps_sort():
+    command = {"find": "assignments", "filter": {"vehicle_id": "v1", "$or": [{"end_datetime": None}, {"end_datetime": {"$gte": 5}}]},
+               "sort": {"created_at": 1, "id": 1}, "limit": 50, "lsid": {"id": "x"}}
+    assert command_shape("find", command) == {
+        "filter": {"vehicle_id": "?", "$or": [{"end_datetime": "?"}, {"end_datetime": {"$gte": "?"}}]},
+        "sort": {"created_at": 1, "id": 1},
+    }
+
+
+def test_summarize_explain_flags_collection_scans():
+    plan = summarize_explain(COLLSCAN_EXPLAIN)
+    assert plan["collscan"] is True
+    assert plan["stages"] == ["SORT", "COLLSCAN"]
+    assert (plan["docs_examined"], plan["n_returned"]) == (5000, 2)
+
+
+def test_slow_queries_are_grouped_by_shape_and_explained():
+    db = MagicMock()
+    db.command.return_value = COLLSCAN_EXPLAIN
+    log = SlowQueryLog()
+    log.bind(db)
+    reply = {"cursor": {"firstBatch": [{}, {}]}}
+    for vid in ("v1", "v2"):
+        log.record("assignments", "find", {"find": "assignments", "filter": {"vehicle_id": vid}, "$db": "fleet_api"}, reply, 150.0)
+    log._jobs.join()
+
+    [entry] = log.summary()
+    assert (entry["count"], entry["total_ms"], entry["docs_returned"]) == (2, 300.0, 2)
+    assert entry["explain"]["collscan"] is True
+    explained = db.command.call_args[0][0]
+    assert explained["verbosity"] == "executionStats"
+    assert "$db" not in explained["explain"]
@@ -78,3 +78,233 @@ def test_mongo_storage_soft_delete():
     call_args = mock_db.vehicles.update_one.call_args
     assert call_args[0][0] == {"id": "v1"}
     assert call_args[0][1]["$set"]["deleted"] is True
+
+
+def test_mongo_storage_list_vehicles_pushes_down_filter_and_paging():
+    """Test that list_vehicles delegates filtering, sorting and paging to MongoDB."""
+    mock_db = MagicMock()
+    mock_db.vehicles.count_documents.return_value = 7
+    cursor = mock_db.vehicles.find.return_value
+    cursor.sort.return_value.skip.return_value.limit.return_value = [make_vehicle()]
+
+    storage = MongoStorage(mock_db)
+    items, total = storage.list_vehicles({"deleted": False, "status": "ACTIVE"}, limit=1, skip=2)
+
+    assert total == 7
+    assert len(items) == 1
+    mock_db.vehicles.find.assert_called_once_with({"deleted": False, "status": "ACTIVE"}, {"_id": 0, "ongoing": 0})
+    mock_db.vehicles.count_documents.assert_called_once_with({"deleted": False, "status": "ACTIVE"})
+    cursor.sort.return_value.skip.assert_called_once_with(2)
+    cursor.sort.return_value.skip.return_value.limit.assert_called_once_with(1)
+
+
+def test_mongo_storage_update_driver_maps_duplicate_license():
+    """Test that update_driver raises ValueError when the unique index rejects the write."""
+    from pymongo.errors import DuplicateKeyError
+
+    mock_db = MagicMock()
+    mock_db.drivers.find_one_and_update.side_effect = DuplicateKeyError("E11000")
+
+    storage = MongoStorage(mock_db)
+    try:
+        storage.update_driver("d1", {"license_number": "LIC1"})
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "Duplicate" in str(e)
+
+
+def test_ensure_indexes_replaces_legacy_unique_index():
+    """Test that the legacy sparse plate index is swapped for a partial unique index."""
+    from app.storage.mongo import ensure_indexes
+
+    collections = {"vehicles": MagicMock(), "drivers": MagicMock(), "assignments": MagicMock()}
+    collections["vehicles"].index_information.return_value = {"plate_number_1": {"key": [("plate_number", 1)], "unique": True, "sparse": True}}
+    collections["drivers"].index_information.return_value = {}
+    mock_db = MagicMock()
+    mock_db.__getitem__.side_effect = collections.__getitem__
+
+    ensure_indexes(mock_db)
+
+    collections["vehicles"].drop_index.assert_called_once_with("plate_number_1")
+    collections["vehicles"].create_index.assert_any_call("plate_number", unique=True, partialFilterExpression={"deleted": False})
+    collections["drivers"].drop_index.assert_not_called()
+
+
+def test_ensure_indexes_flags_ongoing_assignments_before_building_the_unique_indexes():
+    """Test that assignments without the ongoing flag are backfilled ahead of the partial unique indexes."""
+    from app.storage.mongo import ensure_indexes
+
+    mock_db = MagicMock()
+    calls = []
+    mock_db.assignments.update_many.side_effect = lambda *args: calls.append(("update_many", args))
+    mock_db.__getitem__.return_value.create_index.side_effect = lambda keys, **options: calls.append(("create_index", options.get("name")))
+
+    ensure_indexes(mock_db)
+
+    assert calls[0] == ("update_many", ({"end_datetime": None, "ongoing": {"$exists": False}}, {"$set": {"ongoing": True}}))
+    assert ("create_index", "driver_id_ongoing_unique") in calls[1:]
+
+
+def test_check_assignment_preflight_reports_business_codes():
+    """Test that preflight documents map to the assignment error codes in rule order."""
+    import pytest
+    from app.storage.errors import StorageConflict
+    from app.storage.mongo import check_assignment_preflight
+
+    driver = {"kind": "driver", "status": "ACTIVE", "deleted": False}
+    vehicle = {"kind": "vehicle", "status": "ACTIVE", "deleted": False}
+    cases = [
+        ([vehicle], "DRIVER_NOT_FOUND", 404),
+        ([driver], "VEHICLE_NOT_FOUND", 404),
+        ([{**driver, "status": "SUSPENDED"}, vehicle], "DRIVER_SUSPENDED", 409),
+        ([driver, {**vehicle, "status": "MAINTENANCE"}], "VEHICLE_INACTIVE", 409),
+        ([driver, vehicle, {"kind": "driver_assignment"}, {"kind": "vehicle_assignment"}], "DRIVER_ALREADY_ASSIGNED", 409),
+        ([driver, vehicle, {"kind": "vehicle_assignment"}], "VEHICLE_ALREADY_ASSIGNED", 409),
+    ]
+    for docs, code, status in cases:
+        with pytest.raises(StorageConflict) as exc:
+            check_assignment_preflight(docs)
+        assert exc.value.code == code
+        assert exc.value.status_code == status
+    check_assignment_preflight([driver, vehicle])
+
+
+def test_create_assignment_checked_uses_one_read_and_maps_race():
+    """Test that the checked create reads once and maps an index race to a business code."""
+    import pytest
+    from pymongo.errors import DuplicateKeyError
+    from app.storage.errors import StorageConflict
+
+    mock_db = MagicMock()
+    mock_db.drivers.aggregate.return_value = [
+        {"kind": "driver", "status": "ACTIVE", "deleted": False},
+        {"kind": "vehicle", "status": "ACTIVE", "deleted": False},
+    ]
+    mock_db.assignments.insert_one.side_effect = DuplicateKeyError("E11000", 11000, {"keyPattern": {"vehicle_id": 1}})
+
+    storage = MongoStorage(mock_db)
+    with pytest.raises(StorageConflict) as exc:
+        storage.create_assignment_checked(make_assignment())
+    assert exc.value.code == "VEHICLE_ALREADY_ASSIGNED"
+    mock_db.drivers.aggregate.assert_called_once()
+    inserted = mock_db.assignments.insert_one.call_args[0][0]
+    assert inserted["ongoing"] is True
+
+
+def test_mongo_storage_update_vehicle_if_match_is_conditional():
+    """Test that the compare-and-set update filters on updated_at and sets only the given fields."""
+    from pymongo import ReturnDocument
+
+    mock_db = MagicMock()
+    expected = datetime(2026, 2, 3, 12, 0, tzinfo=timezone.utc)
+    mock_db.vehicles.find_one_and_update.return_value = None
+
+    storage = MongoStorage(mock_db)
+    assert storage.update_vehicle_if_match("v1", expected, {"model": "New"}) is None
+    mock_db.vehicles.find_one_and_update.assert_called_once_with(
+        {"id": "v1", "deleted": False, "updated_at": expected},
+        {"$set": {"model": "New"}},
+        return_document=ReturnDocument.AFTER,
+        projection={"_id": 0, "ongoing": 0},
+    )
+
+
+def test_keyset_query_combines_filter_with_sort_position():
+    """Test that keyset pagination resumes strictly after the (created_at, id) key."""
+    from app.storage.mongo import keyset_query
+
+    created = datetime(2026, 2, 3, tzinfo=timezone.utc)
+    assert keyset_query({"deleted": False}, None) == {"deleted": False}
+    query = keyset_query({"deleted": False}, (created, "v9"))
+    assert query["$and"][0] == {"deleted": False}
+    assert query["$and"][1]["$or"] == [
+        {"created_at": {"$gt": created}},
+        {"created_at": created, "id": {"$gt": "v9"}},
+    ]
+
+
+def test_plan_assignment_batch_checks_items_against_earlier_ones():
+    """Test that batch planning applies the preflight rules and lets earlier items claim resources."""
+    from app.storage.mongo import plan_assignment_batch
+
+    drivers = {"d1": {"id": "d1", "status": "ACTIVE", "deleted": False}, "d2": {"id": "d2", "status": "SUSPENDED", "deleted": False}}
+    vehicles = {"v1": {"id": "v1", "status": "ACTIVE", "deleted": False}, "v2": {"id": "v2", "status": "ACTIVE", "deleted": False}}
+    past = datetime.now(timezone.utc) - timedelta(hours=1)
+    batch = [
+        make_assignment("a1", vehicle_id="v1", driver_id="d1", end=past),
+        make_assignment("a2", vehicle_id="v1", driver_id="d1"),
+        make_assignment("a3", vehicle_id="v2", driver_id="d1"),
+        make_assignment("a4", vehicle_id="v2", driver_id="d2"),
+        make_assignment("a5", vehicle_id="v9", driver_id="d1"),
+    ]
+    errors, accepted = plan_assignment_batch(batch, drivers, vehicles, [{"driver_id": "dx", "vehicle_id": "v2"}])
+    assert [e.code if e else None for e in errors] == [None, None, "DRIVER_ALREADY_ASSIGNED", "DRIVER_SUSPENDED", "VEHICLE_NOT_FOUND"]
+    assert [(i, doc["ongoing"]) for i, doc in accepted] == [(0, False), (1, True)]
+
+
+def test_create_vehicles_bulk_maps_write_errors_by_index():
+    """Test that an unordered insert_many reports duplicates against the input positions."""
+    from pymongo.errors import BulkWriteError
+
+    mock_db = MagicMock()
+    mock_db.vehicles.insert_many.side_effect = BulkWriteError({"writeErrors": [
+        {"index": 1, "code": 11000, "keyPattern": {"plate_number": 1}, "errmsg": "E11000 index: plate_number_1"},
+        {"index": 2, "code": 11000, "keyPattern": {"id": 1}, "errmsg": "E11000 index: id_1"},
+        {"index": 3, "code": 121, "errmsg": "Document failed validation"},
+    ]})
+
+    storage = MongoStorage(mock_db)
+    errors = storage.create_vehicles_bulk([make_vehicle("v1", "A1"), make_vehicle("v2", "A1"), make_vehicle("v1", "A3"), make_vehicle("v4", "A4")])
+    assert errors[0] is None
+    # Only the plate index means a duplicate plate
+    assert errors[1].code == "DUPLICATE_PLATE"
+    assert not hasattr(errors[2], "code") and "id_1" in str(errors[2])
+    assert str(errors[3]) == "Document failed validation"
+    docs = mock_db.vehicles.insert_many.call_args[0][0]
+    assert [d["id"] for d in docs] == ["v1", "v2", "v1", "v4"]
+    assert mock_db.vehicles.insert_many.call_args[1] == {"ordered": False}
+
+
+def test_mongo_storage_get_vehicle_projects_requested_fields():
+    """Test that sparse fieldsets become an inclusion projection that never returns _id."""
+    mock_db = MagicMock()
+    mock_db.vehicles.find_one.return_value = {"id": "v1", "status": "ACTIVE"}
+
+    storage = MongoStorage(mock_db)
+    assert storage.get_vehicle("v1", ["id", "status"]) == {"id": "v1", "status": "ACTIVE"}
+    mock_db.vehicles.find_one.assert_called_once_with({"id": "v1"}, {"_id": 0, "id": 1, "status": 1})
+
+
+def test_mongo_storage_get_vehicle_version_is_a_covered_lookup():
+    """Test that the conditional GET lookup projects only updated_at and hints the version index."""
+    from app.storage.mongo import VERSION_INDEX
+
+    mock_db = MagicMock()
+    updated = datetime(2026, 2, 3, 12, 0)
+    cursor = mock_db.vehicles.find.return_value.hint.return_value.limit.return_value
+    cursor.__iter__.return_value = iter([{"updated_at": updated}])
+
+    storage = MongoStorage(mock_db)
+    assert storage.get_vehicle_version("v1") == updated
+    mock_db.vehicles.find.assert_called_once_with({"id": "v1", "deleted": False}, {"_id": 0, "updated_at": 1})
+    mock_db.vehicles.find.return_value.hint.assert_called_once_with(VERSION_INDEX)
+
+
+def test_mongo_storage_watermark_is_derived_without_writes():
+    """Test that list validators come from the document count and the newest updated_at, and writes do not touch a watermark."""
+    mock_db = MagicMock()
+    vehicles = mock_db.__getitem__.return_value
+    vehicles.estimated_document_count.return_value = 7
+    cursor = vehicles.find.return_value.sort.return_value.limit.return_value
+    cursor.__iter__.return_value = iter([{"updated_at": datetime(2026, 2, 3, 12, 0)}])
+
+    storage = MongoStorage(mock_db)
+    mark = storage.get_watermark("vehicles")
+    assert mark == {"version": "7-1770120000000", "updated_at": datetime(2026, 2, 3, 12, 0, tzinfo=timezone.utc)}
+    mock_db.__getitem__.assert_called_with("vehicles")
+    vehicles.find.assert_called_once_with({}, {"_id": 0, "updated_at": 1})
+
+    storage.update_vehicle("v1", {"model": "X"})
+    storage.soft_delete_vehicle("v1")
+    mock_db.watermarks.update_one.assert_not_called()
+    assert "updated_at" in mock_db.vehicles.update_one.call_args.args[1]["$set"]
@@ -0,0 +1,55 @@
+"""Unit tests for the Motor-backed storage layer."""
+# AsyncMongoStorage mirrors MongoStorage; these tests mock the Motor collections
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import DuplicateKeyError
+
+from app.storage.adapter import AsyncStorageAdapter
+from app.storage.mongo_async import AsyncMongoStorage
+
+
+def make_db():
+    db = MagicMock()
+    for name in ("vehicles", "drivers", "assignments", "watermarks"):
+        coll = getattr(db, name)
+        coll.find_one = AsyncMock(return_value=None)
+        coll.insert_one = AsyncMock()
+        coll.update_one = AsyncMock()
+        coll.count_documents = AsyncMock(return_value=0)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_async_create_vehicle_handles_duplicate():
+    db = make_db()
+    db.vehicles.insert_one.side_effect = DuplicateKeyError("E11000")
+    storage = AsyncMongoStorage(db)
+    with pytest.raises(ValueError, match="Duplicate"):
+        await storage.create_vehicle({"id": "v1", "plate_number": "ABC1"})
+
+
+@pytest.mark.asyncio
+async def test_async_list_vehicles_pushes_down_filter_and_paging():
+    db = make_db()
+    db.vehicles.count_documents.return_value = 3
+    cursor = db.vehicles.find.return_value.sort.return_value.skip.return_value.limit.return_value
+    cursor.to_list = AsyncMock(return_value=[{"id": "v1"}])
+
+    adapter = AsyncStorageAdapter(AsyncMongoStorage(db))
+    items, total = await adapter.list_vehicles({"deleted": False}, limit=1, skip=1, fields=["id"])
+
+    assert total == 3
+    assert items == [{"id": "v1"}]
+    db.vehicles.find.assert_called_once_with({"deleted": False}, {"_id": 0, "id": 1})
+
+
+@pytest.mark.asyncio
+async def test_async_soft_delete_driver_sets_flag():
+    db = make_db()
+    storage = AsyncMongoStorage(db)
+    await storage.soft_delete_driver("d1")
+    (query, update), _ = db.drivers.update_one.await_args
+    assert query == {"id": "d1"}
+    assert update["$set"]["deleted"] is True and update["$set"]["updated_at"].tzinfo is not None
+    db.watermarks.update_one.assert_not_called()
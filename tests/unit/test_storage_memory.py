@@ -0,0 +1,86 @@
+"""Unit tests for the in-memory storage backend."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.storage.errors import StorageConflict
+from app.storage.memory import InMemoryStorage
+
+
+def make_vehicle(id_, plate, offset=0):
+    at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=offset)
+    return {"id": id_, "plate_number": plate, "status": "ACTIVE", "created_at": at, "updated_at": at}
+
+
+def make_driver(id_, license_number):
+    at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return {"id": id_, "license_number": license_number, "status": "ACTIVE", "created_at": at, "updated_at": at}
+
+
+def make_assignment(id_, driver_id="d1", vehicle_id="v1", end=None, offset=0):
+    at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=offset)
+    return {"id": id_, "driver_id": driver_id, "vehicle_id": vehicle_id, "start_datetime": at, "end_datetime": end, "created_at": at, "updated_at": at}
+
+
+def test_plate_is_unique_among_non_deleted_vehicles():
+    storage = InMemoryStorage()
+    storage.create_vehicle(make_vehicle("v1", "ABC1"))
+    with pytest.raises(ValueError):
+        storage.create_vehicle(make_vehicle("v2", "ABC1"))
+    storage.soft_delete_vehicle("v1")
+    storage.create_vehicle(make_vehicle("v2", "ABC1"))
+    assert storage.find_vehicle_by_plate("ABC1")["id"] == "v2"
+    assert storage.get_vehicle_version("v1") is None
+    assert storage.get_watermark("vehicles")["version"] == 3
+
+
+def test_update_if_match_compares_updated_at_and_moves_the_plate_index():
+    storage = InMemoryStorage()
+    vehicle = storage.create_vehicle(make_vehicle("v1", "ABC1"))
+    later = vehicle["updated_at"] + timedelta(milliseconds=1)
+    assert storage.update_vehicle_if_match("v1", later, {"plate_number": "XYZ9"}) is None
+    updated = storage.update_vehicle_if_match("v1", vehicle["updated_at"], {"plate_number": "XYZ9", "updated_at": later})
+    assert updated["plate_number"] == "XYZ9"
+    assert storage.find_vehicle_by_plate("ABC1") is None
+    assert storage.get_vehicle_version("v1") == later
+
+
+def test_list_pages_by_keyset_under_default_sort():
+    storage = InMemoryStorage()
+    for index in reversed(range(5)):
+        storage.create_vehicle(make_vehicle(f"v{index}", f"P{index}", offset=index))
+    page, total = storage.list_vehicles({"deleted": False}, limit=2, fields=["id", "created_at"])
+    assert [v["id"] for v in page] == ["v0", "v1"] and total == 5
+    after = (page[-1]["created_at"], page[-1]["id"])
+    page, total = storage.list_vehicles({"deleted": False}, limit=2, after=after, with_total=False)
+    assert [v["id"] for v in page] == ["v2", "v3"] and total is None
+    assert "deleted" in page[0] and "_id" not in page[0]
+    assert [v["id"] for v in storage.iter_vehicles(after=after)] == ["v2", "v3", "v4"]
+
+
+def test_one_ongoing_assignment_per_driver_and_vehicle():
+    storage = InMemoryStorage()
+    storage.create_assignment(make_assignment("a1"))
+    with pytest.raises(StorageConflict) as exc:
+        storage.create_assignment(make_assignment("a2", vehicle_id="v2"))
+    assert exc.value.code == "DRIVER_ALREADY_ASSIGNED"
+    storage.update_assignment("a1", {"end_datetime": datetime.now(timezone.utc) - timedelta(days=1)})
+    storage.create_assignment(make_assignment("a2", vehicle_id="v2", offset=1))
+    assert [a["id"] for a in storage.list_active_assignments_for_driver("d1")] == ["a2"]
+    assert "ongoing" not in storage.get_assignment("a2")
+    items, total = storage.list_assignments(driver_id="d1", active=False)
+    assert [a["id"] for a in items] == ["a1"] and total == 1
+
+
+def test_create_assignment_checked_applies_the_preflight_rules():
+    storage = InMemoryStorage()
+    storage.create_driver(make_driver("d1", "L1"))
+    with pytest.raises(StorageConflict) as exc:
+        storage.create_assignment_checked(make_assignment("a1"))
+    assert exc.value.code == "VEHICLE_NOT_FOUND"
+    storage.create_vehicle(make_vehicle("v1", "ABC1"))
+    storage.create_vehicle(make_vehicle("v2", "ABC2"))
+    storage.create_assignment_checked(make_assignment("a1"))
+    errors = storage.create_assignments_bulk([make_assignment("a2", vehicle_id="v2"), make_assignment("a3", driver_id="d9", vehicle_id="v2")])
+    assert errors[0].code == "DRIVER_ALREADY_ASSIGNED"
+    assert errors[1].code == "DRIVER_NOT_FOUND"
@@ -18,3 +18,23 @@ def test_now_utc_iso_returns_iso():
     s = now_utc_iso()
     # simple ISO-ish pattern check
     assert re.match(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}", s)
+
+
+def test_parse_etag_round_trips_make_etag():
+    from datetime import timezone
+    from app.utils import parse_etag
+    etag = make_etag("2026-02-03T12:00:00.123000+00:00")
+    assert parse_etag(etag) == datetime(2026, 2, 3, 12, 0, 0, 123000, tzinfo=timezone.utc)
+    assert parse_etag('"2026-02-03T12:00:00"').tzinfo == timezone.utc
+    # If-Match uses strong comparison: weak ETags never match
+    assert parse_etag('W/"2026-02-03T12:00:00.123000+00:00"') is None
+    assert parse_etag('"dummy"') is None
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    from datetime import timezone
+    from app.utils import encode_cursor, decode_cursor
+    created = datetime(2026, 2, 3, 12, 0, 0, 5000, tzinfo=timezone.utc)
+    token = encode_cursor({"created_at": created, "id": "v-1"})
+    assert decode_cursor(token) == (created, "v-1")
+    assert decode_cursor("not-a-cursor") is None